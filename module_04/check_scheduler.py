@@ -0,0 +1,143 @@
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+
+# Severity levels: a failed 'block' check rejects the load, a failed
+# 'warn' check is reported but does not. The loaders' existing checks all
+# block; 'warn' is for advisory checks added on top of them
+BLOCK = 'block'
+WARN = 'warn'
+
+# pipeline_log level for each result status
+STATUS_LEVELS = {'PASS': 'info', 'WARN': 'warning', 'FAIL': 'error'}
+
+
+# ============================================
+# STEP 1: DECLARE CHECKS
+# ============================================
+
+def make_check(fn, *args, severity=BLOCK):
+    """Schedule fn(df, *args), which returns one result dict or a list.
+
+    Result dicts are the ones the check_* functions already return:
+    {'check', 'passed', 'details'}.
+    """
+    return {'fn': fn, 'args': args, 'severity': severity}
+
+
+def per_column(fn, columns, *args, severity=BLOCK):
+    """One independent check per column, so columns run in parallel."""
+    return [make_check(fn, [col], *args, severity=severity) for col in columns]
+
+
+def _run_one(check, df):
+    start = time.perf_counter()
+    output = check['fn'](df, *check['args'])
+    elapsed_ms = (time.perf_counter() - start) * 1000
+    results = output if isinstance(output, list) else [output]
+    for result in results:
+        result['passed'] = bool(result['passed'])
+        result['severity'] = check['severity']
+        result['status'] = 'PASS' if result['passed'] else (
+            'FAIL' if check['severity'] == BLOCK else 'WARN'
+        )
+        result['ms'] = elapsed_ms
+    return results
+
+
+def _skipped(check):
+    name = getattr(check['fn'], '__name__', 'check')
+    return [{'check': name, 'passed': None, 'details': 'Not run (load already rejected)',
+             'severity': check['severity'], 'status': 'SKIP', 'ms': 0.0}]
+
+
+# ============================================
+# STEP 2: RUN CHECKS
+# ============================================
+
+def run_checks(df, checks, fail_fast=False, max_workers=None):
+    """Run checks concurrently on a thread pool.
+
+    The vectorized pandas/numpy work inside each check releases the GIL,
+    so independent column checks overlap on multi-core machines. With
+    fail_fast, the first failed BLOCK check cancels every check that has
+    not started yet and returns without waiting for the ones still
+    running. Put cheap checks first: they are started first.
+
+    Returns {'passed', 'results', 'skipped', 'elapsed_ms'}, with results
+    in the order the checks were declared.
+    """
+    start = time.perf_counter()
+    results = [None] * len(checks)
+    rejected = False
+
+    pool = ThreadPoolExecutor(max_workers or os.cpu_count() or 1)
+    futures = {pool.submit(_run_one, check, df): i for i, check in enumerate(checks)}
+    pending = set(futures)
+    try:
+        while pending and not rejected:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                results[futures[future]] = future.result()
+                if fail_fast and any(r['status'] == 'FAIL' for r in future.result()):
+                    rejected = True
+    finally:
+        # Drop queued checks; running ones finish in the background
+        pool.shutdown(wait=not rejected, cancel_futures=True)
+
+    skipped = 0
+    for i, check in enumerate(checks):
+        if results[i] is None:
+            results[i] = _skipped(check)
+            skipped += 1
+
+    flat = [result for group in results for result in group]
+    return {
+        'passed': not any(r['status'] == 'FAIL' for r in flat),
+        'results': flat,
+        'skipped': skipped,
+        'elapsed_ms': (time.perf_counter() - start) * 1000,
+    }
+
+
+def count_statuses(report):
+    """{'PASS': n, 'WARN': n, 'FAIL': n, 'SKIP': n} for a run_checks report."""
+    counts = {'PASS': 0, 'WARN': 0, 'FAIL': 0, 'SKIP': 0}
+    for result in report['results']:
+        counts[result['status']] += 1
+    return counts
+
+
+# ============================================
+# BENCHMARK
+# ============================================
+
+def benchmark(n_rows=2_000_000, seed=0):
+    """Time a rejected load: sequential, parallel, and parallel fail-fast."""
+    import quality_checks as qc
+    from synthetic_data import make_student_data
+
+    df = make_student_data(n_rows, seed)
+    df.loc[df.index[::1000], 'Exam_Score'] = None  # the load must be rejected
+
+    checks = (
+        per_column(qc.check_no_nulls, ['Exam_Score', 'Hours_Studied', 'Attendance'])
+        + [make_check(qc.check_value_range, col, 0, 101)
+           for col in ['Hours_Studied', 'Attendance', 'Previous_Scores']]
+        + [make_check(qc.check_allowed_values, 'Motivation_Level', ['Low', 'Medium', 'High']),
+           make_check(qc.check_no_duplicates)]
+    )
+
+    print(f"\n=== CHECK SCHEDULER: {len(df):,} rows, {len(checks)} checks, "
+          f"{os.cpu_count()} CPU(s) ===")
+    for label, options in [('sequential', {'max_workers': 1}),
+                           ('parallel', {}),
+                           ('parallel fail-fast', {'fail_fast': True})]:
+        report = run_checks(df, checks, **options)
+        counts = count_statuses(report)
+        print(f"  {label:<20} {report['elapsed_ms']:>9.1f} ms  "
+              f"passed={report['passed']}  failed={counts['FAIL']}  skipped={counts['SKIP']}")
+
+
+if __name__ == '__main__':
+    benchmark()
@@ -0,0 +1,137 @@
+import hashlib
+import time
+
+from sqlalchemy import inspect, text
+
+from pg_copy import psql_insert_copy
+
+CHECKPOINT_TABLE = 'load_checkpoints'
+
+# Rows committed per chunk: a crash loses at most one chunk of work
+CHUNK_ROWS = 100_000
+
+STAGING_SUFFIX = '__staging'
+
+
+# ============================================
+# STEP 1: CHECKPOINT TABLE
+# ============================================
+
+def ensure_checkpoint_table(engine):
+    """Create the chunk checkpoint table in the target database."""
+    with engine.begin() as conn:
+        conn.execute(text(f'''
+            CREATE TABLE IF NOT EXISTS {CHECKPOINT_TABLE} (
+                table_name    TEXT NOT NULL,
+                job_key       TEXT NOT NULL,
+                chunk_id      INTEGER NOT NULL,
+                first_row     BIGINT NOT NULL,
+                end_row       BIGINT NOT NULL,
+                committed_at  TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                PRIMARY KEY (table_name, chunk_id)
+            )
+        '''))
+
+
+def make_job_key(*parts):
+    """Identify one load job, e.g. from the source content hash and pipeline
+    version. Checkpoints are only resumed by a job with the same key."""
+    digest = hashlib.blake2b(digest_size=16)
+    for part in parts:
+        digest.update(str(part).encode())
+        digest.update(b'\0')
+    return digest.hexdigest()
+
+
+def staging_name(table_name):
+    return f'{table_name}{STAGING_SUFFIX}'
+
+
+def committed_chunks(engine, table_name, job_key):
+    """Chunk ids already committed to the staging table by this job.
+
+    Checkpoints left by a different job (the source or the pipeline
+    changed since) can't be resumed and count as none.
+    """
+    if staging_name(table_name) not in inspect(engine).get_table_names():
+        return set()
+    with engine.connect() as conn:
+        rows = conn.execute(
+            text(f'SELECT job_key, chunk_id FROM {CHECKPOINT_TABLE} WHERE table_name = :t'),
+            {'t': table_name}
+        ).fetchall()
+    if any(row.job_key != job_key for row in rows):
+        return set()
+    return {row.chunk_id for row in rows}
+
+
+# ============================================
+# STEP 2: CHUNKED LOAD INTO STAGING
+# ============================================
+
+def _reset_staging(engine, df, table_name):
+    staging = staging_name(table_name)
+    with engine.begin() as conn:
+        conn.execute(text(f'DELETE FROM {CHECKPOINT_TABLE} WHERE table_name = :t'),
+                     {'t': table_name})
+        conn.exec_driver_sql(f'DROP TABLE IF EXISTS {staging}')
+    df.head(0).to_sql(staging, engine, index=False)
+
+
+def load_with_checkpoints(df, engine, table_name, job_key, chunk_rows=CHUNK_ROWS):
+    """Load df into table_name in checkpointed chunks, then swap it in.
+
+    Rows go to a staging table; each chunk and its checkpoint row commit in
+    the same transaction, so after a crash the next run with the same
+    job_key skips exactly the chunks that made it. table_name itself is
+    only replaced at the end, in one transaction (see swap_into_place), so
+    readers see the old table or the complete new one, never a partial one.
+    """
+    ensure_checkpoint_table(engine)
+    staging = staging_name(table_name)
+    done = committed_chunks(engine, table_name, job_key)
+    if done:
+        print(f"  Resuming: {len(done)} chunk(s) already in {staging}")
+    else:
+        _reset_staging(engine, df, table_name)
+
+    start = time.perf_counter()
+    loaded = 0
+    for chunk_id, first_row in enumerate(range(0, len(df), chunk_rows)):
+        if chunk_id in done:
+            continue
+        end_row = min(first_row + chunk_rows, len(df))
+        with engine.begin() as conn:
+            df.iloc[first_row:end_row].to_sql(
+                staging, conn, if_exists='append', index=False, method=psql_insert_copy
+            )
+            conn.execute(
+                text(f'INSERT INTO {CHECKPOINT_TABLE} '
+                     f'(table_name, job_key, chunk_id, first_row, end_row) '
+                     f'VALUES (:t, :job, :chunk, :first, :end)'),
+                {'t': table_name, 'job': job_key, 'chunk': chunk_id,
+                 'first': first_row, 'end': end_row}
+            )
+        loaded += end_row - first_row
+
+    print(f"  Loaded {loaded:,} rows into {staging} "
+          f"({len(df) - loaded:,} resumed, {time.perf_counter() - start:.2f}s)")
+    swap_into_place(engine, table_name)
+
+
+# ============================================
+# STEP 3: ATOMIC SWAP
+# ============================================
+
+def swap_into_place(engine, table_name):
+    """Replace table_name with its staging table in a single transaction.
+
+    Postgres DDL is transactional: the drop, the rename and the checkpoint
+    cleanup commit together or not at all.
+    """
+    with engine.begin() as conn:
+        conn.exec_driver_sql(f'DROP TABLE IF EXISTS {table_name}')
+        conn.exec_driver_sql(f'ALTER TABLE {staging_name(table_name)} RENAME TO {table_name}')
+        conn.execute(text(f'DELETE FROM {CHECKPOINT_TABLE} WHERE table_name = :t'),
+                     {'t': table_name})
+    print(f"  Swapped {staging_name(table_name)} into place as {table_name}")
@@ -1,11 +1,23 @@
-import pandas as pd
-import numpy as np
 import os
 
+from pipeline_engine import (
+    apply_stages, apply_steps, inspect_params, inspect_source, load_config, load_source,
+    run_config_pipeline, with_fill_values
+)
+from pipeline_log import enabled, log, log_table
+
 # Resolve paths relative to this script's location
 SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
 DATA_DIR = os.path.join(SCRIPT_DIR, '..', '..', 'data')
 
+# The stages (load, inspect, clean, features) are declared in
+# pipelines/students.json and run by pipeline_engine.py. The functions
+# below run one piece of the config each, for scripts and notebooks that
+# call them one by one; the summary is the config's report on the final
+# 'features' frame
+CONFIG = 'students'
+PIPELINE = load_config(CONFIG)
+
 
 # ============================================
 # STEP 1: LOAD DATA
@@ -13,10 +25,7 @@ DATA_DIR = os.path.join(SCRIPT_DIR, '..', '..', 'data')
 
 def load_data(filepath):
     """Load CSV file and print basic info."""
-    df = pd.read_csv(filepath)
-    print(f"  Loaded: {filepath}")
-    print(f"  Shape: {df.shape[0]} rows, {df.shape[1]} columns")
-    return df
+    return load_source(filepath, PIPELINE['source'])
 
 
 # ============================================
@@ -24,170 +33,162 @@ def load_data(filepath):
 # ============================================
 
 def inspect_data(df):
-    """Check for nulls, duplicates, and data types."""
-    print("\n=== DATA INSPECTION ===")
+    """Check for nulls, duplicates, and data types.
+
+    Purely diagnostic: skipped unless 'debug' events are enabled.
+    """
+    return inspect_source(df, **inspect_params(PIPELINE))
+
+
+def inspection_report(df, profile):
+    """The config's inspect report (see inspect_source)."""
+    log('inspect', "\n=== DATA INSPECTION ===", 'debug')
 
     # Null check
-    nulls = df.isnull().sum()
-    null_cols = nulls[nulls > 0]
+    null_cols = {
+        col: p['null_count'] for col, p in profile['columns'].items()
+        if p['null_count'] > 0
+    }
     if len(null_cols) > 0:
-        print("  Columns with nulls:")
+        log('nulls', "  Columns with nulls:", 'debug')
         for col, count in null_cols.items():
-            print(f"    {col}: {count} ({count/len(df)*100:.1f}%)")
+            log('nulls', "    {column}: {count} ({pct:.1f}%)", 'debug',
+                column=col, count=count, pct=count / len(df) * 100)
     else:
-        print("  No nulls found")
+        log('nulls', "  No nulls found", 'debug', count=0)
 
     # Duplicate check
-    dupes = df.duplicated().sum()
-    print(f"  Duplicates: {dupes}")
+    log('duplicates', "  Duplicates: {count}", 'debug', count=profile['duplicate_rows'])
 
     # Data types
-    print(f"  Numeric columns: {len(df.select_dtypes(include='number').columns)}")
-    print(f"  Text columns: {len(df.select_dtypes(include='object').columns)}")
-
-    return df
+    log('dtypes', "  Numeric columns: {numeric}\n  Text columns: {text}", 'debug',
+        numeric=len(df.select_dtypes(include='number').columns),
+        text=len(df.select_dtypes(include='object').columns))
 
 
 # ============================================
-# STEP 3: HANDLE MISSING VALUES
+# STEP 3: CLEAN AND ENRICH
 # ============================================
 
-def handle_missing(df):
-    """Fill missing values: mode for categorical, median for numeric."""
-    df = df.copy()
-
-    for col in df.select_dtypes(include='object').columns:
-        if df[col].isnull().sum() > 0:
-            fill_value = df[col].mode()[0]
-            df[col] = df[col].fillna(fill_value)
-            print(f"  Filled '{col}' nulls with mode: '{fill_value}'")
+def handle_missing(df, fill_values=None):
+    """Fill missing values: mode for categorical, median for numeric.
 
-    for col in df.select_dtypes(include='number').columns:
-        if df[col].isnull().sum() > 0:
-            fill_value = df[col].median()
-            df[col] = df[col].fillna(fill_value)
-            print(f"  Filled '{col}' nulls with median: {fill_value}")
+    Pass fill_values from an earlier fit to impute consistently without
+    recomputing them.
+    """
+    return apply_steps(df, with_fill_values(PIPELINE, None, fill_values), ['fill_missing'])
 
-    print(f"  Remaining nulls: {df.isnull().sum().sum()}")
-    return df
-
-
-# ============================================
-# STEP 4: STANDARDIZE TEXT
-# ============================================
 
 def standardize_text(df):
     """Strip whitespace and apply title case to text columns."""
-    df = df.copy()
-    text_cols = df.select_dtypes(include='object').columns
-
-    for col in text_cols:
-        df[col] = df[col].str.strip().str.title()
-
-    print(f"  Standardized {len(text_cols)} text columns")
-    return df
-
+    return apply_steps(df, PIPELINE, ['standardize_text'])
 
-# ============================================
-# STEP 5: REMOVE DUPLICATES
-# ============================================
 
 def remove_duplicates(df):
     """Remove exact duplicate rows."""
-    df = df.copy()
-    before = len(df)
-    df = df.drop_duplicates()
-    removed = before - len(df)
-    print(f"  Removed {removed} duplicates ({before} -> {len(df)} rows)")
-    return df
+    return apply_steps(df, PIPELINE, ['drop_duplicates'])
 
 
-# ============================================
-# STEP 6: ADD FEATURES
-# ============================================
-
 def add_features(df):
-    """Engineer new columns from existing data."""
-    df = df.copy()
-
-    # Encode motivation level
-    df['Motivation_Score'] = df['Motivation_Level'].map(
-        {'Low': 1, 'Medium': 2, 'High': 3}
-    )
-
-    # Binary encode internet access
-    df['Has_Internet'] = df['Internet_Access'].map({'Yes': 1, 'No': 0})
+    """Engineer new columns from existing data: the 'features' stage."""
+    return apply_stages(df, PIPELINE, ['features'], titles=False)
 
-    # Pass/Fail flag
-    df['Pass_Fail'] = np.where(df['Exam_Score'] >= 65, 'Pass', 'Fail')
 
-    # Score band
-    df['Score_Band'] = pd.cut(
-        df['Exam_Score'],
-        bins=[0, 60, 70, 80, 90, 101],
-        labels=['Very Low', 'Low', 'Medium', 'High', 'Very High']
-    )
-
-    new_cols = ['Motivation_Score', 'Has_Internet', 'Pass_Fail', 'Score_Band']
-    print(f"  Added {len(new_cols)} features: {new_cols}")
-    return df
+def run_stages(filepath):
+    """The stage functions one by one, as run_pipeline once called them
+    (see pipeline_engine.verify_configs)."""
+    df = inspect_data(load_data(filepath))
+    log('stage', "\n--- CLEANING ---")
+    df = remove_duplicates(standardize_text(handle_missing(df)))
+    log('stage', "\n--- ENRICHMENT ---")
+    return add_features(df)
 
 
 # ============================================
-# STEP 7: GENERATE SUMMARY
+# STEP 4: GENERATE SUMMARY
 # ============================================
 
 def generate_summary(df):
     """Print key analytics from the cleaned data."""
-    print("\n=== ANALYTICS SUMMARY ===")
+    if not enabled('info'):
+        return df
+    log('summary', "\n=== ANALYTICS SUMMARY ===")
 
     # Overall stats
-    print(f"  Total students: {len(df)}")
-    print(f"  Average exam score: {df['Exam_Score'].mean():.1f}")
-    print(f"  Pass rate: {(df['Pass_Fail'] == 'Pass').mean()*100:.1f}%")
+    log('overview', "  Total students: {students}\n  Average exam score: {avg_score:.1f}\n"
+        "  Pass rate: {pass_rate:.1f}%", students=len(df), avg_score=df['Exam_Score'].mean(),
+        pass_rate=(df['Pass_Fail'] == 'Pass').mean() * 100)
 
     # By motivation
-    print("\n  Score by Motivation Level:")
     motivation_stats = df.groupby('Motivation_Level', observed=True).agg(
         avg_score=('Exam_Score', 'mean'),
         count=('Exam_Score', 'count')
     ).round(1)
-    print(motivation_stats.to_string(index=True))
+    log_table('score_by_motivation', "\n  Score by Motivation Level:", motivation_stats)
 
     return df
 
 
 # ============================================
-# STEP 8: RUN PIPELINE
+# STEP 5: RUN PIPELINE
 # ============================================
 
-def run_pipeline(filepath):
-    """Execute the full cleaning pipeline."""
-    print("=" * 50)
-    print("CLEANING PIPELINE — START")
-    print("=" * 50)
+def pipeline_config(fill_values_path=None, fill_values=None):
+    """pipelines/students.json without its quality checks (add those as
+    extra nodes on 'features', see quality_checks.py)."""
+    config = with_fill_values(load_config(CONFIG), fill_values_path, fill_values)
+    config['checks'] = []
+    return config
 
-    df = load_data(filepath)
-    df = inspect_data(df)
 
-    print("\n--- CLEANING ---")
-    df = handle_missing(df)
-    df = standardize_text(df)
-    df = remove_duplicates(df)
+def run_pipeline(filepath, backend='pandas', fill_values_path=None,
+                 output_path=None, output_format=None, cache_dir=None, memory_budget=None):
+    """Execute the full cleaning pipeline and return the cleaned frame.
 
-    print("\n--- ENRICHMENT ---")
-    df = add_features(df)
+    backend='duckdb' runs the same stages out-of-core on DuckDB
+    (see duckdb_backend.py) for files larger than memory.
 
-    df = generate_summary(df)
+    fill_values_path: JSON of fitted fill values. If it exists, nulls are
+    imputed with the stored values; otherwise they are fitted and saved
+    there, so later batches are filled consistently. pandas backend only:
+    with backend='duckdb' it raises ValueError.
 
-    print("\n" + "=" * 50)
-    print(f"PIPELINE COMPLETE — {df.shape[0]} rows, {df.shape[1]} columns")
-    print("=" * 50)
+    output_path: also write the cleaned frame there as Parquet, Arrow IPC
+    or compressed CSV (see output_writers.py; output_format defaults to the
+    path's extension).
 
+    cache_dir: memoize stage outputs there (see dag.py), so a re-run only
+    recomputes the stages whose code or inputs changed.
+
+    memory_budget: bytes the run should stay within (see memory_governor.py).
+    Stage outputs waiting for their consumers are spilled to disk when
+    memory runs high, and each stage's peak memory is reported.
+    """
+    df, _ = run_pipeline_with(filepath, [], backend=backend, fill_values_path=fill_values_path,
+                              output_path=output_path, output_format=output_format,
+                              cache_dir=cache_dir, memory_budget=memory_budget)
     return df
 
 
+def run_pipeline_with(filepath, extra_nodes, backend='pandas', fill_values_path=None,
+                      output_path=None, output_format=None, cache_dir=None,
+                      memory_budget=None, fill_values=None):
+    """run_pipeline plus extra_nodes, more DAG nodes to run with it (e.g.
+    quality checks on 'features', concurrently with the summary).
+
+    fill_values: fitted fill values to apply instead of fitting them
+    (db_loader passes the last full load's to a partial reload).
+
+    Returns (df, {name: output}).
+    """
+    return run_config_pipeline(
+        pipeline_config(fill_values_path, fill_values), filepath, backend=backend,
+        output_path=output_path, output_format=output_format, cache_dir=cache_dir,
+        extra_nodes=extra_nodes, memory_budget=memory_budget
+    )
+
+
 if __name__ == '__main__':
     df_clean = run_pipeline('data/StudentPerformanceFactors.csv')
     print(f"\nNulls remaining: {df_clean.isnull().sum().sum()}")
-    print(f"Final shape: {df_clean.shape}")
\ No newline at end of file
+    print(f"Final shape: {df_clean.shape}")
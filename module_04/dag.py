@@ -0,0 +1,329 @@
+import contextlib
+import functools
+import hashlib
+import inspect
+import os
+import pickle
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+
+import numpy as np
+import pandas as pd
+
+from pipeline_log import capture, echo, release
+from pipeline_sources import file_sources
+
+# Default on-disk cache shared by the pipelines and loaders
+CACHE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '.dag_cache')
+# The least recently used outputs are evicted above this size
+CACHE_BYTES = 2 * 1024 ** 3
+# Part of every code key: an upgrade can change what a stage returns
+LIBRARY_VERSIONS = f'pandas {pd.__version__}, numpy {np.__version__}'
+
+
+# ============================================
+# STEP 1: DECLARE NODES
+# ============================================
+
+def node(name, fn, inputs=(), cache=True, title=None, **params):
+    """DAG node: name = fn(*outputs of inputs, **params).
+
+    cache=False always runs the node (for cheap reporting stages whose
+    printed output is the point); its inputs can still come from the
+    cache. title is printed before the node runs.
+    """
+    return {'name': name, 'fn': fn, 'inputs': list(inputs), 'params': params,
+            'cache': cache, 'title': title}
+
+
+# ============================================
+# STEP 2: MERKLE CACHE KEYS
+# ============================================
+
+def _digest():
+    return hashlib.blake2b(digest_size=16)
+
+
+@functools.lru_cache(maxsize=None)
+def _module_files(path):
+    return tuple(file_sources(path))
+
+
+def code_key(fn):
+    """Hash of fn's source, of its module and the in-repo modules that one
+    imports (see pipeline_sources.file_sources), and of the pandas and
+    numpy versions. Editing a stage, a helper it calls or upgrading
+    pandas invalidates its outputs.
+    """
+    digest = _digest()
+    try:
+        digest.update(inspect.getsource(fn).encode())
+        path = inspect.getsourcefile(fn)
+    except (OSError, TypeError):
+        digest.update(f'{getattr(fn, "__module__", "")}.'
+                      f'{getattr(fn, "__qualname__", repr(fn))}'.encode())
+        path = None
+    if path:
+        for source in _module_files(os.path.abspath(path)):
+            with open(source, 'rb') as f:
+                digest.update(f.read())
+    digest.update(LIBRARY_VERSIONS.encode())
+    return digest.hexdigest()
+
+
+def param_key(value):
+    """Hash input for one parameter, or None when it can't be keyed.
+
+    Paths of existing files stand for their content (path, size and
+    mtime); open file objects and buffers can't be keyed at all.
+    """
+    if isinstance(value, (str, os.PathLike)) and os.path.isfile(value):
+        stat = os.stat(value)
+        return f'file:{os.path.abspath(value)}:{stat.st_size}:{stat.st_mtime_ns}'
+    if hasattr(value, 'read'):
+        return None
+    try:
+        return pickle.dumps(value, protocol=4)
+    except Exception:
+        return None
+
+
+def node_keys(nodes):
+    """Cache key per node: hash of its code, its parameters and the keys of
+    its inputs. A change anywhere upstream changes every key downstream,
+    and nothing else. None marks nodes whose inputs can't be keyed."""
+    by_name = {n['name']: n for n in nodes}
+    keys = {}
+
+    def key_of(name):
+        if name not in keys:
+            n = by_name[name]
+            digest = _digest()
+            digest.update(code_key(n['fn']).encode())
+            parts = []
+            for param, value in sorted(n['params'].items()):
+                part = param_key(value)
+                if part is None:
+                    keys[name] = None
+                    return None
+                parts.append(param.encode() + b'=' + (part if isinstance(part, bytes) else part.encode()))
+            for part in parts:
+                digest.update(part)
+            for upstream in n['inputs']:
+                upstream_key = key_of(upstream)
+                if upstream_key is None:
+                    keys[name] = None
+                    return None
+                digest.update(upstream_key.encode())
+            keys[name] = digest.hexdigest()
+        return keys[name]
+
+    for name in by_name:
+        key_of(name)
+    return keys
+
+
+# ============================================
+# STEP 3: ON-DISK LRU CACHE
+# ============================================
+
+def _cache_path(cache_dir, key):
+    return os.path.join(cache_dir, f'{key}.pkl')
+
+
+def cache_has(cache_dir, key):
+    return bool(cache_dir and key) and os.path.exists(_cache_path(cache_dir, key))
+
+
+def cache_load(cache_dir, key):
+    """Unpickle a stored output and mark it as recently used."""
+    path = _cache_path(cache_dir, key)
+    with open(path, 'rb') as f:
+        value = pickle.load(f)
+    os.utime(path)
+    return value
+
+
+def cache_store(cache_dir, key, value, max_bytes=CACHE_BYTES):
+    """Pickle an output (atomically) and evict down to max_bytes."""
+    os.makedirs(cache_dir, exist_ok=True)
+    path = _cache_path(cache_dir, key)
+    tmp_path = f'{path}.{threading.get_ident()}.tmp'
+    with open(tmp_path, 'wb') as f:
+        pickle.dump(value, f, protocol=pickle.HIGHEST_PROTOCOL)
+    os.replace(tmp_path, path)
+    evict(cache_dir, max_bytes)
+
+
+def evict(cache_dir, max_bytes=CACHE_BYTES):
+    """Delete least recently used outputs until the cache fits max_bytes."""
+    entries = []
+    for name in os.listdir(cache_dir):
+        if name.endswith('.pkl'):
+            stat = os.stat(os.path.join(cache_dir, name))
+            entries.append((stat.st_mtime_ns, stat.st_size, name))
+    total = sum(size for _, size, _ in entries)
+    for _, size, name in sorted(entries):
+        if total <= max_bytes:
+            break
+        os.remove(os.path.join(cache_dir, name))
+        total -= size
+
+
+# ============================================
+# STEP 4: RUN
+# ============================================
+
+def _required(nodes, targets, keys, cache_dir):
+    """Nodes to run and nodes to read from the cache for targets.
+
+    A cached node's inputs are not needed at all, so a change to the last
+    stage re-runs only that stage.
+    """
+    by_name = {n['name']: n for n in nodes}
+    run, cached = set(), set()
+
+    def visit(name):
+        if name in run or name in cached:
+            return
+        n = by_name[name]
+        if n['cache'] and cache_has(cache_dir, keys[name]):
+            cached.add(name)
+            return
+        run.add(name)
+        for upstream in n['inputs']:
+            visit(upstream)
+
+    for target in targets:
+        visit(target)
+    return run, cached
+
+
+def run_dag(nodes, targets=None, cache_dir=None, max_bytes=CACHE_BYTES, max_workers=None,
+            monitor=None):
+    """Run the nodes needed for targets (default: every node) and return
+    {target: output}.
+
+    Node outputs are memoized on disk in cache_dir (None disables the
+    cache) under their Merkle key, so only stages whose code, parameters
+    or upstream inputs changed are recomputed. Nodes whose inputs are
+    ready run concurrently on a thread pool. A node that feeds several
+    others gets its own copy of a DataFrame input, so stages may modify
+    their input in place.
+
+    monitor: a memory_governor.MemoryMonitor that records each node's
+    peak memory; when it reports memory running high, outputs waiting for
+    their consumers are spilled to disk until they are needed.
+    """
+    by_name = {n['name']: n for n in nodes}
+    for n in nodes:
+        for upstream in n['inputs']:
+            if upstream not in by_name:
+                raise ValueError(f"node {n['name']!r} needs unknown input {upstream!r}")
+    targets = list(targets or by_name)
+    keys = node_keys(nodes)
+    run, cached = _required(nodes, targets, keys, cache_dir)
+
+    consumers = {name: 0 for name in by_name}
+    for name in run:
+        for upstream in by_name[name]['inputs']:
+            consumers[upstream] += 1
+    for target in targets:
+        consumers[target] += 1
+
+    start = time.perf_counter()
+    values = {}
+    for name in cached:
+        values[name] = cache_load(cache_dir, keys[name])
+        if by_name[name]['title']:
+            print(f"{by_name[name]['title']} (cached)")
+
+    spilled = {}
+
+    def take(name):
+        # Hand out copies while other consumers still need the value
+        with lock:
+            if name in spilled:
+                handle = spilled.pop(name)
+                values[name] = handle.load()
+                handle.discard()
+            consumers[name] -= 1
+            value = values[name]
+            if consumers[name] > 0 and isinstance(value, pd.DataFrame):
+                return value.copy()
+            if name not in targets and consumers[name] == 0:
+                del values[name]
+            return value
+
+    def execute(n):
+        # Inputs are taken when the node starts, not when it is queued, so
+        # queued nodes don't each hold a copy of a shared frame
+        args = [take(u) for u in n['inputs']]
+        # The node's echo() and log() output is printed in one piece when
+        # it finishes, so concurrent nodes don't interleave
+        capture()
+        try:
+            if n['title']:
+                echo(n['title'])
+            with monitor.stage(n['name']) if monitor else contextlib.nullcontext():
+                value = n['fn'](*args, **n['params'])
+            if n['cache'] and cache_dir and keys[n['name']]:
+                cache_store(cache_dir, keys[n['name']], value, max_bytes)
+            return value
+        finally:
+            text = release()
+            with lock:
+                sys.stdout.write(text)
+
+    def spill_waiting():
+        with lock:
+            for name in list(waiting):
+                if name in values and monitor.worth_spilling(values[name]):
+                    spilled[name] = monitor.spill(name, values.pop(name))
+            waiting.clear()
+
+    lock = threading.Lock()
+    waiting = set()
+    if monitor:
+        monitor.on_high_water = spill_waiting
+    pool = ThreadPoolExecutor(max_workers or os.cpu_count() or 1)
+    try:
+        pending, futures = set(run), {}
+        while pending or futures:
+            ready = [name for name in pending
+                     if all(u in values or u in spilled for u in by_name[name]['inputs'])]
+            # Keep declaration order so a linear chain prints in order
+            for name in sorted(ready, key=list(by_name).index):
+                pending.discard(name)
+                futures[pool.submit(execute, by_name[name])] = name
+            if monitor:
+                # Outputs that only still-blocked nodes will read can go to
+                # disk if memory runs high before those nodes start
+                with lock:
+                    waiting.clear()
+                    for name in values:
+                        readers = sum(name in by_name[n]['inputs'] for n in pending)
+                        if readers and readers == consumers[name] - (name in targets):
+                            waiting.add(name)
+            if not futures:
+                raise ValueError(f'cycle between nodes {sorted(pending)}')
+            done, _ = wait(futures, return_when=FIRST_COMPLETED)
+            for future in done:
+                values[futures.pop(future)] = future.result()
+            # A finished future keeps its result; let values own it alone
+            del done, future
+    finally:
+        pool.shutdown(wait=True, cancel_futures=True)
+        if monitor:
+            monitor.on_high_water = None
+
+    if cache_dir:
+        print(f"\n  [dag] {len(run)} node(s) ran, {len(cached)} from cache "
+              f"({time.perf_counter() - start:.2f}s)")
+    for name in list(spilled):
+        handle = spilled.pop(name)
+        values[name] = handle.load()
+        handle.discard()
+    return {name: values[name] for name in targets}
@@ -1,9 +1,24 @@
 import pandas as pd
 from sqlalchemy import create_engine, text
 from urllib.parse import quote_plus
-from clean_pipeline import run_pipeline
+from clean_pipeline import run_pipeline_with
 
+from dag import CACHE_DIR, node
+from imputation import fit_fill_values
+from pipeline_log import log
+from pipeline_sources import loader_version
 from quality_checks import run_quality_checks
+from pg_copy import (
+    psql_insert_copy, compute_column_checksums, checksum_query, sums_match
+)
+from fingerprint import (
+    PARTITION_COLUMN, plan_load, print_plan, read_partitions, tag_partitions,
+    delete_partitions, drop_kept_duplicates, full_load, record_load
+)
+
+# Tables above this many rows are verified from catalog statistics and a
+# sample instead of a full aggregate scan
+SAMPLE_VERIFY_THRESHOLD = 1_000_000
 
 
 # Step 1 - create our database
@@ -50,17 +65,28 @@ def connect_to_db(db_name):
 
 #  Step 3 : - LOAD DATA INTO DATABASE
 
-def load_to_database(df, engine, table_name):
-    """Load a Datafram into a PostgreSQL table"""
+def load_to_database(df, engine, table_name, if_exists='replace'):
+    """Load a Datafram into a PostgreSQL table via COPY.
+
+    Returns load stats (rows sent, rows COPY reported, column checksums)
+    for verify_load_checksums.
+    """
     
-    df.to_sql(
+    copied = df.to_sql(
         name=table_name,
         con=engine,
-        if_exists='replace',
-        index=False
+        if_exists=if_exists,
+        index=False,
+        method=psql_insert_copy
     )
     
-    print(f"  Loaded {len(df)} rows into table: {table_name}")
+    log('loaded_table', "  Loaded {rows} rows into table: {table}", rows=len(df), table=table_name)
+
+    return {
+        'rows_sent': len(df),
+        'rows_copied': copied,
+        'checksums': compute_column_checksums(df)
+    }
     
     
 # Step 4 :-  Verify the load
@@ -97,34 +123,179 @@ def verify_load(engine, table_name):
     print(f"\n  Null Exam_Score rows: {df_nulls['total_nulls'].iloc[0]}")
 
     print("\n  Verification PASSED")
+
+
+def verify_load_checksums(engine, table_name, load_stats,
+                          sample_threshold=SAMPLE_VERIFY_THRESHOLD, where=None):
+    """Cheap verification against the stats returned by load_to_database.
+
+    Compares the COPY-reported row count with the rows sent, then checks the
+    per-column checksums with one aggregate query. Tables larger than
+    sample_threshold are checked from ANALYZE statistics instead (row
+    estimate and per-column null fraction), which never scans the table.
+    where limits the check to the rows just appended (partial reloads).
+    """
+    log('verify', "\n=== VERIFICATION (checksums) ===")
+
+    failures = []
+    rows_sent = load_stats['rows_sent']
+    rows_copied = load_stats['rows_copied']
+    checksums = load_stats['checksums']
+
+    # Row count reported by COPY
+    log('rows_copied', "  Rows sent: {sent}  |  COPY reported: {copied}",
+        sent=rows_sent, copied=rows_copied)
+    if rows_copied != rows_sent:
+        failures.append(f'COPY reported {rows_copied} rows, sent {rows_sent}')
+
+    if rows_sent <= sample_threshold or where:
+        # One server-side scan for every column aggregate
+        query = checksum_query(table_name, checksums)
+        if where:
+            query += f' WHERE {where}'
+        with engine.connect() as conn:
+            row = conn.execute(text(query)).mappings().one()
+
+        if row['__rows'] != rows_sent:
+            failures.append(f"table has {row['__rows']} rows, sent {rows_sent}")
+
+        for i, (col, entry) in enumerate(checksums.items()):
+            if row[f'c{i}_n'] != entry['non_null']:
+                failures.append(
+                    f"{col}: {row[f'c{i}_n']} non-null, expected {entry['non_null']}"
+                )
+            elif not sums_match(entry['sum'], row[f'c{i}_s']):
+                failures.append(
+                    f"{col}: checksum {row[f'c{i}_s']}, expected {entry['sum']}"
+                )
+        log('checksums', "  Checked {columns} column checksums in one query",
+            columns=len(checksums), mode='checksum')
+    else:
+        # Catalog stats only: ANALYZE samples a fixed number of rows
+        with engine.connect() as conn:
+            conn.execute(text(f'ANALYZE {table_name}'))
+            estimate = conn.execute(
+                text("SELECT reltuples FROM pg_class WHERE oid = CAST(:t AS regclass)"),
+                {'t': table_name}
+            ).scalar()
+            null_fracs = dict(conn.execute(
+                text("SELECT attname, null_frac FROM pg_stats "
+                     "WHERE schemaname = current_schema() AND tablename = :t"),
+                {'t': table_name}
+            ).fetchall())
+            conn.commit()
+
+        log('row_estimate', "  Estimated rows (pg_class): {rows:,.0f}", rows=estimate)
+        if abs(estimate - rows_sent) > 0.01 * rows_sent:
+            failures.append(f'row estimate {estimate:,.0f}, sent {rows_sent}')
+
+        for col, entry in checksums.items():
+            if col not in null_fracs:
+                failures.append(f'{col}: missing from pg_stats')
+                continue
+            expected = 1 - entry['non_null'] / rows_sent
+            if abs(null_fracs[col] - expected) > 0.01:
+                failures.append(
+                    f'{col}: null fraction {null_fracs[col]:.3f}, '
+                    f'expected {expected:.3f}'
+                )
+        log('checksums', "  Checked {columns} column null fractions (sampled)",
+            columns=len(checksums), mode='sampled')
+
+    for failure in failures:
+        log('mismatch', "    MISMATCH {failure}", 'error', failure=failure)
+
+    if failures:
+        log('verified', "\n  Verification FAILED", 'error', passed=False, table=table_name)
+        return False
+
+    log('verified', "\n  Verification PASSED", passed=True, table=table_name)
+    return True
         
 
 # Step 5 : - RUN Loader
 
-def run_loader(filepath, db_name, table_name):
-    """Full ETL: Clean CSV -> Validate -> Load into PostgreSQL."""
+def run_loader(filepath, db_name, table_name, verify_mode='checksum', incremental=True,
+               plan=None):
+    """Full ETL: Clean CSV -> Validate -> Load into PostgreSQL.
+
+    verify_mode='checksum' verifies from load stats (cheap); 'full' runs
+    the original verify_load queries.
+
+    incremental=True fingerprints the CSV against the load manifest (see
+    fingerprint.py): an unchanged file and pipeline skips the whole run,
+    and when only some partitions changed just those are cleaned and
+    reloaded. A partial reload fills nulls with the fill values recorded by
+    the last full load, drops rows that are already in the kept
+    partitions, and replaces the stale rows in one transaction.
+    incremental=False reloads everything but still tags and records the
+    load, so the next incremental run can start from it. plan is a
+    fingerprint.plan_load plan the caller already made (see
+    cli.incremental_plan), so the file isn't fingerprinted twice.
+    """
     print("=" * 50)
     print("DB LOADER — START")
     print("=" * 50)
 
-    # EXTRACT & TRANSFORM (from Video 11)
-    df = run_pipeline(filepath)
+    create_database(db_name)
+    engine = connect_to_db(db_name)
 
-    # VALIDATE (from Video 13) — NEW!
-    print("\n")
-    passed = run_quality_checks(df)
+    if plan is None or not incremental:
+        plan = plan_load(engine, table_name, filepath, loader_version('students'),
+                         force=not incremental)
+    print_plan(plan)
+    if plan['action'] == 'skip':
+        if plan['fingerprint'] is not None:
+            record_load(engine, table_name, filepath, plan)
+        engine.dispose()
+        print("\nSource and pipeline unchanged — nothing to load")
+        return
+    if plan['action'] == 'partial' and plan['fill_values'] is None:
+        print_plan(full_load(plan, 'no recorded fill values'))
+
+    # EXTRACT & TRANSFORM (from Video 11), VALIDATE (from Video 13) — the
+    # quality checks run next to the pipeline summary, and unchanged stages
+    # come from the shared stage cache
+    quality = node('quality', run_quality_checks, ['features'], cache=False,
+                   title='\n', fail_fast=True)
+    if plan['action'] == 'partial':
+        df, results = run_pipeline_with(read_partitions(filepath, plan), [quality],
+                                        fill_values=plan['fill_values'])
+    else:
+        # The fill values the clean stage fits, recorded for partial reloads
+        fills = node('fill_values', fit_fill_values, ['load'], all_columns=True)
+        df, results = run_pipeline_with(filepath, [quality, fills], cache_dir=CACHE_DIR)
+        plan['fill_values'] = results['fill_values']
+
+    passed = results['quality']
     if not passed:
         print("\n❌ QUALITY CHECKS FAILED — Aborting load!")
+        engine.dispose()
         return
 
     # LOAD
     print("\n--- DATABASE LOADING ---")
-    create_database(db_name)
-    engine = connect_to_db(db_name)
-    load_to_database(df, engine, table_name)
+    where = None
+    df = tag_partitions(df, plan)
+    if plan['action'] == 'partial':
+        with engine.begin() as conn:
+            delete_partitions(conn, table_name, plan['changed'] + plan['removed'])
+            df = drop_kept_duplicates(conn, table_name, df)
+            load_stats = load_to_database(df, conn, table_name, if_exists='append')
+        changed = ', '.join(str(p) for p in plan['changed'])
+        where = f'"{PARTITION_COLUMN}" IN ({changed})'
+    else:
+        load_stats = load_to_database(df, engine, table_name)
 
     # VERIFY
-    verify_load(engine, table_name)
+    if verify_mode == 'full':
+        verify_load(engine, table_name)
+        verified = True
+    else:
+        verified = verify_load_checksums(engine, table_name, load_stats, where=where)
+
+    if verified:
+        record_load(engine, table_name, filepath, plan, len(df))
 
     engine.dispose()
 
@@ -138,4 +309,4 @@ if __name__ == '__main__':
         filepath='data/StudentPerformanceFactors.csv',
         db_name='student_analytics_db',
         table_name='students'
-    )
\ No newline at end of file
+    )
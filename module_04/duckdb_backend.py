@@ -0,0 +1,430 @@
+import contextlib
+import io
+import os
+import tempfile
+
+import pandas as pd
+
+from pipeline_log import echo, enabled, log
+
+try:
+    import duckdb
+    import pyarrow as pa
+    import pyarrow.compute as pc
+except ImportError:  # optional backend
+    duckdb = None
+
+# Row position column carried through every stage so results keep the
+# source order, like the pandas backend
+ROW_COL = '_row'
+
+SCORE_BANDS = ['Very Low', 'Low', 'Medium', 'High', 'Very High']
+
+
+# ============================================
+# CONNECTION
+# ============================================
+
+def connect(memory_limit='2GB', threads=None, temp_directory=None, database=':memory:'):
+    """Open a DuckDB connection that spills to disk past memory_limit.
+
+    Intermediate stage tables live in DuckDB's buffer manager, so data
+    larger than RAM is paged to temp_directory instead of failing.
+    """
+    if duckdb is None:
+        raise ImportError("the duckdb backend needs 'pip install duckdb pyarrow'")
+
+    con = duckdb.connect(database)
+    con.execute(f"SET memory_limit = '{memory_limit}'")
+    con.execute(f"SET temp_directory = '{temp_directory or tempfile.gettempdir()}'")
+    con.execute("SET preserve_insertion_order = true")
+    if threads:
+        con.execute(f"SET threads = {int(threads)}")
+
+    con.create_function(
+        'py_strip_title', _strip_title, ['VARCHAR'], 'VARCHAR', type='arrow'
+    )
+    return con
+
+
+def _strip_title(values):
+    """Vectorized str.strip().str.title() that matches Python exactly.
+
+    Arrow's kernels agree with Python on ASCII text; batches with other
+    characters (or the ASCII separators Python also strips) fall back to
+    Python so the result is identical to the pandas backend.
+    """
+    ascii_only = pc.all(pc.string_is_ascii(values)).as_py()
+    has_separators = pc.any(
+        pc.match_substring_regex(values, '[\x1c-\x1f]')
+    ).as_py()
+
+    if ascii_only is not False and not has_separators:
+        return pc.utf8_title(pc.ascii_trim_whitespace(values))
+
+    return pa.array(
+        [None if v is None else v.strip().title() for v in values.to_pylist()],
+        type=pa.string()
+    )
+
+
+def _columns(con, table):
+    """Return [(name, duckdb_type)] for a table, without the row column."""
+    rows = con.execute(f'DESCRIBE {table}').fetchall()
+    return [(name, dtype) for name, dtype, *_ in rows if name != ROW_COL]
+
+
+def _is_text(dtype):
+    return dtype == 'VARCHAR'
+
+
+def _is_numeric(dtype):
+    return dtype in (
+        'TINYINT', 'SMALLINT', 'INTEGER', 'BIGINT', 'HUGEINT',
+        'UTINYINT', 'USMALLINT', 'UINTEGER', 'UBIGINT',
+        'FLOAT', 'DOUBLE'
+    ) or dtype.startswith('DECIMAL')
+
+
+def _quote(name):
+    return '"' + name.replace('"', '""') + '"'
+
+
+def _replace(con, old, new, select_sql):
+    """Materialize select_sql as table `new` and drop `old`."""
+    con.execute(f'CREATE OR REPLACE TABLE {new} AS {select_sql}')
+    if old != new:
+        con.execute(f'DROP TABLE IF EXISTS {old}')
+    return new
+
+
+def _count(con, table):
+    return con.execute(f'SELECT COUNT(*) FROM {table}').fetchone()[0]
+
+
+# ============================================
+# LOAD
+# ============================================
+
+def load_data(con, filepath, table='stage_raw', **read_options):
+    """Load a CSV into a DuckDB table, numbering rows in file order.
+
+    Type detection is limited to the types pandas infers (int, float,
+    text), so e.g. Yes/No columns stay text instead of becoming BOOLEAN.
+    """
+    options = ''.join(f", {k} = '{v}'" for k, v in read_options.items())
+    con.execute(
+        f"CREATE OR REPLACE TABLE {table}_src AS "
+        f"SELECT * FROM read_csv('{filepath}', header = true, "
+        f"auto_type_candidates = ['BIGINT', 'DOUBLE', 'VARCHAR']{options})"
+    )
+    _replace(con, f'{table}_src', table,
+             f'SELECT rowid AS {ROW_COL}, * FROM {table}_src')
+
+    n_cols = len(_columns(con, table))
+    log('loaded', "  Loaded: {path}\n  Shape: {rows} rows, {columns} columns",
+        path=filepath, rows=_count(con, table), columns=n_cols)
+    return table
+
+
+# ============================================
+# STUDENT PIPELINE STAGES
+# ============================================
+
+def handle_missing(con, table):
+    """Fill missing values: mode for text, median for numeric columns.
+
+    Null counts and medians for all columns come from one scan; modes need
+    one grouped scan per text column that has nulls. Ties in the mode go
+    to the smallest value, as in pandas' mode()[0].
+    """
+    columns = _columns(con, table)
+    null_exprs = ', '.join(
+        f'COUNT(*) - COUNT({_quote(c)})' for c, _ in columns
+    )
+    null_counts = dict(zip(
+        [c for c, _ in columns], con.execute(f'SELECT {null_exprs} FROM {table}').fetchone()
+    ))
+
+    fill_values = {}
+    for col, dtype in columns:
+        if null_counts[col] > 0 and _is_text(dtype):
+            q = _quote(col)
+            fill_values[col] = con.execute(
+                f'SELECT {q} FROM {table} WHERE {q} IS NOT NULL '
+                f'GROUP BY {q} ORDER BY COUNT(*) DESC, {q} LIMIT 1'
+            ).fetchone()[0]
+            log('filled', "  Filled '{column}' nulls with mode: '{value}'",
+                column=col, how='mode', value=fill_values[col], rows=null_counts[col])
+
+    numeric_with_nulls = [c for c, t in columns if _is_numeric(t) and null_counts[c] > 0]
+    if numeric_with_nulls:
+        median_exprs = ', '.join(f'MEDIAN({_quote(c)})::DOUBLE' for c in numeric_with_nulls)
+        medians = con.execute(f'SELECT {median_exprs} FROM {table}').fetchone()
+        for col, fill_value in zip(numeric_with_nulls, medians):
+            fill_values[col] = fill_value
+            log('filled', "  Filled '{column}' nulls with median: {value}",
+                column=col, how='median', value=fill_value, rows=null_counts[col])
+
+    select, params = [], []
+    for col, dtype in columns:
+        q = _quote(col)
+        if col not in fill_values:
+            select.append(q)
+        elif _is_text(dtype):
+            select.append(f'COALESCE({q}, ?) AS {q}')
+            params.append(fill_values[col])
+        else:
+            # pandas columns with nulls are float64
+            select.append(f'COALESCE({q}::DOUBLE, ?) AS {q}')
+            params.append(fill_values[col])
+
+    new = f'{table}_filled'
+    con.execute(
+        f'CREATE OR REPLACE TABLE {new} AS '
+        f'SELECT {ROW_COL}, {", ".join(select)} FROM {table}',
+        params
+    )
+    con.execute(f'DROP TABLE {table}')
+
+    if enabled('debug'):
+        remaining = sum(con.execute(
+            f'SELECT {null_exprs} FROM {new}'
+        ).fetchone())
+        log('remaining_nulls', "  Remaining nulls: {count}", 'debug', count=remaining)
+    return new
+
+
+def standardize_text(con, table):
+    """Strip whitespace and apply title case to text columns."""
+    columns = _columns(con, table)
+    text_cols = [c for c, t in columns if _is_text(t)]
+    select = [
+        f'py_strip_title({_quote(c)}) AS {_quote(c)}' if _is_text(t) else _quote(c)
+        for c, t in columns
+    ]
+    new = _replace(con, table, f'{table}_std',
+                   f'SELECT {ROW_COL}, {", ".join(select)} FROM {table}')
+    log('standardized', "  Standardized {count} text columns",
+        count=len(text_cols), columns=text_cols)
+    return new
+
+
+def _dedupe_sql(con, table):
+    """Keep the first occurrence of each distinct row, in source order."""
+    cols = ', '.join(_quote(c) for c, _ in _columns(con, table))
+    return (f'SELECT MIN({ROW_COL}) AS {ROW_COL}, {cols} FROM {table} '
+            f'GROUP BY ALL ORDER BY {ROW_COL}')
+
+
+def remove_duplicates(con, table):
+    """Remove exact duplicate rows."""
+    before = _count(con, table)
+    new = _replace(con, table, f'{table}_dedup', _dedupe_sql(con, table))
+    after = _count(con, new)
+    log('rows_dropped', "  Removed {rows} duplicates ({before} -> {after} rows)",
+        rows=before - after, before=before, after=after, reason='duplicate')
+    return new
+
+
+def add_features(con, table):
+    """Engineer new columns from existing data."""
+    new = _replace(con, table, f'{table}_feat', f'''
+        SELECT *,
+            CASE "Motivation_Level" WHEN 'Low' THEN 1 WHEN 'Medium' THEN 2
+                                    WHEN 'High' THEN 3 END AS "Motivation_Score",
+            CASE "Internet_Access" WHEN 'Yes' THEN 1 WHEN 'No' THEN 0 END AS "Has_Internet",
+            CASE WHEN "Exam_Score" >= 65 THEN 'Pass' ELSE 'Fail' END AS "Pass_Fail",
+            CASE WHEN "Exam_Score" > 0 AND "Exam_Score" <= 60 THEN 'Very Low'
+                 WHEN "Exam_Score" > 60 AND "Exam_Score" <= 70 THEN 'Low'
+                 WHEN "Exam_Score" > 70 AND "Exam_Score" <= 80 THEN 'Medium'
+                 WHEN "Exam_Score" > 80 AND "Exam_Score" <= 90 THEN 'High'
+                 WHEN "Exam_Score" > 90 AND "Exam_Score" <= 101 THEN 'Very High'
+            END AS "Score_Band"
+        FROM {table}
+    ''')
+    new_cols = ['Motivation_Score', 'Has_Internet', 'Pass_Fail', 'Score_Band']
+    log('added', "  Added {count} features: {columns}", count=len(new_cols), columns=new_cols)
+    return new
+
+
+# ============================================
+# RETAIL PIPELINE STAGES
+# ============================================
+
+def clean_data(con, table):
+    """Fix all data quality issues (retail), same rules as pipelines/retail.json."""
+    log('clean', "\n=== DATA CLEANING ===")
+    original = _count(con, table)
+
+    steps = [
+        ('"CustomerID" IS NOT NULL', 'rows with null CustomerID'),
+        ('"Description" IS NOT NULL', 'rows with null Description'),
+        ('"Quantity" > 0', 'rows with negative/zero quantity'),
+        ('"UnitPrice" > 0', 'rows with zero/negative price'),
+    ]
+    counts = con.execute(
+        'SELECT ' + ', '.join(
+            f'COUNT(*) FILTER (WHERE ' + ' AND '.join(cond for cond, _ in steps[:i + 1]) + ')'
+            for i in range(len(steps))
+        ) + f' FROM {table}'
+    ).fetchone()
+
+    before = original
+    for (cond, label), after in zip(steps, counts):
+        verb = 'Dropped' if 'null' in label else 'Removed'
+        log('rows_dropped', f"  {verb} {{rows:,}} {label}", rows=before - after, keep=cond)
+        before = after
+
+    where = ' AND '.join(cond for cond, _ in steps)
+    _replace(con, table, f'{table}_valid', f'SELECT * FROM {table} WHERE {where}')
+    table = f'{table}_valid'
+
+    deduped = _replace(con, table, f'{table}_dedup', _dedupe_sql(con, table))
+    after = _count(con, deduped)
+    log('rows_dropped', "  Removed {rows:,} exact duplicates",
+        rows=before - after, reason='duplicate')
+
+    columns = _columns(con, deduped)
+    select = [
+        f'py_strip_title({_quote(c)}) AS {_quote(c)}' if c == 'Description' else _quote(c)
+        for c, _ in columns
+    ]
+    new = _replace(con, deduped, f'{table}_clean',
+                   f'SELECT {ROW_COL}, {", ".join(select)} FROM {deduped}')
+    log('standardized', "  Standardized descriptions to title case", columns=['Description'])
+
+    log('cleaned', "\n  CLEANING SUMMARY: {before:,} -> {rows:,} rows ({removed:,} removed)",
+        before=original, rows=after, removed=original - after)
+    return new
+
+
+def transform_data(con, table):
+    """Add calculated fields and parse dates (retail)."""
+    log('transform', "\n=== DATA TRANSFORMATION ===")
+    dtype = dict(_columns(con, table))['InvoiceDate']
+    if dtype == 'VARCHAR':
+        parsed = "strptime(\"InvoiceDate\", ['%m/%d/%Y %H:%M', '%Y-%m-%d %H:%M:%S'])"
+    else:
+        parsed = '"InvoiceDate"::TIMESTAMP'
+
+    new = _replace(con, table, f'{table}_tf', f'''
+        WITH parsed AS (
+            SELECT * REPLACE ({parsed} AS "InvoiceDate") FROM {table}
+        )
+        SELECT * REPLACE (CAST("CustomerID" AS BIGINT) AS "CustomerID"),
+            "Quantity" * "UnitPrice" AS "TotalAmount",
+            year("InvoiceDate") AS "Year",
+            month("InvoiceDate") AS "Month",
+            dayname("InvoiceDate") AS "DayOfWeek",
+            hour("InvoiceDate") AS "Hour",
+            CASE WHEN "Country" = 'United Kingdom' THEN 'UK'
+                 ELSE 'International' END AS "Is_UK"
+        FROM parsed
+    ''')
+
+    log('added', "  Parsed InvoiceDate, added TotalAmount, Year, Month, DayOfWeek, Hour, Is_UK",
+        columns=['TotalAmount', 'Year', 'Month', 'DayOfWeek', 'Hour', 'Is_UK'])
+    log('transformed', "\n  Final shape: {rows:,} rows, {columns} columns",
+        rows=_count(con, new), columns=len(_columns(con, new)))
+    return new
+
+
+# ============================================
+# RESULTS
+# ============================================
+
+def to_pandas(con, table):
+    """Fetch a stage table as a DataFrame shaped like the pandas backend."""
+    df = con.execute(
+        f'SELECT * EXCLUDE ({ROW_COL}) FROM {table} ORDER BY {ROW_COL}'
+    ).df()
+    if 'Score_Band' in df.columns:
+        df['Score_Band'] = pd.Categorical(
+            df['Score_Band'], categories=SCORE_BANDS, ordered=True
+        )
+    return df
+
+
+def write_output(con, table, output_path):
+    """Stream a stage table to Parquet without materializing it in Python."""
+    con.execute(
+        f"COPY (SELECT * EXCLUDE ({ROW_COL}) FROM {table} ORDER BY {ROW_COL}) "
+        f"TO '{output_path}' (FORMAT PARQUET)"
+    )
+    echo(f"  Wrote {output_path}")
+    return output_path
+
+
+def run_pipeline_duckdb(filepath, output_path=None, **connect_options):
+    """Student cleaning pipeline on DuckDB.
+
+    Returns a DataFrame, or writes Parquet to output_path and returns the
+    path when the result should stay out of memory.
+    """
+    con = connect(**connect_options)
+    table = load_data(con, filepath)
+
+    echo("\n--- CLEANING ---")
+    table = handle_missing(con, table)
+    table = standardize_text(con, table)
+    table = remove_duplicates(con, table)
+
+    echo("\n--- ENRICHMENT ---")
+    table = add_features(con, table)
+
+    result = write_output(con, table, output_path) if output_path else to_pandas(con, table)
+    con.close()
+    return result
+
+
+def run_retail_pipeline_duckdb(filepath, output_path=None, **connect_options):
+    """Retail ETL (clean + transform) on DuckDB; see run_pipeline_duckdb."""
+    con = connect(**connect_options)
+    table = load_data(con, filepath, encoding='latin-1')
+    table = clean_data(con, table)
+    table = transform_data(con, table)
+
+    result = write_output(con, table, output_path) if output_path else to_pandas(con, table)
+    con.close()
+    return result
+
+
+# ============================================
+# BACKEND COMPARISON
+# ============================================
+
+def compare_backends(n_rows=20_000, seed=0):
+    """Run both backends on synthetic data and assert identical results."""
+    from pipeline_engine import apply_stages, load_config, load_source
+    from synthetic_data import make_student_data, make_retail_data
+
+    with tempfile.TemporaryDirectory() as tmp:
+        student_csv = os.path.join(tmp, 'students.csv')
+        retail_csv = os.path.join(tmp, 'retail.csv')
+        make_student_data(n_rows, seed).to_csv(student_csv, index=False)
+        make_retail_data(n_rows, seed).to_csv(retail_csv, index=False, encoding='latin1')
+
+        config = load_config('students')
+        with contextlib.redirect_stdout(io.StringIO()):
+            expected = apply_stages(load_source(student_csv, config['source']), config)
+            actual = run_pipeline_duckdb(student_csv)
+        pd.testing.assert_frame_equal(
+            actual, expected.reset_index(drop=True), check_dtype=False
+        )
+        print(f"  student pipeline: {len(actual):,} rows match")
+
+        config = load_config('retail')
+        with contextlib.redirect_stdout(io.StringIO()):
+            expected = apply_stages(load_source(retail_csv, config['source']), config)
+            actual = run_retail_pipeline_duckdb(retail_csv)
+        pd.testing.assert_frame_equal(
+            actual, expected.reset_index(drop=True), check_dtype=False
+        )
+        print(f"  retail pipeline: {len(actual):,} rows match")
+
+
+if __name__ == '__main__':
+    print("=== DUCKDB vs PANDAS BACKEND ===")
+    for seed in range(3):
+        compare_backends(seed=seed)
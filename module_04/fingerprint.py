@@ -0,0 +1,387 @@
+import hashlib
+import io
+import json
+import os
+
+from sqlalchemy import inspect, text
+
+from compressed_io import codec_for
+
+# Source files are hashed in line-aligned partitions of about this size;
+# only partitions whose hash changed are reloaded
+PARTITION_BYTES = 64 * 1024 * 1024
+
+# Column that records which source partition each loaded row came from
+PARTITION_COLUMN = '_source_partition'
+
+MANIFEST_TABLE = 'load_manifest'
+
+
+# ============================================
+# STEP 1: FINGERPRINT THE SOURCE
+# ============================================
+
+def _digest():
+    return hashlib.blake2b(digest_size=16)
+
+
+def fingerprint_file(filepath, partition_bytes=PARTITION_BYTES, block_bytes=1 << 20):
+    """Size, mtime and content hashes of a CSV in one streaming read.
+
+    The body after the header is cut into partitions of about
+    partition_bytes, each ending on a newline, and every partition gets its
+    own hash and row count. Rows are counted as lines, so quoted fields
+    containing newlines are not supported. Compressed files are one
+    partition (any change reloads them in full).
+    """
+    stat = os.stat(filepath)
+    if codec_for(filepath):
+        return _fingerprint_whole(filepath, stat, partition_bytes, block_bytes)
+
+    content = _digest()
+    partitions = []
+
+    with open(filepath, 'rb') as f:
+        header = f.readline()
+        content.update(header)
+        start = f.tell()
+        part, part_size, part_rows = _digest(), 0, 0
+
+        while True:
+            block = f.read(block_bytes)
+            if not block:
+                break
+            content.update(block)
+
+            while block:
+                need = max(partition_bytes - part_size, 1)
+                cut = block.find(b'\n', need - 1) if len(block) >= need else -1
+                piece = block if cut == -1 else block[:cut + 1]
+                part.update(piece)
+                part_size += len(piece)
+                part_rows += piece.count(b'\n')
+                block = block[len(piece):]
+
+                if cut != -1:
+                    partitions.append({'start': start, 'end': start + part_size,
+                                       'rows': part_rows, 'hash': part.hexdigest()})
+                    start += part_size
+                    part, part_size, part_rows = _digest(), 0, 0
+
+        if part_size:
+            # Last line without a trailing newline is still a row
+            f.seek(-1, os.SEEK_END)
+            if f.read(1) != b'\n':
+                part_rows += 1
+            partitions.append({'start': start, 'end': start + part_size,
+                               'rows': part_rows, 'hash': part.hexdigest()})
+
+    return {
+        'size': stat.st_size,
+        'mtime_ns': stat.st_mtime_ns,
+        'header_hash': _digest_bytes(header),
+        'content_hash': content.hexdigest(),
+        'partition_bytes': partition_bytes,
+        'partitions': partitions,
+    }
+
+
+def _fingerprint_whole(filepath, stat, partition_bytes, block_bytes):
+    content = _digest()
+    with open(filepath, 'rb') as f:
+        for block in iter(lambda: f.read(block_bytes), b''):
+            content.update(block)
+    digest = content.hexdigest()
+    return {
+        'size': stat.st_size,
+        'mtime_ns': stat.st_mtime_ns,
+        'header_hash': digest,
+        'content_hash': digest,
+        'partition_bytes': partition_bytes,
+        'partitions': [{'start': 0, 'end': stat.st_size, 'rows': None, 'hash': digest}],
+    }
+
+
+def _digest_bytes(data):
+    digest = _digest()
+    digest.update(data)
+    return digest.hexdigest()
+
+
+def pipeline_version(*sources):
+    """Hash of the pipeline's source files (paths or imported modules).
+
+    Any code change in the pipeline gives a new version, which forces a
+    full reload.
+    """
+    digest = _digest()
+    for source in sources:
+        path = getattr(source, '__file__', source)
+        with open(path, 'rb') as f:
+            digest.update(f.read())
+    return digest.hexdigest()
+
+
+# ============================================
+# STEP 2: RUN MANIFEST
+# ============================================
+
+def ensure_manifest_table(engine):
+    """Create the load manifest table in the target database."""
+    with engine.begin() as conn:
+        conn.execute(text(f'''
+            CREATE TABLE IF NOT EXISTS {MANIFEST_TABLE} (
+                run_id            SERIAL PRIMARY KEY,
+                table_name        TEXT NOT NULL,
+                source_path       TEXT NOT NULL,
+                file_size         BIGINT NOT NULL,
+                mtime_ns          BIGINT NOT NULL,
+                header_hash       TEXT NOT NULL,
+                content_hash      TEXT NOT NULL,
+                pipeline_version  TEXT NOT NULL,
+                partition_bytes   BIGINT NOT NULL,
+                partitions        JSONB NOT NULL,
+                action            TEXT NOT NULL,
+                partitions_loaded INTEGER NOT NULL,
+                rows_loaded       BIGINT NOT NULL,
+                loaded_at         TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                fill_values       JSONB
+            )
+        '''))
+        # Manifests created before fill values were recorded
+        conn.execute(text(f'ALTER TABLE {MANIFEST_TABLE} '
+                          f'ADD COLUMN IF NOT EXISTS fill_values JSONB'))
+
+
+def last_manifest(engine, table_name):
+    """Most recent successful run for table_name, or None."""
+    with engine.connect() as conn:
+        row = conn.execute(
+            text(f'SELECT * FROM {MANIFEST_TABLE} WHERE table_name = :t '
+                 f'ORDER BY run_id DESC LIMIT 1'),
+            {'t': table_name}
+        ).mappings().first()
+    return dict(row) if row else None
+
+
+def _plain(value):
+    return value.item() if hasattr(value, 'item') else str(value)
+
+
+def record_load(engine, table_name, filepath, plan, rows_loaded=0):
+    """Append this run to the manifest. Call only after the load succeeded.
+
+    plan['fill_values'] (the fill values the loaded rows were imputed
+    with) is recorded too, so a later partial reload can reuse them.
+    """
+    fp = plan['fingerprint']
+    with engine.begin() as conn:
+        conn.execute(
+            text(f'''
+                INSERT INTO {MANIFEST_TABLE} (
+                    table_name, source_path, file_size, mtime_ns, header_hash,
+                    content_hash, pipeline_version, partition_bytes, partitions,
+                    action, partitions_loaded, rows_loaded, fill_values
+                ) VALUES (
+                    :table_name, :source_path, :file_size, :mtime_ns, :header_hash,
+                    :content_hash, :version, :partition_bytes, CAST(:partitions AS JSONB),
+                    :action, :partitions_loaded, :rows_loaded, CAST(:fill_values AS JSONB)
+                )
+            '''),
+            {
+                'table_name': table_name,
+                'source_path': os.path.abspath(filepath),
+                'file_size': fp['size'],
+                'mtime_ns': fp['mtime_ns'],
+                'header_hash': fp['header_hash'],
+                'content_hash': fp['content_hash'],
+                'version': plan['version'],
+                'partition_bytes': fp['partition_bytes'],
+                'partitions': json.dumps(fp['partitions']),
+                'action': plan['action'],
+                'partitions_loaded': len(plan['changed']),
+                'rows_loaded': int(rows_loaded),
+                'fill_values': json.dumps(plan.get('fill_values'), default=_plain),
+            }
+        )
+
+
+# ============================================
+# STEP 3: DECIDE WHAT TO LOAD
+# ============================================
+
+def plan_load(engine, table_name, filepath, version, partition_bytes=PARTITION_BYTES,
+              force=False):
+    """Compare the source with the last successful load of table_name.
+
+    Returns a plan dict with action 'skip', 'partial' or 'full', the
+    partitions to (re)load in 'changed' and the partitions that no longer
+    exist in 'removed'. Unchanged size and mtime skip without reading the
+    file; otherwise the file is hashed once and compared partition by
+    partition; a changed file whose table has no PARTITION_COLUMN is
+    reloaded in full. The fill values of the previous load are carried in
+    'fill_values' (None for a full load, which fits its own).
+
+    force=True plans a full load whatever changed (the loaders' --full),
+    still fingerprinting the file so the load can be recorded.
+    """
+    ensure_manifest_table(engine)
+    previous = last_manifest(engine, table_name)
+    table_exists = inspect(engine).has_table(table_name)
+    plan = {'version': version, 'changed': [], 'removed': [],
+            'fill_values': previous and previous['fill_values']}
+
+    if force:
+        reason = 'full reload requested'
+    elif previous is None:
+        reason = 'no previous load'
+    elif not table_exists:
+        reason = f'table {table_name} is missing'
+    elif previous['pipeline_version'] != version:
+        reason = 'pipeline version changed'
+    elif previous['partition_bytes'] != partition_bytes:
+        reason = 'partition size changed'
+    else:
+        reason = None
+
+    stat = os.stat(filepath)
+    if (reason is None and stat.st_size == previous['file_size']
+            and stat.st_mtime_ns == previous['mtime_ns']):
+        plan.update(action='skip', reason='size and mtime unchanged', fingerprint=None)
+        return plan
+
+    fp = fingerprint_file(filepath, partition_bytes)
+    plan['fingerprint'] = fp
+    all_partitions = list(range(len(fp['partitions'])))
+
+    if reason is None and fp['header_hash'] != previous['header_hash']:
+        reason = 'header changed'
+    if reason is not None:
+        return full_load(plan, reason)
+
+    if fp['content_hash'] == previous['content_hash']:
+        plan.update(action='skip', reason='content unchanged (mtime only)')
+        return plan
+
+    # Rows that weren't tagged (star fact tables, or a table written by
+    # something else) can't be replaced partition by partition
+    columns = {c['name'] for c in inspect(engine).get_columns(table_name)}
+    if PARTITION_COLUMN not in columns:
+        return full_load(plan, f'table {table_name} has no {PARTITION_COLUMN} column')
+
+    old = previous['partitions']
+    changed = [i for i, p in enumerate(fp['partitions'])
+               if i >= len(old) or old[i]['hash'] != p['hash']]
+    removed = list(range(len(fp['partitions']), len(old)))
+
+    if not changed or len(changed) == len(all_partitions):
+        full_load(plan, 'every partition changed')
+    else:
+        plan.update(action='partial', changed=changed, removed=removed,
+                     reason=f'{len(changed)} of {len(all_partitions)} partitions changed')
+    return plan
+
+
+def full_load(plan, reason):
+    """Turn plan into a full load of every partition (also used by the
+    loaders when a partial reload can't reproduce a full one)."""
+    plan.update(action='full', reason=reason, removed=[], fill_values=None,
+                changed=list(range(len(plan['fingerprint']['partitions']))))
+    return plan
+
+
+def print_plan(plan):
+    print(f"  Load plan: {plan['action'].upper()} ({plan['reason']})")
+    if plan['action'] == 'partial':
+        print(f"    Reloading partitions: {plan['changed']}")
+        if plan['removed']:
+            print(f"    Dropping partitions:  {plan['removed']}")
+
+
+# ============================================
+# STEP 4: READ AND TAG PARTITIONS
+# ============================================
+
+class PartitionSlice(io.BytesIO):
+    """In-memory CSV of selected partitions, accepted by pd.read_csv."""
+
+    def __init__(self, data, label):
+        super().__init__(data)
+        self.label = label
+
+    def __str__(self):
+        return self.label
+
+
+def read_partitions(filepath, plan):
+    """Header plus the changed partitions' bytes, as one CSV file object."""
+    parts = plan['fingerprint']['partitions']
+    with open(filepath, 'rb') as f:
+        chunks = [f.readline()]
+        for i in plan['changed']:
+            f.seek(parts[i]['start'])
+            chunks.append(f.read(parts[i]['end'] - parts[i]['start']))
+    return PartitionSlice(b''.join(chunks), f"{filepath} [partitions {plan['changed']}]")
+
+
+def tag_partitions(df, plan):
+    """Add PARTITION_COLUMN from each row's original position.
+
+    Relies on df keeping the RangeIndex that read_csv assigned (the pandas
+    pipelines filter rows but never reset the index).
+    """
+    import numpy as np
+
+    parts = plan['fingerprint']['partitions']
+    ids = np.asarray(plan['changed'])
+    df = df.copy()
+    if len(ids) == 1:
+        df[PARTITION_COLUMN] = ids[0]
+        return df
+    ends = np.cumsum([parts[i]['rows'] for i in plan['changed']])
+    df[PARTITION_COLUMN] = ids[np.searchsorted(ends, df.index.to_numpy(), side='right')]
+    return df
+
+
+def delete_partitions(conn, table_name, partitions):
+    """Delete previously loaded rows of the given partitions.
+
+    conn is a Connection in an open transaction: the rows that replace
+    them are loaded before it commits, so readers never see the
+    partitions missing or loaded twice.
+    """
+    if not partitions:
+        return 0
+    result = conn.execute(
+        text(f'DELETE FROM {table_name} WHERE "{PARTITION_COLUMN}" = ANY(:p)'),
+        {'p': [int(p) for p in partitions]}
+    )
+    print(f"  Deleted {result.rowcount:,} rows from {len(partitions)} stale partitions")
+    return result.rowcount
+
+
+def drop_kept_duplicates(conn, table_name, df):
+    """df without the rows that equal a row already in table_name.
+
+    A full load drops duplicate rows across the whole file; a partial
+    reload only sees its partitions, so its rows are also checked against
+    the rows of the kept partitions (call after delete_partitions, on the
+    same connection). Rows are compared in the database by the md5 of
+    their text form, so both sides have the table's column types.
+    """
+    import numpy as np
+
+    from pg_copy import psql_insert_copy
+
+    columns = ', '.join(f'"{c}"' for c in df.columns if c != PARTITION_COLUMN)
+    conn.execute(text(f'CREATE TEMP TABLE _reload (LIKE {table_name}) ON COMMIT DROP'))
+    conn.execute(text('ALTER TABLE _reload ADD COLUMN _position BIGINT'))
+    df.assign(_position=np.arange(len(df))).to_sql(
+        '_reload', conn, if_exists='append', index=False, method=psql_insert_copy)
+    duplicates = conn.execute(text(f'''
+        SELECT _position FROM _reload
+        WHERE md5(ROW({columns})::text) IN (SELECT md5(ROW({columns})::text) FROM {table_name})
+    ''')).scalars().all()
+    conn.execute(text('DROP TABLE _reload'))
+    print(f"  Dropped {len(duplicates):,} reloaded rows already in kept partitions")
+    return df.drop(index=df.index[duplicates]) if duplicates else df
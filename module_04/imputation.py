@@ -0,0 +1,245 @@
+import json
+from collections import Counter
+
+import numpy as np
+import pandas as pd
+
+
+# ============================================
+# MERGEABLE QUANTILE SKETCH
+# ============================================
+
+class QuantileSketch:
+    """Compact, mergeable quantile sketch (KLL-style compactors).
+
+    Level h holds items that each stand for 2**h original values. When a
+    level fills up it is sorted and every other item is promoted one level
+    up, so memory stays around k * log2(n / k) items while rank error stays
+    within roughly 1/k. Sketches built on separate batches merge into the
+    sketch of the combined data.
+    """
+
+    def __init__(self, k=2048, seed=0):
+        self.k = k
+        self.levels = [np.empty(0)]
+        self.count = 0
+        self._rng = np.random.default_rng(seed)
+
+    def update(self, values):
+        """Add an array of values (nulls must already be dropped)."""
+        values = np.asarray(values, dtype=float)
+        self.count += len(values)
+        self.levels[0] = np.concatenate([self.levels[0], values])
+        self._compact()
+        return self
+
+    def merge(self, other):
+        """Fold another sketch into this one."""
+        while len(self.levels) < len(other.levels):
+            self.levels.append(np.empty(0))
+        for h, items in enumerate(other.levels):
+            self.levels[h] = np.concatenate([self.levels[h], items])
+        self.count += other.count
+        self._compact()
+        return self
+
+    def _compact(self):
+        h = 0
+        while h < len(self.levels):
+            if len(self.levels[h]) > self.k:
+                items = np.sort(self.levels[h])
+                if len(items) % 2:
+                    # Keep one item back so the promoted half is exact
+                    keep, items = items[-1:], items[:-1]
+                else:
+                    keep = np.empty(0)
+                promoted = items[self._rng.integers(0, 2)::2]
+                self.levels[h] = keep
+                if h + 1 == len(self.levels):
+                    self.levels.append(np.empty(0))
+                self.levels[h + 1] = np.concatenate([self.levels[h + 1], promoted])
+            h += 1
+
+    def quantile(self, q):
+        """Approximate q-quantile, interpolated like pandas for exact data."""
+        if self.count == 0:
+            return np.nan
+        items = np.concatenate(self.levels)
+        weights = np.concatenate([
+            np.full(len(level), 2 ** h) for h, level in enumerate(self.levels)
+        ])
+        return _weighted_quantile(items, weights, q)
+
+    def __len__(self):
+        return self.count
+
+    def to_dict(self):
+        return {'k': self.k, 'count': self.count,
+                'levels': [level.tolist() for level in self.levels]}
+
+    @classmethod
+    def from_dict(cls, data):
+        sketch = cls(k=data['k'])
+        sketch.count = data['count']
+        sketch.levels = [np.asarray(level, dtype=float) for level in data['levels']]
+        return sketch
+
+
+def _weighted_quantile(values, weights, q):
+    """Linear-interpolated quantile of values repeated `weights` times.
+
+    Matches Series.quantile / median on the expanded data.
+    """
+    order = np.argsort(values, kind='stable')
+    values, weights = values[order], weights[order]
+    cum = np.cumsum(weights)
+    total = cum[-1]
+
+    pos = q * (total - 1)
+    lo, hi = int(np.floor(pos)), int(np.ceil(pos))
+    v_lo = values[np.searchsorted(cum, lo, side='right')]
+    v_hi = values[np.searchsorted(cum, hi, side='right')]
+    if pos - lo == 0.5:
+        # Same rounding as numpy's median of the two middle values
+        return float((v_lo + v_hi) / 2)
+    return float(v_lo + (v_hi - v_lo) * (pos - lo))
+
+
+# ============================================
+# FIT FILL STATISTICS IN ONE PASS
+# ============================================
+
+def new_fill_state(exact=True, sketch_k=2048):
+    """Empty accumulator for fit_batch."""
+    return {
+        'exact': exact,
+        'sketch_k': sketch_k,
+        'rows': 0,
+        'nulls': Counter(),
+        'categorical': {},
+        'numeric': {},
+    }
+
+
+def fit_batch(state, df):
+    """Add one batch's statistics to state.
+
+    Null counts for all columns come from one vectorized pass. Text columns
+    keep exact value counts (for the mode). Numeric columns keep exact value
+    counts when state['exact'], otherwise a QuantileSketch. Both merge across
+    batches, so a file can be fitted chunk by chunk.
+    """
+    state['rows'] += len(df)
+    state['nulls'].update({k: int(v) for k, v in df.isnull().sum().items() if v})
+
+    for col in df.select_dtypes(include='object').columns:
+        counts = df[col].value_counts(dropna=True)
+        acc = state['categorical'].setdefault(col, Counter())
+        acc.update(dict(zip(counts.index, counts.values.tolist())))
+
+    for col in df.select_dtypes(include='number').columns:
+        values = df[col].to_numpy(dtype=float)
+        values = values[~np.isnan(values)]
+        if state['exact']:
+            uniq, counts = np.unique(values, return_counts=True)
+            acc = state['numeric'].setdefault(col, Counter())
+            acc.update(dict(zip(uniq.tolist(), counts.tolist())))
+        else:
+            sketch = state['numeric'].get(col)
+            if sketch is None:
+                sketch = state['numeric'][col] = QuantileSketch(state['sketch_k'])
+            sketch.update(values)
+    return state
+
+
+def merge_fill_states(a, b):
+    """Combine two states fitted on different batches."""
+    merged = new_fill_state(a['exact'], a['sketch_k'])
+    merged['rows'] = a['rows'] + b['rows']
+    merged['nulls'] = a['nulls'] + b['nulls']
+    for state in (a, b):
+        for col, counts in state['categorical'].items():
+            merged['categorical'].setdefault(col, Counter()).update(counts)
+        for col, acc in state['numeric'].items():
+            if merged['exact']:
+                merged['numeric'].setdefault(col, Counter()).update(acc)
+            elif col in merged['numeric']:
+                merged['numeric'][col].merge(acc)
+            else:
+                merged['numeric'][col] = QuantileSketch.from_dict(acc.to_dict())
+    return merged
+
+
+def _mode(counts):
+    """Most frequent value; ties go to the smallest, like mode()[0]."""
+    best = max(counts.values())
+    return min(value for value, n in counts.items() if n == best)
+
+
+def _median(acc):
+    if isinstance(acc, QuantileSketch):
+        return acc.quantile(0.5)
+    values = np.fromiter(acc.keys(), dtype=float, count=len(acc))
+    weights = np.fromiter(acc.values(), dtype=np.int64, count=len(acc))
+    return _weighted_quantile(values, weights, 0.5)
+
+
+def finalize_fill_values(state, all_columns=False):
+    """Turn fitted statistics into {column: fill value}.
+
+    By default only columns that had nulls get a fill value, matching
+    handle_missing. all_columns=True fits every column, for fill values
+    that will be persisted and applied to later batches.
+    """
+    fill_values = {}
+    for col, counts in state['categorical'].items():
+        if (all_columns or state['nulls'].get(col)) and counts:
+            fill_values[col] = _mode(counts)
+    for col, acc in state['numeric'].items():
+        if (all_columns or state['nulls'].get(col)) and len(acc):
+            fill_values[col] = _median(acc)
+    return fill_values
+
+
+def fit_fill_values(source, exact=True, chunksize=None, all_columns=False,
+                    **read_options):
+    """Fit fill values from a DataFrame or a CSV path in a single pass.
+
+    With a path and chunksize, the file is streamed so it never has to fit
+    in memory.
+    """
+    state = new_fill_state(exact)
+    if isinstance(source, pd.DataFrame):
+        fit_batch(state, source)
+    elif chunksize:
+        for chunk in pd.read_csv(source, chunksize=chunksize, **read_options):
+            fit_batch(state, chunk)
+    else:
+        fit_batch(state, pd.read_csv(source, **read_options))
+    return finalize_fill_values(state, all_columns)
+
+
+# ============================================
+# APPLY AND PERSIST
+# ============================================
+
+def apply_fill_values(df, fill_values):
+    """Fill nulls with previously fitted values (no statistics recomputed)."""
+    present = {col: value for col, value in fill_values.items() if col in df.columns}
+    return df.fillna(value=present)
+
+
+def save_fill_values(fill_values, path):
+    """Persist fitted fill values as JSON so later batches reuse them."""
+    serializable = {
+        col: value.item() if isinstance(value, np.generic) else value
+        for col, value in fill_values.items()
+    }
+    with open(path, 'w') as f:
+        json.dump(serializable, f, indent=2)
+
+
+def load_fill_values(path):
+    """Load fill values written by save_fill_values."""
+    with open(path) as f:
+        return json.load(f)
@@ -0,0 +1,393 @@
+import contextlib
+import io
+import os
+import pickle
+import shutil
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import zipfile
+
+import pandas as pd
+
+from compressed_io import codec_for, open_decompressed
+from pipeline_log import echo
+
+try:
+    import psutil
+except ImportError:  # optional dependency
+    psutil = None
+
+# Default memory budget for one pipeline run
+MEMORY_BUDGET = 2 * 1024 ** 3
+
+# Rows parsed to estimate the in-memory size of a row
+SAMPLE_ROWS = 10_000
+
+# A pandas stage holds its input, its output and temporaries: plan for this
+# many copies of the loaded frame (and of each chunk)
+WORKING_COPIES = 2
+
+# Assumed CSV compression ratio when the decompressed size is not stored
+COMPRESSION_RATIO = 5
+
+# Chunk sizing: halve the chunk above HIGH_WATER of the budget, grow it
+# back below LOW_WATER
+HIGH_WATER = 0.8
+LOW_WATER = 0.5
+MIN_CHUNK_ROWS = 1_000
+MAX_CHUNK_ROWS = 2_000_000
+
+# RSS sampling interval of MemoryMonitor
+POLL_SECONDS = 0.02
+
+# Only DataFrames at least this large are worth spilling
+MIN_SPILL_BYTES = 16 * 1024 ** 2
+
+MB = 1024 ** 2
+
+
+# ============================================
+# STEP 1: MEASURE
+# ============================================
+
+def rss_bytes():
+    """Resident set size of this process."""
+    if psutil is not None:
+        return psutil.Process().memory_info().rss
+    with open('/proc/self/statm') as f:
+        return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+
+
+def _text_bytes(filepath):
+    """Uncompressed size of a CSV, estimated for codecs that don't store it."""
+    codec = codec_for(filepath)
+    if codec is None:
+        return os.path.getsize(filepath)
+    if codec == 'zip':
+        with zipfile.ZipFile(filepath) as archive:
+            return sum(info.file_size for info in archive.infolist())
+    return os.path.getsize(filepath) * COMPRESSION_RATIO
+
+
+def estimate_row_bytes(filepath, sample_rows=SAMPLE_ROWS, **read_options):
+    """(in-memory bytes per row, text bytes per row) from the first rows."""
+    with open_decompressed(filepath) if codec_for(filepath) else open(filepath, 'rb') as f:
+        lines = [f.readline() for _ in range(sample_rows + 1)]
+    lines = [line for line in lines if line]
+    sample = pd.read_csv(io.BytesIO(b''.join(lines)), **read_options)
+    n = max(len(sample), 1)
+    return (sample.memory_usage(index=False, deep=True).sum() / n,
+            sum(len(line) for line in lines[1:]) / n)
+
+
+def estimate_frame_bytes(filepath, **read_options):
+    """Approximate memory of pd.read_csv(filepath) before reading it."""
+    memory_per_row, text_per_row = estimate_row_bytes(filepath, **read_options)
+    return int(_text_bytes(filepath) / max(text_per_row, 1) * memory_per_row)
+
+
+# ============================================
+# STEP 2: PLAN
+# ============================================
+
+def plan_chunk_rows(row_bytes, budget_bytes=MEMORY_BUDGET, used_bytes=None):
+    """Rows per chunk so WORKING_COPIES of a chunk fit in the unused budget."""
+    used_bytes = rss_bytes() if used_bytes is None else used_bytes
+    headroom = max(budget_bytes * HIGH_WATER - used_bytes, 0)
+    rows = int(headroom / (row_bytes * WORKING_COPIES))
+    return min(max(rows, MIN_CHUNK_ROWS), MAX_CHUNK_ROWS)
+
+
+def check_budget(filepath, budget_bytes, **read_options):
+    """Estimate what a pandas run on filepath needs and warn when it is
+    over budget_bytes (a DuckDB run with output_path keeps the result out
+    of memory altogether, see duckdb_backend.py). Returns the estimate."""
+    needed = rss_bytes() + estimate_frame_bytes(filepath, **read_options) * WORKING_COPIES
+    print(f"  [memory] budget {budget_bytes / MB:,.0f} MB, "
+          f"pandas run needs ~{needed / MB:,.0f} MB")
+    if needed > budget_bytes:
+        print("  [memory] likely over budget: the file is read in governed chunks and "
+              "waiting stage outputs are spilled to disk")
+    return needed
+
+
+# ============================================
+# STEP 3: MONITOR
+# ============================================
+
+def _write_pickle(value, path):
+    """Pickle value to path without an in-memory copy of its arrays.
+
+    Protocol 5 hands numeric buffers out of band; they are written as they
+    are, each after its length, behind the pickle itself.
+    """
+    buffers = []
+    data = pickle.dumps(value, protocol=5, buffer_callback=buffers.append)
+    with open(path, 'wb') as f:
+        for part in [data] + [b.raw() for b in buffers]:
+            f.write(part.nbytes.to_bytes(8, 'little') if isinstance(part, memoryview)
+                    else len(part).to_bytes(8, 'little'))
+            f.write(part)
+
+
+def _read_pickle(path):
+    parts = []
+    with open(path, 'rb') as f:
+        while header := f.read(8):
+            part = bytearray(int.from_bytes(header, 'little'))
+            f.readinto(part)
+            parts.append(part)
+    return pickle.loads(parts[0], buffers=parts[1:])
+
+
+class Spilled:
+    """A value pickled to disk by MemoryMonitor.spill."""
+
+    def __init__(self, path):
+        self.path = path
+
+    def load(self):
+        return _read_pickle(self.path)
+
+    def discard(self):
+        with contextlib.suppress(FileNotFoundError):
+            os.remove(self.path)
+
+
+class MemoryMonitor:
+    """Background thread sampling RSS, with the peak per stage.
+
+    stage(name) records the highest RSS seen while the stage ran and how
+    much it grew from the start. RSS is per process, so stages that run
+    concurrently (see dag.py) share their peaks. Whenever a sample is
+    above HIGH_WATER of the budget, on_high_water() is called; run_dag sets
+    it to spill() the outputs that no running node needs.
+    """
+
+    def __init__(self, budget_bytes=MEMORY_BUDGET, poll_seconds=POLL_SECONDS, spill_dir=None):
+        self.budget = budget_bytes
+        self.poll_seconds = poll_seconds
+        self.spill_dir = spill_dir
+        self.spilled_bytes = 0
+        self.current = self.peak = rss_bytes()
+        self.stages = {}
+        self._open = {}
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+        self.on_high_water = None
+
+    def sample(self):
+        """Current RSS, also recorded as a sample."""
+        rss = rss_bytes()
+        with self._lock:
+            self.current = rss
+            self.peak = max(self.peak, rss)
+            for name in self._open:
+                self._open[name] = max(self._open[name], rss)
+        return rss
+
+    def _run(self):
+        while not self._stop.wait(self.poll_seconds):
+            callback = self.on_high_water
+            if self.sample() > self.budget * HIGH_WATER and callback:
+                callback()
+
+    def start(self):
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+        if self._thread:
+            self._thread.join()
+        self.sample()
+        if self.spill_dir and os.path.isdir(self.spill_dir):
+            shutil.rmtree(self.spill_dir, ignore_errors=True)
+
+    def worth_spilling(self, value):
+        return (isinstance(value, pd.DataFrame)
+                and value.memory_usage(index=False).sum() >= MIN_SPILL_BYTES)
+
+    def spill(self, name, value):
+        """Pickle value to disk; the caller drops its reference."""
+        self.spill_dir = self.spill_dir or tempfile.mkdtemp(prefix='pipeline_spill_')
+        path = os.path.join(self.spill_dir, f'{name}.pkl')
+        _write_pickle(value, path)
+        self.spilled_bytes += os.path.getsize(path)
+        print(f"  [memory] spilled '{name}' ({os.path.getsize(path) / MB:,.0f} MB) to disk")
+        return Spilled(path)
+
+    @contextlib.contextmanager
+    def stage(self, name):
+        start = self.sample()
+        with self._lock:
+            self._open[name] = start
+        try:
+            yield
+        finally:
+            end = self.sample()
+            with self._lock:
+                peak = self._open.pop(name)
+            self.stages[name] = {'start': start, 'peak': peak, 'end': end}
+            if peak > self.budget:
+                echo(f"  [memory] '{name}' peaked at {peak / MB:,.0f} MB, "
+                      f"over the {self.budget / MB:,.0f} MB budget")
+
+
+def print_memory_report(monitor):
+    print(f"\n=== MEMORY (budget {monitor.budget / MB:,.0f} MB) ===")
+    print(f"  {'STAGE':<16} {'PEAK MB':>9} {'GROWTH MB':>10} {'% BUDGET':>9}")
+    for name, s in monitor.stages.items():
+        print(f"  {name:<16} {s['peak'] / MB:>9,.0f} {(s['peak'] - s['start']) / MB:>10,.0f} "
+              f"{s['peak'] / monitor.budget * 100:>8.0f}%")
+    print(f"  {'run':<16} {monitor.peak / MB:>9,.0f}")
+    if monitor.spilled_bytes:
+        print(f"  Spilled to disk: {monitor.spilled_bytes / MB:,.0f} MB")
+
+
+# ============================================
+# STEP 4: ADAPTIVE CHUNKED READS
+# ============================================
+
+def iter_csv_governed(filepath, budget_bytes=MEMORY_BUDGET, monitor=None, **read_options):
+    """Like compressed_io.iter_csv, with chunk sizes that follow memory.
+
+    The first chunk is sized from a sample so WORKING_COPIES of it fit in
+    the budget. After every chunk the size is halved when RSS is above
+    HIGH_WATER of the budget and doubled again (up to the plan) once it is
+    back below LOW_WATER, so a consumer that holds on to memory slows the
+    reader down instead of running out of it.
+    """
+    row_bytes, _ = estimate_row_bytes(filepath, **read_options)
+    planned = rows = plan_chunk_rows(row_bytes, budget_bytes)
+    measure = monitor.sample if monitor else rss_bytes
+
+    source = open_decompressed(filepath) if codec_for(filepath) else filepath
+    reader = pd.read_csv(source, iterator=True, **read_options)
+    try:
+        while True:
+            try:
+                chunk = reader.get_chunk(rows)
+            except StopIteration:
+                return
+            yield chunk
+            del chunk
+            used = measure()
+            if used > budget_bytes * HIGH_WATER:
+                rows = max(rows // 2, MIN_CHUNK_ROWS)
+            elif used < budget_bytes * LOW_WATER:
+                rows = min(rows * 2, planned)
+    finally:
+        reader.close()
+        if source is not filepath:
+            source.close()
+
+
+# ============================================
+# BENCHMARK
+# ============================================
+
+def _peak_of(code):
+    """Peak RSS (MB) and seconds of code run in a fresh interpreter."""
+    # VmHWM starts over at exec, unlike ru_maxrss, which keeps the parent's
+    script = ('import time\nstart = time.perf_counter()\n'
+              f'{code}\n'
+              'seconds = time.perf_counter() - start\n'
+              "hwm = [l for l in open('/proc/self/status') if l.startswith('VmHWM')][0]\n"
+              'print(int(hwm.split()[1]) / 1024, seconds)')
+    out = subprocess.run([sys.executable, '-c', script],
+                         cwd=os.path.dirname(os.path.abspath(__file__)),
+                         capture_output=True, text=True, check=True).stdout.split()
+    return float(out[-2]), float(out[-1])
+
+
+# A DAG where a large output waits while another stage runs: 'raw' is
+# only read by 'final', which also needs 'heavy'
+def _bench_raw(n_rows):
+    import numpy as np
+    return pd.DataFrame(np.random.default_rng(0).random((n_rows, 8)))
+
+
+def _bench_heavy(n_bytes, steps=32):
+    # Builds up n_bytes of working memory a piece at a time
+    import numpy as np
+    pieces = [np.sqrt(np.full(n_bytes // 8 // steps, float(i))) for i in range(steps)]
+    return float(sum(p.sum() for p in pieces))
+
+
+def _bench_final(df, heavy):
+    return float(df[0].sum() + heavy)
+
+
+def _bench_dag(n_rows, heavy_bytes, budget_bytes=None):
+    from dag import node, run_dag
+
+    nodes = [
+        node('raw', _bench_raw, n_rows=n_rows),
+        node('heavy', _bench_heavy, n_bytes=heavy_bytes),
+        node('final', _bench_final, ['raw', 'heavy']),
+    ]
+    monitor = MemoryMonitor(budget_bytes).start() if budget_bytes else None
+    with contextlib.redirect_stdout(io.StringIO()):
+        result = run_dag(nodes, targets=['final'], max_workers=1, monitor=monitor)['final']
+    if monitor:
+        monitor.stop()
+    return result
+
+
+def benchmark(n_rows=2_000_000, budget_mb=600, seed=0):
+    """Estimate vs actual frame size; a full read, fixed chunks and
+    governed chunks of the same file; and a DAG run with and without
+    spilling. Each run is in a fresh interpreter."""
+    import tempfile
+
+    from synthetic_data import make_retail_data
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'retail.csv')
+        make_retail_data(n_rows, seed).to_csv(path, index=False)
+
+        start = time.perf_counter()
+        estimate = estimate_frame_bytes(path, encoding='latin1')
+        estimate_s = time.perf_counter() - start
+        actual = pd.read_csv(path, encoding='latin1').memory_usage(index=False, deep=True).sum()
+
+        print(f"\n=== MEMORY GOVERNOR: {n_rows:,} rows, "
+              f"{os.path.getsize(path) / MB:,.0f} MB CSV, budget {budget_mb} MB ===")
+        print(f"  Estimated frame: {estimate / MB:,.0f} MB in {estimate_s * 1000:.0f} ms "
+              f"(actual {actual / MB:,.0f} MB)")
+
+        # Each case sums the revenue of the file
+        budget = budget_mb * MB
+        cases = [
+            ('full read', f"import pandas as pd\n"
+                          f"df = pd.read_csv({path!r}, encoding='latin1')\n"
+                          f"total = (df['Quantity'] * df['UnitPrice']).sum()"),
+            ('chunks of 1M rows', f"from compressed_io import iter_csv\n"
+                                  f"total = sum((c['Quantity'] * c['UnitPrice']).sum() for c in "
+                                  f"iter_csv({path!r}, chunksize=1_000_000, encoding='latin1'))"),
+            ('governed chunks', f"from memory_governor import iter_csv_governed\n"
+                                f"total = sum((c['Quantity'] * c['UnitPrice']).sum() for c in "
+                                f"iter_csv_governed({path!r}, {budget}, encoding='latin1'))"),
+        ]
+        print(f"  {'READ':<20} {'PEAK RSS MB':>12} {'SECONDS':>8}")
+        for label, code in cases:
+            peak, seconds = _peak_of(code)
+            print(f"  {label:<20} {peak:>12,.0f} {seconds:>8.2f}")
+
+    # 'raw' takes 40% of the budget and 'heavy' 60% on top of it
+    dag_rows, heavy_bytes = int(budget * 0.4) // 64, int(budget * 0.6)
+    print(f"\n  {'DAG RUN':<20} {'PEAK RSS MB':>12} {'SECONDS':>8}")
+    for label, arg in [('no governor', ''), ('governed, spills', f', {budget}')]:
+        peak, seconds = _peak_of(f"from memory_governor import _bench_dag\n"
+                                 f"_bench_dag({dag_rows}, {heavy_bytes}{arg})")
+        print(f"  {label:<20} {peak:>12,.0f} {seconds:>8.2f}")
+
+
+if __name__ == '__main__':
+    benchmark()
@@ -0,0 +1,338 @@
+import contextlib
+import io
+import os
+import sys
+import time
+import tracemalloc
+
+import numpy as np
+import pandas as pd
+
+# Shared pipeline modules live one level up, in module_04/
+MODULE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+if MODULE_DIR not in sys.path:
+    sys.path.append(MODULE_DIR)
+
+from pipeline_log import echo
+from retail_dimensions import encode_column
+
+try:
+    from scipy import sparse
+except ImportError:  # optional dependency
+    sparse = None
+
+# Cleaned rows handed to the engine at a time
+CHUNK_ROWS = 500_000
+
+# Memory for one sparse product X.T @ X. An invoice with k lines adds up
+# to k * k entries, each costing about PAIR_BYTES (row/column index, value
+# and sparsetools scratch), so invoices are batched to stay under this.
+BATCH_BYTES = 256 * 1024 ** 2
+PAIR_BYTES = 16
+
+
+def _require_scipy():
+    if sparse is None:
+        raise ImportError("market_basket needs 'pip install scipy'")
+
+
+# ============================================
+# STEP 1: INVOICE x PRODUCT MATRIX
+# ============================================
+
+def basket_matrix(invoice, product, n_invoices, n_products):
+    """Binary invoice x product CSR matrix.
+
+    Duplicate (invoice, product) lines are summed by the CSR conversion
+    and then set to 1: a basket either contains a product or not.
+    """
+    ones = np.ones(len(invoice), dtype=np.int32)
+    matrix = sparse.csr_matrix((ones, (invoice, product)), shape=(n_invoices, n_products))
+    matrix.data[:] = 1
+    return matrix
+
+
+def _batches(lines_per_invoice, max_pairs):
+    """(first, end) invoice ranges whose X.T @ X stays under max_pairs.
+
+    An invoice larger than the budget gets a batch of its own.
+    """
+    cum_pairs = np.cumsum(lines_per_invoice.astype(np.int64) ** 2)
+    first, done = 0, 0
+    while first < len(cum_pairs):
+        end = int(np.searchsorted(cum_pairs, done + max_pairs, side='right'))
+        end = max(end, first + 1)
+        yield first, end
+        first, done = end, cum_pairs[end - 1]
+
+
+# ============================================
+# STEP 2: CHUNKED CO-OCCURRENCE COUNTS
+# ============================================
+
+def _trailing_invoice(rows):
+    """Split off the last invoice's rows: they may continue in the next chunk."""
+    invoice = rows['InvoiceNo'].to_numpy()
+    other = np.flatnonzero(invoice != invoice[-1])
+    cut = other[-1] + 1 if len(other) else 0
+    return rows.iloc[:cut], rows.iloc[cut:]
+
+
+def count_pairs(chunks, products=None, budget_bytes=BATCH_BYTES):
+    """Co-occurrence counts over an iterable of cleaned row chunks.
+
+    Each chunk's rows are dictionary-encoded (StockCode via
+    retail_dimensions.encode_column, InvoiceNo locally), turned into a
+    binary invoice x product CSR matrix in invoice batches that fit
+    budget_bytes, and counts += X.T @ X per batch. Only the running
+    product x product counts outlive a chunk.
+
+    The rows of an invoice must be adjacent, as in the source file and
+    after clean_data; the last invoice of each chunk is held back in case
+    it continues in the next one, and an invoice that shows up again
+    after others raises ValueError. products: persisted product
+    dictionary, to keep the keys stable across runs.
+
+    Returns {'counts': CSR (diagonal = invoices containing the product),
+    'n_invoices': int, 'products': product keys}.
+    """
+    _require_scipy()
+    state = {
+        'counts': sparse.csr_matrix((0, 0), dtype=np.int64),
+        'n_invoices': 0,
+        'products': np.empty(0, dtype=object) if products is None else products,
+        'seen': set(),
+    }
+    max_pairs = max(1, budget_bytes // PAIR_BYTES)
+
+    def add(rows):
+        invoice, uniques = pd.factorize(rows['InvoiceNo'])
+        if not state['seen'].isdisjoint(uniques):
+            again = next(iter(state['seen'].intersection(uniques)))
+            raise ValueError(f'rows of invoice {again} are not adjacent; sort by '
+                             f'InvoiceNo or use pair_counts on an in-memory frame')
+        state['seen'].update(uniques)
+        product, state['products'] = encode_column(rows['StockCode'].to_numpy(),
+                                                   state['products'])
+        if (np.diff(invoice) < 0).any():
+            order = np.argsort(invoice, kind='stable')
+            invoice, product = invoice[order], product[order]
+        n_products = len(state['products'])
+        counts = state['counts']
+        counts.resize((n_products, n_products))
+
+        lines = np.bincount(invoice, minlength=len(uniques))
+        row_offsets = np.r_[0, np.cumsum(lines)]
+        for first, end in _batches(lines, max_pairs):
+            rows_from, rows_to = row_offsets[first], row_offsets[end]
+            matrix = basket_matrix(invoice[rows_from:rows_to] - first,
+                                   product[rows_from:rows_to], end - first, n_products)
+            counts = counts + (matrix.T @ matrix).astype(np.int64)
+        state['counts'] = counts
+        state['n_invoices'] += len(uniques)
+
+    carry = None
+    for chunk in chunks:
+        rows = chunk[['InvoiceNo', 'StockCode']]
+        if carry is not None:
+            rows = pd.concat([carry, rows], ignore_index=True)
+        if rows.empty:
+            continue
+        rows, carry = _trailing_invoice(rows)
+        if len(rows):
+            add(rows)
+    if carry is not None and len(carry):
+        add(carry)
+
+    del state['seen']
+    state['counts'] = state['counts'].tocsr()
+    return state
+
+
+def pair_counts(df, chunk_rows=CHUNK_ROWS, products=None, budget_bytes=BATCH_BYTES):
+    """count_pairs for an in-memory frame, in chunks of chunk_rows.
+
+    Frames whose invoice rows are not adjacent are stably sorted by
+    invoice first.
+    """
+    invoice, uniques = pd.factorize(df['InvoiceNo'])
+    if (invoice[1:] != invoice[:-1]).sum() + 1 > len(uniques):
+        df = df.iloc[np.argsort(invoice, kind='stable')]
+    chunks = (df.iloc[start:start + chunk_rows] for start in range(0, len(df), chunk_rows))
+    return count_pairs(chunks, products, budget_bytes)
+
+
+def pair_counts_csv(filepath, chunk_rows=CHUNK_ROWS, products=None,
+                    budget_bytes=BATCH_BYTES, memory_budget=None):
+    """count_pairs straight from a raw retail CSV, cleaning each chunk
+    with retail_etl.clean_data; the file is never fully in memory.
+
+    memory_budget (bytes): size chunks to fit it instead of chunk_rows,
+    shrinking them when memory runs high (see memory_governor.py).
+    """
+    from compressed_io import iter_csv
+    from retail_etl import clean_data
+
+    read_options = {'encoding': 'latin1', 'dtype': {'InvoiceNo': str, 'StockCode': str}}
+    if memory_budget:
+        from memory_governor import iter_csv_governed
+        chunks = iter_csv_governed(filepath, memory_budget, **read_options)
+    else:
+        chunks = iter_csv(filepath, chunksize=chunk_rows, **read_options)
+
+    def cleaned():
+        for chunk in chunks:
+            with contextlib.redirect_stdout(io.StringIO()):
+                yield clean_data(chunk)
+
+    return count_pairs(cleaned(), products, budget_bytes)
+
+
+# ============================================
+# STEP 3: SUPPORT, CONFIDENCE, LIFT
+# ============================================
+
+def _directed_pairs(result, min_support=0.0, min_lift=0.0):
+    """Every (product, partner) pair passing the thresholds, both ways."""
+    counts = result['counts'].tocoo()
+    n = result['n_invoices']
+    baskets = result['counts'].diagonal().astype(np.float64)
+
+    keep = counts.row != counts.col
+    keep &= counts.data >= max(1, np.ceil(min_support * n))
+    row, col, count = counts.row[keep], counts.col[keep], counts.data[keep]
+    lift = count * n / (baskets[row] * baskets[col])
+    keep = lift >= min_lift
+    row, col, count, lift = row[keep], col[keep], count[keep], lift[keep]
+    return {
+        'product': row, 'partner': col, 'count': count,
+        'support': count / n, 'confidence': count / baskets[row], 'lift': lift,
+    }
+
+
+def basket_rules(result, min_support=0.001, min_lift=1.0):
+    """Product pairs bought together, one row per unordered pair.
+
+    support = share of invoices with both products; confidence_ab = share
+    of A's invoices that also contain B; lift = support / (support(A) *
+    support(B)), > 1 when the pair occurs more often than by chance.
+    """
+    pairs = _directed_pairs(result, min_support, min_lift)
+    a_first = pairs['product'] < pairs['partner']
+    a, b = pairs['product'][a_first], pairs['partner'][a_first]
+    baskets = result['counts'].diagonal()
+    keys = result['products']
+    rules = pd.DataFrame({
+        'StockCode_A': keys[a],
+        'StockCode_B': keys[b],
+        'Invoices': pairs['count'][a_first],
+        'Support': pairs['support'][a_first],
+        'Confidence_AB': pairs['confidence'][a_first],
+        'Confidence_BA': pairs['count'][a_first] / baskets[b],
+        'Lift': pairs['lift'][a_first],
+    })
+    return rules.sort_values(['Lift', 'Invoices'], ascending=False, ignore_index=True)
+
+
+def top_partners(result, k=5, by='lift', min_support=0.001, min_lift=1.0):
+    """The k best partners of every product, ranked by 'lift', 'count' or
+    'confidence' (one lexsort over all pairs, no per-product loop)."""
+    pairs = _directed_pairs(result, min_support, min_lift)
+    order = np.lexsort((-pairs['count'], -pairs[by], pairs['product']))
+    product = pairs['product'][order]
+    group_start = np.r_[0, np.flatnonzero(product[1:] != product[:-1]) + 1]
+    rank = np.arange(len(product)) - np.repeat(group_start, np.diff(np.r_[group_start, len(product)]))
+    order = order[rank < k]
+
+    keys = result['products']
+    return pd.DataFrame({
+        'StockCode': keys[pairs['product'][order]],
+        'Rank': rank[rank < k] + 1,
+        'Partner': keys[pairs['partner'][order]],
+        'Invoices': pairs['count'][order],
+        'Confidence': pairs['confidence'][order],
+        'Lift': pairs['lift'][order],
+    })
+
+
+def basket_report(df, min_support=0.01, min_lift=1.0, top=10):
+    """Print the strongest pairs of a cleaned frame; returns the rules."""
+    result = pair_counts(df)
+    rules = basket_rules(result, min_support, min_lift)
+    names = df.drop_duplicates('StockCode').set_index('StockCode')['Description']
+
+    echo("\n=== MARKET BASKET ===")
+    echo(f"  Invoices: {result['n_invoices']:,} | products: {len(result['products']):,} | "
+          f"co-occurring pairs: {(result['counts'].nnz - len(result['products'])) // 2:,}")
+    echo(f"  Pairs with support >= {min_support:.1%} and lift >= {min_lift}: {len(rules):,}")
+    echo(f"\n  TOP {top} PAIRS BY LIFT:")
+    for row in rules.head(top).itertuples():
+        echo(f"    {names.get(row.StockCode_A, row.StockCode_A)} + "
+              f"{names.get(row.StockCode_B, row.StockCode_B)}: "
+              f"{row.Invoices:,} invoices, lift {row.Lift:.1f}")
+    return rules
+
+
+# ============================================
+# BENCHMARK
+# ============================================
+
+def self_join_pairs(df):
+    """The exploding version: join every invoice's lines with each other."""
+    lines = df[['InvoiceNo', 'StockCode']].drop_duplicates()
+    pairs = lines.merge(lines, on='InvoiceNo')
+    pairs = pairs[pairs['StockCode_x'] < pairs['StockCode_y']]
+    return pairs.groupby(['StockCode_x', 'StockCode_y']).size()
+
+
+def _peak_mb(fn, *args, **kwargs):
+    tracemalloc.start()
+    try:
+        fn(*args, **kwargs)
+        return tracemalloc.get_traced_memory()[1] / 1e6
+    finally:
+        tracemalloc.stop()
+
+
+def benchmark(n_rows=1_000_000, budgets_mb=(16, 64, 256), seed=0):
+    """Compare the self-join with the sparse engine at several budgets."""
+    import retail_etl
+    from synthetic_data import make_retail_data
+
+    with contextlib.redirect_stdout(io.StringIO()):
+        df = retail_etl.clean_data(make_retail_data(n_rows, seed))
+    df = df[['InvoiceNo', 'StockCode']].reset_index(drop=True)
+
+    start = time.perf_counter()
+    expected = self_join_pairs(df)
+    join_s = time.perf_counter() - start
+    join_mb = _peak_mb(self_join_pairs, df)
+
+    print(f"\n=== MARKET BASKET: {len(df):,} cleaned lines ===")
+    print(f"  {'METHOD':<32} {'SECONDS':>8} {'PEAK MB':>8}")
+    print(f"  {'self-join + groupby':<32} {join_s:>8.2f} {join_mb:>8.0f}")
+    for budget in budgets_mb:
+        start = time.perf_counter()
+        result = pair_counts(df, budget_bytes=budget * 1024 ** 2)
+        seconds = time.perf_counter() - start
+        peak = _peak_mb(pair_counts, df, budget_bytes=budget * 1024 ** 2)
+        print(f"  {f'sparse X.T @ X ({budget} MB batches)':<32} {seconds:>8.2f} {peak:>8.0f}")
+
+        # Same pair counts as the self-join
+        rules = basket_rules(result, min_support=0, min_lift=0)
+        got = rules.set_index(['StockCode_A', 'StockCode_B'])['Invoices']
+        swap = got.index.get_level_values(0) > got.index.get_level_values(1)
+        got.index = pd.MultiIndex.from_arrays([
+            np.where(swap, got.index.get_level_values(1), got.index.get_level_values(0)),
+            np.where(swap, got.index.get_level_values(0), got.index.get_level_values(1)),
+        ])
+        assert got.sort_index().to_dict() == expected.to_dict()
+
+    start = time.perf_counter()
+    top = top_partners(result, k=5)
+    print(f"  top-5 partners per product: {len(top):,} rows "
+          f"({(time.perf_counter() - start) * 1000:.0f} ms)")
+
+
+if __name__ == '__main__':
+    benchmark()
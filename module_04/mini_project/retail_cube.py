@@ -0,0 +1,281 @@
+import contextlib
+import io
+import json
+import os
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+from retail_dimensions import encode_column
+
+DAYS = ['Monday', 'Tuesday', 'Wednesday', 'Thursday', 'Friday', 'Saturday', 'Sunday']
+
+# Additive measures stored in every cell
+MEASURES = {
+    'revenue': 'TotalAmount',
+    'quantity': 'Quantity',
+    'transactions': None,  # row count
+}
+
+# Cuboids (dense arrays) the cube materializes. Any query over a subset of
+# a cuboid's dimensions is answered by summing out the others, from the
+# smallest cuboid that has them; products get their own cuboids so the
+# base one stays small.
+CUBOIDS = {
+    'base': ['country', 'month', 'dayofweek', 'hour'],
+    'product': ['product', 'month', 'hour'],
+    'product_hour': ['product', 'hour'],
+}
+
+# Dimensions derived from a stored one by mapping its labels: (stored
+# dimension, label -> group label)
+DERIVED = {
+    'is_uk': ('country', lambda label: 'UK' if label == 'United Kingdom' else 'International'),
+    'year': ('month', lambda label: label[:4]),
+}
+
+
+# ============================================
+# STEP 1: BUILD (ONE PASS OVER THE ROWS)
+# ============================================
+
+def _dimension_codes(df):
+    """Dense codes and labels for every stored dimension."""
+    codes, labels = {}, {}
+
+    for name, col in [('country', 'Country'), ('product', 'StockCode')]:
+        codes[name], keys = encode_column(df[col].to_numpy(), np.empty(0, dtype=object))
+        labels[name] = keys.astype(str)
+
+    year, month = df['Year'].to_numpy(), df['Month'].to_numpy()
+    month_index = year * 12 + month - 1
+    first = int(month_index.min()) if len(df) else 0
+    month_index = month_index - first
+    n_months = int(month_index.max()) + 1 if len(df) else 0
+    codes['month'] = month_index
+    labels['month'] = np.array(
+        [f'{(first + i) // 12}-{(first + i) % 12 + 1:02d}' for i in range(n_months)]
+    )
+
+    codes['dayofweek'] = pd.Categorical(df['DayOfWeek'], categories=DAYS).codes
+    labels['dayofweek'] = np.array(DAYS)
+    codes['hour'] = df['Hour'].to_numpy()
+    labels['hour'] = np.arange(24)
+    return codes, labels
+
+
+def build_cube(df):
+    """Pre-aggregate a cleaned retail frame into dense cuboids.
+
+    Each dimension is encoded once; every cuboid is then one np.bincount
+    per measure over the row's flat cell index. Returns
+    {'labels': {dim: labels}, 'cuboids': {name: {'dims', measure arrays}}}.
+    """
+    codes, labels = _dimension_codes(df)
+    weights = {m: (None if col is None else df[col].to_numpy()) for m, col in MEASURES.items()}
+
+    cuboids = {}
+    for name, dims in CUBOIDS.items():
+        shape = tuple(len(labels[d]) for d in dims)
+        cells = np.ravel_multi_index([codes[d] for d in dims], shape)
+        size = int(np.prod(shape))
+        cuboid = {'dims': dims}
+        for measure, w in weights.items():
+            sums = np.bincount(cells, weights=w, minlength=size)
+            if w is None or np.issubdtype(w.dtype, np.integer):
+                sums = sums.astype(np.int64)
+            cuboid[measure] = sums.reshape(shape)
+        cuboids[name] = cuboid
+    return {'labels': labels, 'cuboids': cuboids}
+
+
+# ============================================
+# STEP 2: SLICE / DICE / ROLL UP
+# ============================================
+
+def _choose_cuboid(cube, needed):
+    """Smallest cuboid that holds every stored dimension in needed."""
+    fits = [(c['revenue'].size, name) for name, c in cube['cuboids'].items()
+            if set(needed) <= set(c['dims'])]
+    if not fits:
+        raise ValueError(f'no cuboid covers {sorted(needed)}; add one to CUBOIDS')
+    return cube['cuboids'][min(fits)[1]]
+
+
+def _positions(labels, values):
+    values = values if isinstance(values, (list, tuple, np.ndarray)) else [values]
+    index = pd.Index(labels).get_indexer([type(labels[0])(v) for v in values])
+    if (index < 0).any():
+        raise KeyError(f'unknown value(s) {list(np.asarray(values)[index < 0])}')
+    return index
+
+
+def _group_matrix(labels, fn):
+    """One-hot (n labels x n groups) matrix mapping labels to groups."""
+    groups = np.array(sorted({fn(label) for label in labels}))
+    matrix = np.zeros((len(labels), len(groups)))
+    matrix[np.arange(len(labels)), np.searchsorted(groups, [fn(l) for l in labels])] = 1
+    return matrix, groups
+
+
+def query_cube(cube, by, where=None, measure='revenue'):
+    """Aggregate measure by the dimensions in by, after filtering.
+
+    where maps a dimension (stored or derived) to a value or list of
+    values to keep (slice / dice). Every other dimension is summed out
+    (roll-up). No rows are touched: the answer comes from the smallest
+    cuboid that covers the query. Returns (array, [labels per by dim]).
+    """
+    where = where or {}
+    stored = [DERIVED[d][0] if d in DERIVED else d for d in list(by) + list(where)]
+    cuboid = _choose_cuboid(cube, stored)
+    dims = list(cuboid['dims'])
+    values = cuboid[measure]
+
+    # Slice / dice on stored dimensions
+    for dim, keep in where.items():
+        if dim in DERIVED:
+            base, fn = DERIVED[dim]
+            wanted = set(np.atleast_1d(keep).astype(str))
+            mask = np.array([fn(label) in wanted for label in cube['labels'][base]])
+            values = np.compress(mask, values, axis=dims.index(base))
+            # Keep the filtered labels aligned for later roll-ups
+            cube = {**cube, 'labels': {**cube['labels'],
+                                       base: cube['labels'][base][mask]}}
+        else:
+            idx = _positions(cube['labels'][dim], keep)
+            values = np.take(values, idx, axis=dims.index(dim))
+            cube = {**cube, 'labels': {**cube['labels'], dim: cube['labels'][dim][idx]}}
+
+    # Roll up everything not asked for
+    wanted = {DERIVED[d][0] if d in DERIVED else d for d in by}
+    drop = tuple(i for i, d in enumerate(dims) if d not in wanted)
+    values = values.sum(axis=drop)
+    dims = [d for d in dims if d in wanted]
+
+    # Map stored dimensions onto derived groups, and order axes as in by
+    out_labels = []
+    for target in by:
+        base = DERIVED[target][0] if target in DERIVED else target
+        axis = dims.index(base)
+        if target in DERIVED:
+            matrix, groups = _group_matrix(cube['labels'][base], DERIVED[target][1])
+            values = np.moveaxis(np.tensordot(values, matrix, axes=([axis], [0])), -1, axis)
+            out_labels.append(groups)
+        else:
+            out_labels.append(cube['labels'][base])
+    order = [dims.index(DERIVED[t][0] if t in DERIVED else t) for t in by]
+    return np.transpose(values, order), out_labels
+
+
+def cube_frame(result):
+    """pandas view of a query_cube result (Series for 1-D, DataFrame for 2-D)."""
+    values, labels = result
+    if values.ndim == 1:
+        return pd.Series(values, index=labels[0])
+    if values.ndim == 2:
+        return pd.DataFrame(values, index=labels[0], columns=labels[1])
+    raise ValueError('cube_frame handles 1 or 2 dimensions; use the arrays directly')
+
+
+# ============================================
+# STEP 3: SAVE / LOAD
+# ============================================
+
+def save_cube(cube, path):
+    """Write the cube to one .npz file (arrays plus a JSON layout)."""
+    arrays = {f'labels__{dim}': np.asarray(labels) for dim, labels in cube['labels'].items()}
+    layout = {}
+    for name, cuboid in cube['cuboids'].items():
+        layout[name] = cuboid['dims']
+        for measure in MEASURES:
+            arrays[f'{name}__{measure}'] = cuboid[measure]
+    arrays['layout'] = np.array(json.dumps(layout))
+    np.savez_compressed(path, **arrays)
+
+
+def load_cube(path):
+    """Read a cube written by save_cube."""
+    with np.load(path) as data:
+        layout = json.loads(str(data['layout']))
+        labels = {key.split('__', 1)[1]: data[key] for key in data.files
+                  if key.startswith('labels__')}
+        cuboids = {
+            name: {'dims': dims, **{m: data[f'{name}__{m}'] for m in MEASURES}}
+            for name, dims in layout.items()
+        }
+    return {'labels': labels, 'cuboids': cuboids}
+
+
+# ============================================
+# BENCHMARK
+# ============================================
+
+def _timed(fn, repeats):
+    times = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        result = fn()
+        times.append(time.perf_counter() - start)
+    return result, sorted(times)[len(times) // 2]
+
+
+def benchmark(n_rows=1_000_000, repeats=20, seed=0):
+    """Answer the same slices with groupby over rows and from the cube."""
+    sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+    import retail_etl
+    from synthetic_data import make_retail_data
+
+    with contextlib.redirect_stdout(io.StringIO()):
+        df = retail_etl.transform_data(retail_etl.clean_data(make_retail_data(n_rows, seed)))
+    df['MonthLabel'] = df['Year'].astype(str) + '-' + df['Month'].map('{:02d}'.format)
+
+    cube, build_s = _timed(lambda: build_cube(df), 1)
+    top_country = df['Country'].value_counts().index[1]
+    summer = ['2011-06', '2011-07', '2011-08']
+
+    queries = [
+        ('country x month', ['country', 'month'], None, 'revenue',
+         lambda: df.groupby(['Country', 'MonthLabel'])['TotalAmount'].sum()),
+        ('product x hour', ['product', 'hour'], None, 'quantity',
+         lambda: df.groupby(['StockCode', 'Hour'])['Quantity'].sum()),
+        ('dayofweek x is_uk', ['dayofweek', 'is_uk'], None, 'revenue',
+         lambda: df.groupby(['DayOfWeek', 'Is_UK'])['TotalAmount'].sum()),
+        (f'slice {top_country} by month', ['month'], {'country': top_country}, 'revenue',
+         lambda: df[df['Country'] == top_country].groupby('MonthLabel')['TotalAmount'].sum()),
+        ('dice summer, hour x is_uk', ['hour', 'is_uk'], {'month': summer}, 'transactions',
+         lambda: df[df['MonthLabel'].isin(summer)].groupby(['Hour', 'Is_UK']).size()),
+        ('roll up to year', ['year'], None, 'revenue',
+         lambda: df.groupby('Year')['TotalAmount'].sum()),
+    ]
+
+    path = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'retail_cube_bench.npz')
+    save_cube(cube, path)
+    size_kb = os.path.getsize(path) / 1024
+    loaded, load_s = _timed(lambda: load_cube(path), 1)
+    os.remove(path)
+
+    print(f"\n=== ANALYTICS CUBE: {len(df):,} cleaned rows ===")
+    print(f"  Build {build_s * 1000:,.0f} ms | saved {size_kb:,.0f} KB | load {load_s * 1000:,.1f} ms")
+    print(f"  {'QUERY':<30} {'GROUPBY ms':>11} {'CUBE ms':>9} {'SPEEDUP':>8}")
+    for label, by, where, measure, groupby in queries:
+        expected, groupby_s = _timed(groupby, max(3, repeats // 5))
+        (values, labels), cube_s = _timed(
+            lambda: query_cube(loaded, by, where, measure), repeats)
+
+        # Every non-empty group must match its cell; empty cells must be 0
+        expected = expected.astype(float)
+        keys = expected.index if expected.index.nlevels > 1 else [(k,) for k in expected.index]
+        cell_index = tuple(
+            _positions(lab, [str(k[i]) for k in keys]) for i, lab in enumerate(labels)
+        )
+        assert np.allclose(values[cell_index], expected.to_numpy())
+        assert np.isclose(values.sum(), expected.sum())
+        print(f"  {label:<30} {groupby_s * 1000:>11.2f} {cube_s * 1000:>9.3f} "
+              f"{groupby_s / cube_s:>7.0f}x")
+
+
+if __name__ == '__main__':
+    benchmark()
@@ -0,0 +1,439 @@
+import contextlib
+import io
+import os
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+from sqlalchemy import text
+
+# Shared pipeline modules live one level up, in module_04/
+MODULE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+if MODULE_DIR not in sys.path:
+    sys.path.append(MODULE_DIR)
+
+from pipeline_log import echo
+
+# Customers are split into this many score groups per R/F/M measure
+# (5 = quintiles of the percent rank)
+SCORE_GROUPS = 5
+
+# Periods (months since the first purchase) shown in the retention report
+REPORT_PERIODS = 6
+
+# Postgres work_mem for the pushdown queries, so their hash aggregates over
+# millions of rows stay in memory instead of spilling to disk
+SQL_WORK_MEM = '256MB'
+
+
+# ============================================
+# STEP 1: COLLAPSE TO INVOICES, SORT ONCE
+# ============================================
+
+def collapse_invoices(df):
+    """One entry per invoice: (customer, time, total, invoice code).
+
+    Recency, frequency and cohorts only depend on invoices, and totals
+    add up per invoice with one np.bincount, so the sort below handles
+    ~20x fewer entries than there are rows. Returns None when an invoice
+    spans several customers or timestamps (not the case in the source
+    data); sort_transactions then works on the rows.
+    """
+    invoice, uniques = pd.factorize(df['InvoiceNo'])
+    customer = df['CustomerID'].to_numpy()
+    when = df['InvoiceDate'].to_numpy().astype('datetime64[ns]', copy=False)
+
+    # Index of each invoice's first row (the last write wins)
+    first = np.empty(len(uniques), dtype=np.int64)
+    first[invoice[::-1]] = np.arange(len(invoice) - 1, -1, -1)
+    if ((customer != customer[first][invoice]).any()
+            or (when != when[first][invoice]).any()):
+        return None
+
+    amount = np.bincount(invoice, weights=df['TotalAmount'].to_numpy(), minlength=len(uniques))
+    return customer[first], when[first], amount, np.arange(len(uniques))
+
+
+def sort_transactions(df):
+    """Sort invoices (or rows) by customer and invoice, once for all
+    measures.
+
+    Every per-customer measure below is then a reduction over contiguous
+    segments (np.add.reduceat and friends) instead of a hash groupby per
+    measure. Returns the sorted arrays and the segment starts.
+    """
+    collapsed = collapse_invoices(df)
+    if collapsed is None:
+        invoice, _ = pd.factorize(df['InvoiceNo'])
+        collapsed = (df['CustomerID'].to_numpy(),
+                     df['InvoiceDate'].to_numpy().astype('datetime64[ns]', copy=False),
+                     df['TotalAmount'].to_numpy(), invoice)
+    customer, when, amount, invoice = collapsed
+    order = np.lexsort((invoice, customer))
+
+    customer = customer[order]
+    invoice = invoice[order]
+    new_customer = np.empty(len(order), dtype=bool)
+    new_customer[:1] = True
+    np.not_equal(customer[1:], customer[:-1], out=new_customer[1:])
+    new_invoice = new_customer.copy()
+    new_invoice[1:] |= invoice[1:] != invoice[:-1]
+
+    return {
+        'customer': customer,
+        'when': when[order],
+        'amount': amount[order],
+        'new_invoice': new_invoice,
+        'starts': np.flatnonzero(new_customer),
+    }
+
+
+# ============================================
+# STEP 2: RFM
+# ============================================
+
+def quantile_score(values, groups=SCORE_GROUPS, descending=False):
+    """Score 1..groups from each value's percent rank, tie-aware.
+
+    The score is floor(PERCENT_RANK * groups) + 1, capped at groups, with
+    PERCENT_RANK = (RANK - 1) / (n - 1): equal values share a rank, so
+    they always share a score (NTILE splits ties by an arbitrary
+    tie-breaker). Integer arithmetic, so the SQL variant scores every
+    customer the same.
+    """
+    keys = -values if descending else values
+    # RANK - 1: the number of values strictly before each one
+    rank = np.searchsorted(np.sort(keys), keys, side='left')
+    scores = rank * groups // max(len(values) - 1, 1) + 1
+    return np.minimum(scores, groups).astype(np.int8)
+
+
+def rfm_table(segments):
+    """Recency, frequency, monetary and their scores per customer.
+
+    Recency is whole days from the last purchase to one day after the
+    last transaction in the data; frequency counts distinct invoices;
+    monetary is total spend, rounded to pence.
+    """
+    starts = segments['starts']
+    snapshot = segments['when'].max() + np.timedelta64(1, 'D')
+
+    customer = segments['customer'][starts]
+    last = np.maximum.reduceat(segments['when'], starts)
+    recency = ((snapshot - last) // np.timedelta64(1, 'D')).astype(np.int64)
+    frequency = np.add.reduceat(segments['new_invoice'], starts).astype(np.int64)
+    monetary = np.round(np.add.reduceat(segments['amount'], starts), 2)
+
+    rfm = pd.DataFrame({
+        'Recency': recency,
+        'Frequency': frequency,
+        'Monetary': monetary,
+        'R': quantile_score(recency, descending=True),
+        'F': quantile_score(frequency),
+        'M': quantile_score(monetary),
+    }, index=pd.Index(customer, name='CustomerID'))
+    rfm['RFM'] = rfm_code(rfm)
+    return rfm
+
+
+def rfm_code(rfm):
+    """R, F and M scores as one number, e.g. 545."""
+    return rfm['R'].astype(np.int16) * 100 + rfm['F'] * 10 + rfm['M']
+
+
+# ============================================
+# STEP 3: COHORTS
+# ============================================
+
+def cohort_table(segments):
+    """Active customers per acquisition cohort and months since acquisition.
+
+    A customer's cohort is the month of their first purchase (a segment
+    minimum); the distinct (customer, month) pairs are the active months.
+    Returns a cohort x period frame of customer counts (period 0 = size).
+    """
+    starts = segments['starts']
+    month = segments['when'].astype('datetime64[M]').astype(np.int64)
+    base = month.min() if len(month) else 0
+    month -= base
+    n_months = int(month.max()) + 1 if len(month) else 0
+    first_month = np.minimum.reduceat(month, starts) if len(month) else month
+
+    lengths = np.diff(np.r_[starts, len(month)])
+    segment = np.repeat(np.arange(len(starts)), lengths)
+    segment, month = np.divmod(np.unique(segment * n_months + month), max(n_months, 1))
+    cohort = first_month[segment]
+    period = month - cohort
+    counts = np.bincount(cohort * n_months + period,
+                         minlength=n_months * n_months).reshape(n_months, n_months)
+
+    labels = (np.arange(n_months) + base).astype('datetime64[M]').astype(str)
+    counts = pd.DataFrame(counts, index=pd.Index(labels, name='Cohort'),
+                          columns=pd.RangeIndex(n_months, name='Period'))
+    counts = counts.loc[:, :int(period.max()) if len(period) else -1]
+    # Cohorts with no new customers (months without data) are left out
+    return counts[counts[0] > 0]
+
+
+def retention_rates(counts):
+    """Share of each cohort still active n months after acquisition.
+
+    Periods that end after the last month in the data are NaN, not 0.
+    """
+    months = pd.to_datetime(counts.index)
+    start = (months.year * 12 + months.month).to_numpy()[:, None]
+    month = start + counts.columns.to_numpy()[None, :]
+    last = month[counts.to_numpy() > 0].max()
+    return counts.div(counts[0], axis=0).mask(month > last)
+
+
+# ============================================
+# STEP 4: PIPELINE STAGE
+# ============================================
+
+def customer_analytics(df):
+    """RFM scores and cohort counts for a cleaned, transformed frame."""
+    segments = sort_transactions(df)
+    return {'rfm': rfm_table(segments), 'cohorts': cohort_table(segments)}
+
+
+def print_customer_report(tables):
+    rfm, counts = tables['rfm'], tables['cohorts']
+    echo("\n=== CUSTOMER ANALYTICS ===")
+    echo(f"  Customers: {len(rfm):,}")
+    echo(f"  Median recency: {rfm['Recency'].median():.0f} days | "
+          f"median frequency: {rfm['Frequency'].median():.0f} invoices | "
+          f"median spend: £{rfm['Monetary'].median():,.2f}")
+
+    top = SCORE_GROUPS * 111
+    echo(f"\n  RFM SEGMENTS:")
+    echo(f"    Best ({top}): {(rfm['RFM'] == top).sum():,} customers")
+    echo(f"    Loyal (F={SCORE_GROUPS}): {(rfm['F'] == SCORE_GROUPS).sum():,} customers")
+    echo(f"    At risk (R=1, F>=4): {((rfm['R'] == 1) & (rfm['F'] >= 4)).sum():,} customers")
+    echo(f"    Lost (111): {(rfm['RFM'] == 111).sum():,} customers")
+
+    echo(f"\n  MONTHLY COHORT RETENTION (% active, months since first purchase):")
+    rates = retention_rates(counts).iloc[:, :REPORT_PERIODS] * 100
+    rates.insert(0, 'Customers', counts[0])
+    echo(rates.round(1).to_string(na_rep=''))
+
+
+def customer_report(df):
+    """Pipeline stage after transform_data: compute and print customer
+    analytics. Returns {'rfm': ..., 'cohorts': ...}."""
+    tables = customer_analytics(df)
+    print_customer_report(tables)
+    return tables
+
+
+# ============================================
+# STEP 5: SQL PUSHDOWN
+# ============================================
+
+def customer_queries(table_name, schema='flat'):
+    """RFM and cohort queries for data loaded by retail_loader.py.
+
+    Same definitions as the in-memory stage: one day past the last
+    transaction for recency, scores bucketed from the rank of each
+    value like quantile_score. schema='star' reads the fact table table_name and takes
+    CustomerID from dim_customer (see retail_star.py).
+    """
+    customer = '"CustomerID"' if schema == 'flat' else 'customer_key'
+    names = '' if schema == 'flat' else 'JOIN dim_customer USING (customer_key)'
+
+    return {
+        # Rows are summed per invoice first (a hash aggregate), so counting
+        # invoices needs no COUNT(DISTINCT) sort over every row
+        'rfm': f'''
+            WITH invoices AS (
+                SELECT {customer}, MAX("InvoiceDate") AS ts, SUM("TotalAmount") AS amount
+                FROM {table_name}
+                GROUP BY {customer}, "InvoiceNo"
+            ),
+            per_customer AS (
+                SELECT {customer},
+                       MAX(ts) AS last_purchase,
+                       COUNT(*) AS frequency,
+                       ROUND(SUM(amount)::numeric, 2) AS monetary
+                FROM invoices
+                GROUP BY {customer}
+            ),
+            snapshot AS (
+                SELECT MAX(last_purchase) + INTERVAL '1 day' AS ts FROM per_customer
+            ),
+            measures AS (
+                SELECT "CustomerID",
+                       DATE_PART('day', s.ts - last_purchase)::bigint AS "Recency",
+                       frequency AS "Frequency",
+                       monetary::float8 AS "Monetary"
+                FROM per_customer {names}, snapshot s
+            )
+            SELECT *,
+                   LEAST((RANK() OVER (ORDER BY "Recency" DESC) - 1) * {SCORE_GROUPS}
+                         / GREATEST(COUNT(*) OVER () - 1, 1) + 1, {SCORE_GROUPS}) AS "R",
+                   LEAST((RANK() OVER (ORDER BY "Frequency") - 1) * {SCORE_GROUPS}
+                         / GREATEST(COUNT(*) OVER () - 1, 1) + 1, {SCORE_GROUPS}) AS "F",
+                   LEAST((RANK() OVER (ORDER BY "Monetary") - 1) * {SCORE_GROUPS}
+                         / GREATEST(COUNT(*) OVER () - 1, 1) + 1, {SCORE_GROUPS}) AS "M"
+            FROM measures
+            ORDER BY "CustomerID"
+        ''',
+        'cohorts': f'''
+            WITH activity AS (
+                SELECT DISTINCT {customer} AS customer,
+                       DATE_TRUNC('month', "InvoiceDate") AS month
+                FROM {table_name}
+            ),
+            cohorts AS (
+                SELECT customer, MIN(month) AS cohort FROM activity GROUP BY customer
+            )
+            SELECT TO_CHAR(c.cohort, 'YYYY-MM') AS "Cohort",
+                   ((EXTRACT(YEAR FROM a.month) - EXTRACT(YEAR FROM c.cohort)) * 12
+                    + EXTRACT(MONTH FROM a.month) - EXTRACT(MONTH FROM c.cohort))::int AS "Period",
+                   COUNT(*) AS customers
+            FROM activity a JOIN cohorts c USING (customer)
+            GROUP BY 1, 2
+        ''',
+    }
+
+
+def sql_customer_analytics(engine, table_name, schema='flat'):
+    """customer_analytics computed inside Postgres; same result shape."""
+    queries = customer_queries(table_name, schema)
+    with engine.begin() as conn:
+        conn.exec_driver_sql(f"SET LOCAL work_mem = '{SQL_WORK_MEM}'")
+        rfm = pd.read_sql(text(queries['rfm']), conn, index_col='CustomerID')
+        long = pd.read_sql(text(queries['cohorts']), conn)
+    rfm[['R', 'F', 'M']] = rfm[['R', 'F', 'M']].astype(np.int8)
+    rfm['RFM'] = rfm_code(rfm)
+
+    counts = long.pivot(index='Cohort', columns='Period', values='customers')
+    counts = counts.reindex(columns=pd.RangeIndex(counts.columns.max() + 1, name='Period'))
+    return {'rfm': rfm, 'cohorts': counts.fillna(0).astype(np.int64).sort_index()}
+
+
+# ============================================
+# BENCHMARK
+# ============================================
+
+def synthetic_transactions(n_rows, seed=0):
+    """Just the columns customer analytics reads, for sizes where the full
+    raw frame would not fit in memory (about 250 rows per customer)."""
+    rng = np.random.default_rng(seed)
+    n_invoices = max(1, n_rows // 20)
+    n_customers = max(4_400, n_rows // 250)
+    invoice = rng.integers(0, n_invoices, n_rows, dtype=np.int32)
+    invoice.sort()
+    minutes = np.sort(rng.integers(0, 373 * 24 * 60, n_invoices))
+    invoice_customer = (12346 + rng.integers(0, n_customers, n_invoices)).astype(np.int32)
+
+    when = minutes[invoice] * np.int64(60_000_000_000)
+    when += pd.Timestamp('2010-12-01 08:00').value
+    amount = rng.gamma(2.0, 1.6, n_rows)
+    amount += 0.1
+    amount *= rng.integers(1, 25, n_rows, dtype=np.int8)
+    return pd.DataFrame({
+        'InvoiceNo': invoice + 536365,
+        'InvoiceDate': when.view('datetime64[ns]'),
+        'CustomerID': invoice_customer[invoice],
+        'TotalAmount': amount.round(2, out=amount),
+    }, copy=False)
+
+
+def groupby_apply_analytics(df):
+    """The naive version: one Python function call per customer."""
+    snapshot = df['InvoiceDate'].max() + pd.Timedelta(days=1)
+    measures = df.groupby('CustomerID').apply(lambda g: pd.Series({
+        'Recency': (snapshot - g['InvoiceDate'].max()).days,
+        'Frequency': g['InvoiceNo'].nunique(),
+        'Monetary': round(g['TotalAmount'].sum(), 2),
+    }), include_groups=False)
+    months = df['InvoiceDate'].dt.to_period('M')
+    cohorts = df.assign(Month=months).groupby('CustomerID').apply(
+        lambda g: pd.Series(sorted(g['Month'].unique())), include_groups=False)
+    return measures, cohorts
+
+
+def groupby_analytics(df):
+    """Idiomatic pandas: named aggregations plus a drop_duplicates cohort."""
+    snapshot = df['InvoiceDate'].max() + pd.Timedelta(days=1)
+    measures = df.groupby('CustomerID').agg(
+        last=('InvoiceDate', 'max'),
+        Frequency=('InvoiceNo', 'nunique'),
+        Monetary=('TotalAmount', 'sum'),
+    )
+    measures['Recency'] = (snapshot - measures.pop('last')).dt.days
+    measures['Monetary'] = measures['Monetary'].round(2)
+
+    dates = df['InvoiceDate']
+    activity = df[['CustomerID']].assign(
+        Month=dates.dt.year * 12 + dates.dt.month - 1).drop_duplicates()
+    first = activity.groupby('CustomerID')['Month'].transform('min')
+    counts = pd.crosstab(first.rename('Cohort'), (activity['Month'] - first).rename('Period'))
+    return measures, counts
+
+
+def _timed(fn, *args):
+    start = time.perf_counter()
+    result = fn(*args)
+    return result, time.perf_counter() - start
+
+
+def benchmark(sizes=(1_000_000, 10_000_000, 50_000_000), apply_rows=1_000_000,
+              groupby_rows=10_000_000, sql_rows=10_000_000,
+              db_name='retail_customers_bench', seed=0):
+    """Time the vectorized kernel against pandas and the SQL pushdown.
+
+    The slower baselines only run up to their row limits. Every baseline
+    that runs is checked against the kernel's results.
+    """
+    print(f"\n=== CUSTOMER ANALYTICS (RFM + COHORTS) ===")
+    print(f"  {'ROWS':>11} {'CUSTOMERS':>10} {'KERNEL s':>9} {'GROUPBY s':>10} "
+          f"{'APPLY s':>9} {'SQL s':>8}")
+
+    engine = None
+    for n_rows in sizes:
+        df = synthetic_transactions(n_rows, seed)
+        tables, kernel_s = _timed(customer_analytics, df)
+        rfm, counts = tables['rfm'], tables['cohorts']
+        row = {'groupby': '-', 'apply': '-', 'sql': '-'}
+
+        if n_rows <= groupby_rows:
+            (measures, expected_counts), seconds = _timed(groupby_analytics, df)
+            row['groupby'] = f'{seconds:.2f}'
+            cols = ['Recency', 'Frequency', 'Monetary']
+            assert np.allclose(measures[cols].to_numpy(), rfm[cols].to_numpy())
+            assert (expected_counts.to_numpy() == counts.to_numpy()).all()
+
+        if n_rows <= apply_rows:
+            (measures, _), seconds = _timed(groupby_apply_analytics, df)
+            row['apply'] = f'{seconds:.2f}'
+            assert np.allclose(measures['Frequency'].to_numpy(), rfm['Frequency'].to_numpy())
+
+        if n_rows <= sql_rows:
+            from pg_copy import psql_insert_copy
+            from retail_loader import create_database, connect_to_db
+            if engine is None:
+                with contextlib.redirect_stdout(io.StringIO()):
+                    create_database(db_name)
+                    engine = connect_to_db(db_name)
+            df.to_sql('transactions', engine, if_exists='replace', index=False,
+                      method=psql_insert_copy, chunksize=500_000)
+            with engine.begin() as conn:
+                conn.exec_driver_sql('ANALYZE transactions')
+            sql_tables, seconds = _timed(sql_customer_analytics, engine, 'transactions')
+            row['sql'] = f'{seconds:.2f}'
+            assert sql_tables['rfm'].equals(rfm)
+            assert (sql_tables['cohorts'].to_numpy() == counts.to_numpy()).all()
+
+        print(f"  {n_rows:>11,} {len(rfm):>10,} {kernel_s:>9.2f} {row['groupby']:>10} "
+              f"{row['apply']:>9} {row['sql']:>8}")
+        del df, tables, rfm, counts
+
+    if engine is not None:
+        engine.dispose()
+
+
+if __name__ == '__main__':
+    benchmark()
@@ -1,204 +1,243 @@
+import os
+import sys
+
 import pandas as pd
-import numpy as np
+
+# Shared pipeline modules live one level up, in module_04/
+MODULE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+if MODULE_DIR not in sys.path:
+    sys.path.append(MODULE_DIR)
+
+from dag import node
+from pipeline_engine import (
+    apply_stages, inspect_params, inspect_source, load_config, load_source, run_config_pipeline
+)
+from pipeline_log import echo, enabled, log, text_output
+from retail_dimensions import (
+    encode_frame, analytics_tables, load_dimensions, save_dimensions, update_dimensions
+)
+
+# The stages (load, inspect, clean, transform) are declared in
+# pipelines/retail.json and run by module_04/pipeline_engine.py. The
+# functions below run one piece of the config each (for samples, chunks
+# and benchmarks); the analytics below and retail_customers.customer_report
+# are its reports
+CONFIG = 'retail'
+PIPELINE = load_config(CONFIG)
 
 
 # STEP 1 : LOAD DATA
 
 def load_data(filepath):
-    """Load the online retail csv file"""
-    
-    df = pd.read_csv(filepath, encoding='latin1')
-    print(f"  Loaded: {filepath}")
-    print(f"  Shape: {df.shape[0]:,} rows, {df.shape[1]} columns")
-    return df
+    """Load the online retail csv file (plain or .gz/.bz2/.xz/.zip/.zst)"""
+    return load_source(filepath, PIPELINE['source'])
 
 
 # STEP 2: EXPLORE DATA
 
 def explore_data(df):
-    """Discover data quality issues."""
-    print("\n=== DATA EXPLORATION ===")
+    """Discover data quality issues.
+
+    Purely diagnostic: the profiling pass is skipped unless 'debug'
+    events are enabled (see pipeline_log.py).
+    """
+    return inspect_source(df, **inspect_params(PIPELINE))
+
+
+def explore_report(df, profile):
+    """The config's inspect report (see pipeline_engine.inspect_source)."""
+    log('explore', "\n=== DATA EXPLORATION ===", 'debug')
+    columns = profile['columns']
 
     # Null analysis
-    print("\n  NULLS:")
-    nulls = df.isnull().sum()
-    null_cols = nulls[nulls > 0]
-    for col, count in null_cols.items():
-        pct = count / len(df) * 100
-        print(f"    {col}: {count:,} ({pct:.1f}%)")
+    nulls = {col: p['null_count'] for col, p in columns.items() if p['null_count'] > 0}
+    log('nulls', "\n  NULLS:", 'debug')
+    for col, count in nulls.items():
+        log('nulls', "    {column}: {count:,} ({pct:.1f}%)", 'debug',
+            column=col, count=count, pct=count / len(df) * 100)
 
     # Duplicates
-    dupes = df.duplicated().sum()
-    print(f"\n  DUPLICATES: {dupes:,}")
+    log('duplicates', "\n  DUPLICATES: {count:,}", 'debug', count=profile['duplicate_rows'])
 
     # Negative quantities (returns)
-    neg_qty = (df['Quantity'] < 0).sum()
-    print(f"\n  NEGATIVE QUANTITIES: {neg_qty:,} ({neg_qty/len(df)*100:.1f}%)")
-    print(f"    Min quantity: {df['Quantity'].min():,}")
+    neg_qty = profile['invalid']['negative_quantity']
+    log('negative_quantity',
+        "\n  NEGATIVE QUANTITIES: {count:,} ({pct:.1f}%)\n    Min quantity: {min:,}", 'debug',
+        count=neg_qty, pct=neg_qty / len(df) * 100, min=df['Quantity'].min())
 
     # Zero/negative prices
-    bad_price = (df['UnitPrice'] <= 0).sum()
-    print(f"\n  ZERO/NEGATIVE PRICES: {bad_price:,}")
+    log('bad_price', "\n  ZERO/NEGATIVE PRICES: {count:,}", 'debug',
+        count=profile['invalid']['bad_price'])
 
     # Date type
-    print(f"\n  InvoiceDate type: {df['InvoiceDate'].dtype} (needs datetime)")
+    log('dtype', "\n  InvoiceDate type: {dtype} (needs datetime)", 'debug',
+        column='InvoiceDate', dtype=columns['InvoiceDate']['dtype'])
 
     # Countries
-    print(f"\n  COUNTRIES: {df['Country'].nunique()}")
-    print(f"    Top 3:")
-    for country, count in df['Country'].value_counts().head(3).items():
-        print(f"      {country}: {count:,}")
-
-    return df
+    log('countries', "\n  COUNTRIES: {distinct}\n    Top 3:", 'debug',
+        distinct=columns['Country']['distinct_estimate'])
+    for country, count in columns['Country']['top_values']:
+        log('top_country', "      {country}: {count:,}", 'debug', country=country, count=count)
 
 
 # STEP 3 : CLEAN DATA
 
 def clean_data(df):
-    """Fix all data quality issues."""
-    print("\n=== DATA CLEANING ===")
-    original = len(df)
-    df = df.copy()
-
-    # 1. Drop null CustomerID
-    before = len(df)
-    df = df.dropna(subset=['CustomerID'])
-    dropped = before - len(df)
-    print(f"  Dropped {dropped:,} rows with null CustomerID")
-
-    # 2. Drop null Description
-    before = len(df)
-    df = df.dropna(subset=['Description'])
-    dropped = before - len(df)
-    print(f"  Dropped {dropped:,} rows with null Description")
-
-    # 3. Remove negative quantities (returns/cancellations)
-    before = len(df)
-    df = df[df['Quantity'] > 0]
-    dropped = before - len(df)
-    print(f"  Removed {dropped:,} rows with negative/zero quantity")
-
-    # 4. Remove zero/negative prices
-    before = len(df)
-    df = df[df['UnitPrice'] > 0]
-    dropped = before - len(df)
-    print(f"  Removed {dropped:,} rows with zero/negative price")
-
-    # 5. Remove exact duplicates
-    before = len(df)
-    df = df.drop_duplicates()
-    dropped = before - len(df)
-    print(f"  Removed {dropped:,} exact duplicates")
-
-    # 6. Standardize Description (title case)
-    df['Description'] = df['Description'].str.strip().str.title()
-    print(f"  Standardized descriptions to title case")
-
-    # Summary
-    removed = original - len(df)
-    print(f"\n  CLEANING SUMMARY: {original:,} -> {len(df):,} rows ({removed:,} removed)")
-    print(f"  Remaining nulls: {df.isnull().sum().sum()}")
-
-    return df
-
+    """Fix all data quality issues: the config's 'clean' stage, in memory."""
+    return apply_stages(df, PIPELINE, ['clean'])
 
 
 # Step 4 : TRANSFORM DATA
 
 def transform_data(df):
-    """Add calculated fields and parse dates."""
-    print("\n=== DATA TRANSFORMATION ===")
-    df = df.copy()
-
-    # 1. Parse InvoiceDate to datetime
-    df['InvoiceDate'] = pd.to_datetime(df['InvoiceDate'])
-    print(f"  Parsed InvoiceDate to datetime")
-    print(f"    Range: {df['InvoiceDate'].min()} to {df['InvoiceDate'].max()}")
-
-    # 2. Calculate total amount
-    df['TotalAmount'] = df['Quantity'] * df['UnitPrice']
-    print(f"  Added TotalAmount (Quantity x UnitPrice)")
-    print(f"    Total revenue: £{df['TotalAmount'].sum():,.2f}")
-
-    # 3. Extract time components
-    df['Year'] = df['InvoiceDate'].dt.year
-    df['Month'] = df['InvoiceDate'].dt.month
-    df['DayOfWeek'] = df['InvoiceDate'].dt.day_name()
-    df['Hour'] = df['InvoiceDate'].dt.hour
-    print(f"  Extracted: Year, Month, DayOfWeek, Hour")
-
-    # 4. UK vs International flag
-    df['Is_UK'] = np.where(df['Country'] == 'United Kingdom', 'UK', 'International')
-    print(f"  Added Is_UK flag")
+    """Add calculated fields and parse dates: the 'transform' stage."""
+    return apply_stages(df, PIPELINE, ['transform'])
 
-    # 5. Convert CustomerID to integer
-    df['CustomerID'] = df['CustomerID'].astype(int)
-    print(f"  Converted CustomerID to integer")
 
-    print(f"\n  Final shape: {df.shape[0]:,} rows, {df.shape[1]} columns")
-
-    return df
+def run_stages(filepath):
+    """The stage functions one by one, as run_retail_pipeline once called
+    them (see pipeline_engine.verify_configs)."""
+    return transform_data(clean_data(explore_data(load_data(filepath))))
 
 
 # STEP 5 : GENRATE ANALYTICS
-def generate_analytics(df):
-    """Print key business insights from the cleaned data."""
-    print("\n=== ANALYTICS ===")
+def generate_analytics(df, dims=None):
+    """Print key business insights from the cleaned data.
+
+    Customers, products, descriptions and countries are encoded once into
+    dense int32 keys (see retail_dimensions.py) and aggregated with
+    np.bincount instead of hashing the text columns in every groupby.
+    Pass dims (persisted dictionaries) to start from known keys. Returns
+    df; the extended dictionaries come from retail_dimensions.update_dimensions.
+    """
+    if not enabled('info'):
+        return df
+    codes, dims = encode_frame(df, dims)
+    tables = analytics_tables(df, codes, dims)
+
+    log('analytics', "\n=== ANALYTICS ===")
 
     # Overview
-    print(f"  Total transactions: {len(df):,}")
-    print(f"  Total revenue: £{df['TotalAmount'].sum():,.2f}")
-    print(f"  Unique customers: {df['CustomerID'].nunique():,}")
-    print(f"  Unique products: {df['StockCode'].nunique():,}")
+    log('overview', "  Total transactions: {transactions:,}\n  Total revenue: £{revenue:,.2f}\n"
+        "  Unique customers: {customers:,}\n  Unique products: {products:,}",
+        **{k: tables[k] for k in ['transactions', 'revenue', 'customers', 'products']})
+
+    # The tables are one event each; rows are formatted only for text output
+    if not text_output():
+        log('top_countries', top_countries=tables['top_countries'])
+        log('top_products', top_products=tables['top_products'])
+        log('monthly_revenue', monthly=tables['monthly'])
+        log('uk_split', uk_split=tables['uk_split'])
+        return df
 
     # Revenue by country (top 5)
-    print("\n  TOP 5 COUNTRIES BY REVENUE:")
-    country_rev = df.groupby('Country')['TotalAmount'].sum().sort_values(ascending=False).head()
-    for country, rev in country_rev.items():
-        print(f"    {country}: £{rev:,.2f}")
+    echo("\n  TOP 5 COUNTRIES BY REVENUE:")
+    for country, rev in tables['top_countries']:
+        echo(f"    {country}: £{rev:,.2f}")
 
     # Top 10 products by quantity sold
-    print("\n  TOP 10 PRODUCTS BY QUANTITY:")
-    top_products = df.groupby('Description')['Quantity'].sum().sort_values(ascending=False).head(10)
-    for desc, qty in top_products.items():
-        print(f"    {desc}: {qty:,} units")
+    echo("\n  TOP 10 PRODUCTS BY QUANTITY:")
+    for desc, qty in tables['top_products']:
+        echo(f"    {desc}: {qty:,} units")
 
     # Monthly revenue trend
-    print("\n  MONTHLY REVENUE TREND:")
-    monthly = df.groupby(['Year', 'Month'])['TotalAmount'].sum().round(2)
-    for (year, month), rev in monthly.items():
-        print(f"    {year}-{month:02d}: £{rev:,.2f}")
+    echo("\n  MONTHLY REVENUE TREND:")
+    for year, month, rev in tables['monthly']:
+        echo(f"    {year}-{month:02d}: £{round(rev, 2):,.2f}")
 
     # UK vs International
-    print("\n  UK vs INTERNATIONAL:")
-    uk_split = df.groupby('Is_UK').agg(
-        transactions=('InvoiceNo', 'count'),
-        revenue=('TotalAmount', 'sum')
-    ).round(2)
-    print(uk_split.to_string())
+    echo("\n  UK vs INTERNATIONAL:")
+    uk_split = pd.DataFrame(
+        [(label, n, rev) for label, (n, rev) in tables['uk_split'].items()],
+        columns=['Is_UK', 'transactions', 'revenue']
+    ).set_index('Is_UK').round(2)
+    echo(uk_split.to_string())
 
     return df
 
 
 # STEP 6: RUN PIPELINE
 
-def run_retail_pipeline(filepath):
-    """Execute the full ETL pipeline."""
-    print("=" * 60)
-    print("ONLINE RETAIL ETL PIPELINE — START")
-    print("=" * 60)
-
-    df = load_data(filepath)
-    df = explore_data(df)
-    df = clean_data(df)
-    df = transform_data(df)
-    df = generate_analytics(df)
+def pipeline_config():
+    """pipelines/retail.json without its quality checks (add those as extra
+    nodes on 'transform', see retail_loader.py)."""
+    config = load_config(CONFIG)
+    config['checks'] = []
+    return config
+
+
+def run_retail_pipeline(filepath, backend='pandas', output_path=None, output_format=None,
+                        dimensions_path=None, cache_dir=None, cube_path=None,
+                        rollup_path=None, memory_budget=None):
+    """Execute the full ETL pipeline and return the cleaned frame.
+
+    backend='duckdb' runs clean/transform out-of-core on DuckDB
+    (see module_04/duckdb_backend.py) for files larger than memory.
+
+    output_path: also write the cleaned frame as a directory partitioned by
+    Year/Month, in output_format 'parquet' (default), 'ipc' or 'csv'
+    (see module_04/output_writers.py).
+
+    dimensions_path: JSON file holding the customer/product/country key
+    dictionaries. Loaded when it exists, extended with new values and
+    saved back, so surrogate keys stay the same from one run to the next.
+
+    cache_dir: memoize stage outputs there (see module_04/dag.py), so a
+    re-run only recomputes the stages whose code or inputs changed.
+
+    cube_path: also pre-aggregate the cleaned frame into an analytics cube
+    and save it there (.npz, see retail_cube.py) for instant slicing.
+
+    rollup_path: also merge hourly revenue/order rollups into the Parquet
+    store in that directory (see retail_timeseries.py). Only the days
+    present in filepath are rewritten, so a file of new days is cheap.
+
+    memory_budget: bytes the run should stay within (see
+    module_04/memory_governor.py). Stage outputs waiting for their
+    consumers are spilled to disk when memory runs high, and each stage's
+    peak memory is reported.
+    """
+    df, _ = run_retail_pipeline_with(
+        filepath, [], backend=backend, output_path=output_path, output_format=output_format,
+        dimensions_path=dimensions_path, cache_dir=cache_dir, cube_path=cube_path,
+        rollup_path=rollup_path, memory_budget=memory_budget
+    )
+    return df
 
-    print("\n" + "=" * 60)
-    print(f"PIPELINE COMPLETE — {df.shape[0]:,} rows, {df.shape[1]} columns")
-    print("=" * 60)
 
-    return df
+def run_retail_pipeline_with(filepath, extra_nodes, backend='pandas', output_path=None,
+                             output_format=None, dimensions_path=None, cache_dir=None,
+                             cube_path=None, rollup_path=None, memory_budget=None):
+    """run_retail_pipeline plus extra_nodes, more DAG nodes to run with it
+    (e.g. quality checks on 'transform', concurrently with the analytics).
+
+    Returns (df, {name: output}).
+    """
+    output_nodes = []
+    if dimensions_path:
+        dims = load_dimensions(dimensions_path) if os.path.exists(dimensions_path) else None
+        output_nodes.append(node('dimensions', update_dimensions, ['transform'], dims=dims))
+    if cube_path:
+        from retail_cube import build_cube
+        output_nodes.append(node('cube', build_cube, ['transform']))
+    if rollup_path:
+        from retail_timeseries import timeseries_stage
+        output_nodes.append(node('rollups', timeseries_stage, ['transform'], cache=False,
+                                 store=rollup_path))
+    df, results = run_config_pipeline(
+        pipeline_config(), filepath, backend=backend, output_path=output_path,
+        output_format=output_format, cache_dir=cache_dir,
+        extra_nodes=list(extra_nodes) + output_nodes, memory_budget=memory_budget
+    )
+    if dimensions_path:
+        save_dimensions(results.pop('dimensions'), dimensions_path)
+
+    if cube_path:
+        from retail_cube import save_cube
+        save_cube(results.pop('cube'), cube_path)
+        print(f"\n  Analytics cube saved to {cube_path}")
+    results.pop('rollups', None)
+    return df, results
 
 
 if __name__ == '__main__':
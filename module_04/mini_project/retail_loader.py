@@ -1,92 +1,183 @@
+import contextlib
+import io
+
 import pandas as pd
 from sqlalchemy import create_engine, text
 from urllib.parse import quote_plus
-from retail_etl import run_retail_pipeline
+from retail_etl import run_retail_pipeline_with, clean_data, transform_data
+from retail_star import load_star_schema, analytics_queries
+from retail_customers import sql_customer_analytics, print_customer_report
+from retail_timeseries import update_rollups, print_timeseries_report
+
+from check_scheduler import STATUS_LEVELS, make_check, per_column, run_checks, count_statuses
+from checkpoint import make_job_key, load_with_checkpoints
+from dag import CACHE_DIR, node
+from pipeline_log import echo, log, log_table
+from pipeline_sources import loader_version
+from preflight import make_rule, run_preflight, print_preflight
+from fingerprint import (
+    plan_load, print_plan, read_partitions, tag_partitions, delete_partitions,
+    drop_kept_duplicates, full_load, record_load, PARTITION_COLUMN
+)
 
 
 # ============================================
 # STEP 1: QUALITY CHECKS
 # ============================================
 
-def run_quality_checks(df):
-    """Validate data before loading into database"""
-    
-    print("\n" + "=" * 60)
-    print("QUALITY CHECKS — START")
-    print("=" * 60)
-
-    checks = []
-    
-    # No nulls in critical columns 
-    for col in ['CustomerID', 'Description', 'Quantity', 'UnitPrice']:
+def check_nulls(df, columns):
+    """No nulls in the given columns."""
+    results = []
+    for col in columns:
         null_count = df[col].isnull().sum()
-        
         passed = null_count == 0
-        
-        checks.append({
+        results.append({
             'check': f'No nulls in {col}',
             'passed': passed,
             'details': f'{null_count} nulls' if not passed else 'Clean'
         })
-        
-        
-    # Quantity must be positive
-    bad_qty = (df['Quantity'] <= 0).sum()
-    checks.append({
-        'check': 'Quantity > 0',
-        'passed': bad_qty == 0,
-        'details': f'{bad_qty} invalid' if bad_qty > 0 else 'Clean'
-    })
-
-
-
-    # UnitPrice must be positive
-    bad_price = (df['UnitPrice'] <= 0).sum()
-    checks.append({
-        'check': 'UnitPrice > 0',
-        'passed': bad_price == 0,
-        'details': f'{bad_price} invalid' if bad_price > 0 else 'Clean'
-    })
-    
-    # TotalAmount must be positive
-    bad_total = (df['TotalAmount'] <= 0).sum()
-    checks.append({
-        'check': 'TotalAmount > 0',
-        'passed': bad_total == 0,
-        'details': f'{bad_total} invalid' if bad_total > 0 else 'Clean'
-    })
-    
-    # No duplicates
+    return results
+
+
+def check_positive(df, col):
+    """All values in col are > 0."""
+    bad = (df[col] <= 0).sum()
+    return {
+        'check': f'{col} > 0',
+        'passed': bad == 0,
+        'details': f'{bad} invalid' if bad > 0 else 'Clean'
+    }
+
+
+def check_no_duplicates(df):
+    """No exact duplicate rows."""
     dupes = df.duplicated().sum()
-    checks.append({
+    return {
         'check': 'No duplicate rows',
         'passed': dupes == 0,
         'details': f'{dupes} duplicates' if dupes > 0 else 'Clean'
-    })
+    }
+
+
+def build_quality_checks():
+    """The checks a cleaned frame must pass before loading."""
+    checks = []
+    
+    # No nulls in critical columns 
+    checks.extend(per_column(
+        check_nulls, ['CustomerID', 'Description', 'Quantity', 'UnitPrice']
+    ))
+
+    # Quantity, UnitPrice and TotalAmount must be positive
+    for col in ['Quantity', 'UnitPrice', 'TotalAmount']:
+        checks.append(make_check(check_positive, col))
+    
+    # No duplicates
+    checks.append(make_check(check_no_duplicates))
+    return checks
+
+
+def run_quality_checks(df, fail_fast=False):
+    """Validate data before loading into database.
+
+    Column checks run in parallel (see module_04/check_scheduler.py);
+    fail_fast rejects the load at the first failed blocking check.
+    """
+    
+    echo("\n" + "=" * 60)
+    echo("QUALITY CHECKS — START")
+    echo("=" * 60)
+
+    report = run_checks(df, build_quality_checks(), fail_fast=fail_fast)
     
     # Print report
-    print(f"\n  {'CHECK':<35} {'STATUS':<8} {'DETAILS'}")
-    print("  " + "-" * 60)
+    log('checks', f"\n  {'CHECK':<35} {'STATUS':<8} {'DETAILS'}\n  " + "-" * 60)
 
-    all_passed = True
-    for c in checks:
-        status = 'PASS' if c['passed'] else 'FAIL'
-        symbol = '[+]' if c['passed'] else '[X]'
-        print(f"  {symbol} {c['check']:<32} {status:<8} {c['details']}")
-        if not c['passed']:
-            all_passed = False
+    symbols = {'PASS': '[+]', 'FAIL': '[X]', 'WARN': '[!]'}
+    for c in report['results']:
+        if c['status'] == 'SKIP':
+            continue
+        log('check', f"  {symbols[c['status']]} {{check:<32}} {{status:<8}} {{details}}",
+            STATUS_LEVELS[c['status']], check=c['check'], status=c['status'],
+            details=c['details'], ms=c['ms'])
 
-    print("\n" + "=" * 60)
+    counts = count_statuses(report)
+    all_passed = report['passed']
+
+    echo("\n" + "=" * 60)
     if all_passed:
-        print(f"ALL {len(checks)} CHECKS PASSED — Data ready for loading")
+        log('checks_done', "ALL {total} CHECKS PASSED — Data ready for loading",
+            passed=True, total=len(report['results']), warnings=counts['WARN'])
     else:
-        print("CHECKS FAILED — DO NOT LOAD")
-    print("=" * 60)
+        log('checks_done', "CHECKS FAILED — DO NOT LOAD", 'error', passed=False,
+            total=len(report['results']), failed=counts['FAIL'], skipped=counts['SKIP'],
+            elapsed_ms=report['elapsed_ms'])
+        if counts['SKIP']:
+            echo(f"  Rejected after {report['elapsed_ms']:.1f} ms; "
+                  f"{counts['SKIP']} check(s) skipped")
+    echo("=" * 60)
 
     return all_passed
 
 
 
+# Raw-file rules for the preflight gate, with the failure rate above
+# which the export is rejected (the source itself has ~25% anonymous
+# rows and ~2% cancellations)
+PREFLIGHT_RULES = [
+    make_rule('null_customer_id', lambda d: d['CustomerID'].isnull(), max_rate=0.40),
+    make_rule('null_description', lambda d: d['Description'].isnull(), max_rate=0.05),
+    make_rule('non_positive_quantity',
+              lambda d: pd.to_numeric(d['Quantity'], errors='coerce') <= 0, max_rate=0.10),
+    make_rule('non_positive_price',
+              lambda d: pd.to_numeric(d['UnitPrice'], errors='coerce') <= 0, max_rate=0.05),
+    make_rule('non_numeric_quantity',
+              lambda d: pd.to_numeric(d['Quantity'], errors='coerce').isnull()
+              & d['Quantity'].notnull()),
+    make_rule('non_numeric_price',
+              lambda d: pd.to_numeric(d['UnitPrice'], errors='coerce').isnull()
+              & d['UnitPrice'].notnull()),
+    make_rule('unparseable_date',
+              lambda d: pd.to_datetime(d['InvoiceDate'], errors='coerce').isnull()
+              & d['InvoiceDate'].notnull()),
+]
+
+RAW_COLUMNS = ['InvoiceNo', 'StockCode', 'Description', 'Quantity',
+               'InvoiceDate', 'UnitPrice', 'CustomerID', 'Country']
+
+
+def run_preflight_checks(filepath, sample_size=100_000):
+    """Reject a bad export from a sample, before running the full ETL.
+
+    Raw rules are estimated on a stratified block sample (see
+    module_04/preflight.py). The sample is then cleaned and transformed
+    and must pass the same checks as the full data: one failing row in
+    the sample already proves the full checks would fail. Passing the
+    gate doesn't replace the exact checks, which still run afterwards.
+    """
+    report = run_preflight(filepath, PREFLIGHT_RULES, sample_size, columns=RAW_COLUMNS,
+                           encoding='latin1')
+    print_preflight(report)
+    if not report['passed']:
+        return False
+    sample = report['sample']
+
+    # Cleaned sample must pass the exact checks
+    try:
+        with contextlib.redirect_stdout(io.StringIO()):
+            cleaned = transform_data(clean_data(sample))
+    except Exception as exc:
+        print(f"  Preflight FAILED — sample does not clean: {exc!r}")
+        return False
+
+    checks = run_checks(cleaned, build_quality_checks(), fail_fast=True)
+    for r in checks['results']:
+        if r['status'] == 'FAIL':
+            print(f"  Preflight FAILED — cleaned sample: {r['check']} ({r['details']})")
+    return checks['passed']
+
+
+
 # ============================================
 # STEP 2: CREATE DATABASE
 # ============================================
@@ -133,15 +224,15 @@ def connect_to_db(db_name):
 # STEP 4: LOAD DATA INTO DATABASE
 # ============================================
 
-def load_to_database(df, engine, table_name):
+def load_to_database(df, engine, table_name, if_exists='replace'):
     """Load DataFrame into PostgreSQL table."""
     df.to_sql(
         name=table_name,
         con=engine,
-        if_exists='replace',
+        if_exists=if_exists,
         index=False
     )
-    print(f"  Loaded {len(df):,} rows into table: {table_name}")
+    log('loaded_table', "  Loaded {rows:,} rows into table: {table}", rows=len(df), table=table_name)
     
 
 
@@ -150,77 +241,43 @@ def load_to_database(df, engine, table_name):
 # STEP 5: SQL ANALYTICS
 # ============================================
 
-def run_sql_analytics(engine, table_name):
-    """Run SQL queries for business insights."""
-    print("\n=== SQL ANALYTICS ===")
+def run_sql_analytics(engine, table_name, schema='flat'):
+    """Run SQL queries for business insights.
+
+    schema='star' runs them against the fact table table_name joined to
+    the dim_* tables (see retail_star.py); the results are the same.
+    """
+    queries = analytics_queries(table_name, schema)
+    log('sql_analytics', "\n=== SQL ANALYTICS ===")
 
     # 1. Total revenue and transactions
-    query = f'''
-        SELECT
-            COUNT(*) as total_transactions,
-            ROUND(SUM("TotalAmount")::numeric, 2) as total_revenue,
-            COUNT(DISTINCT "CustomerID") as unique_customers
-        FROM {table_name}
-    '''
-    result = pd.read_sql(query, engine)
-    print(f"\n  OVERVIEW:")
-    print(f"    Transactions: {result['total_transactions'].iloc[0]:,}")
-    print(f"    Revenue: {result['total_revenue'].iloc[0]:,.2f}")
-    print(f"    Customers: {result['unique_customers'].iloc[0]:,}")
+    result = pd.read_sql(queries['overview'], engine)
+    log('sql_overview', "\n  OVERVIEW:\n    Transactions: {transactions:,}\n"
+        "    Revenue: {revenue:,.2f}\n    Customers: {customers:,}",
+        transactions=result['total_transactions'].iloc[0],
+        revenue=result['total_revenue'].iloc[0], customers=result['unique_customers'].iloc[0])
 
     # 2. Revenue by country (top 10)
-    query = f'''
-        SELECT "Country",
-               COUNT(*) as transactions,
-               ROUND(SUM("TotalAmount")::numeric, 2) as revenue
-        FROM {table_name}
-        GROUP BY "Country"
-        ORDER BY revenue DESC
-        LIMIT 10
-    '''
-    result = pd.read_sql(query, engine)
-    print(f"\n  TOP 10 COUNTRIES BY REVENUE:")
-    print(result.to_string(index=False))
+    result = pd.read_sql(queries['country'], engine)
+    log_table('sql_top_countries', "\n  TOP 10 COUNTRIES BY REVENUE:", result, index=False)
 
     # 3. Monthly revenue trend
-    query = f'''
-        SELECT "Year", "Month",
-               ROUND(SUM("TotalAmount")::numeric, 2) as revenue
-        FROM {table_name}
-        GROUP BY "Year", "Month"
-        ORDER BY "Year", "Month"
-    '''
-    result = pd.read_sql(query, engine)
-    print(f"\n  MONTHLY REVENUE:")
-    print(result.to_string(index=False))
+    result = pd.read_sql(queries['monthly'], engine)
+    log_table('sql_monthly_revenue', "\n  MONTHLY REVENUE:", result, index=False)
 
     # 4. Top 10 products by revenue
-    query = f'''
-        SELECT "Description",
-               SUM("Quantity") as total_qty,
-               ROUND(SUM("TotalAmount")::numeric, 2) as revenue
-        FROM {table_name}
-        GROUP BY "Description"
-        ORDER BY revenue DESC
-        LIMIT 10
-    '''
-    result = pd.read_sql(query, engine)
-    print(f"\n  TOP 10 PRODUCTS BY REVENUE:")
-    print(result.to_string(index=False))
+    result = pd.read_sql(queries['products'], engine)
+    log_table('sql_top_products', "\n  TOP 10 PRODUCTS BY REVENUE:", result, index=False)
 
     # 5. Top 10 customers by spending
-    query = f'''
-        SELECT "CustomerID",
-               COUNT(*) as transactions,
-               ROUND(SUM("TotalAmount")::numeric, 2) as total_spent
-        FROM {table_name}
-        GROUP BY "CustomerID"
-        ORDER BY total_spent DESC
-        LIMIT 10
-    '''
-    result = pd.read_sql(query, engine)
-    print(f"\n  TOP 10 CUSTOMERS BY SPENDING:")
-    print(result.to_string(index=False))
+    result = pd.read_sql(queries['customers'], engine)
+    log_table('sql_top_customers', "\n  TOP 10 CUSTOMERS BY SPENDING:", result, index=False)
+
+    # 6. RFM scores and cohort retention, computed in the database
+    print_customer_report(sql_customer_analytics(engine, table_name, schema))
+
+    # 7. Daily/weekly revenue from the hourly rollup table
+    print_timeseries_report(engine)
     
     
 
@@ -229,36 +286,106 @@ def run_sql_analytics(engine, table_name):
 # STEP 6: RUN RETAIL LOADER
 # ============================================
 
-def run_retail_loader(filepath, db_name, table_name):
-    """Full ETL: Clean -> Validate -> Load -> Analyze."""
+def run_retail_loader(filepath, db_name, table_name, incremental=True, preflight=False,
+                      schema='flat', plan=None):
+    """Full ETL: Clean -> Validate -> Load -> Analyze.
+
+    schema='star' loads table_name as a fact table of integer keys and
+    measures plus dim_product, dim_customer, dim_date and dim_country
+    instead of one wide table (see retail_star.py).
+
+    preflight=True first validates a sample of the raw file and aborts
+    before the ETL when it is clearly bad (see run_preflight_checks).
+
+    Full flat loads are committed in checkpointed chunks to a staging
+    table that is swapped in at the end (see module_04/checkpoint.py).
+
+    incremental=True skips the run when the CSV and pipeline code match
+    the last successful load, and reloads only the changed partitions of
+    the file otherwise (see module_04/fingerprint.py). A partial reload
+    drops rows that are already in the kept partitions and replaces the
+    stale rows and their rollups in one transaction; star schemas are
+    always reloaded in full. incremental=False reloads everything but
+    still tags and records the load, so the next incremental run can start
+    from it. plan is a plan_load plan the caller already made (see
+    cli.incremental_plan).
+    """
     print("=" * 60)
     print("RETAIL LOADER — START")
     print("=" * 60)
 
-    # EXTRACT & TRANSFORM (from Video 14)
-    df = run_retail_pipeline(filepath)
+    create_database(db_name)
+    engine = connect_to_db(db_name)
+
+    version = loader_version('retail', schema)
+
+    if plan is None or not incremental:
+        plan = plan_load(engine, table_name, filepath, version, force=not incremental)
+    print_plan(plan)
+    if plan['action'] == 'skip':
+        if plan['fingerprint'] is not None:
+            record_load(engine, table_name, filepath, plan)
+        engine.dispose()
+        print("\nSource and pipeline unchanged — nothing to load")
+        return
+    if plan['action'] == 'partial' and schema == 'star':
+        # Fact rows can't be checked against the kept ones for duplicates
+        print_plan(full_load(plan, 'star schemas reload in full'))
+
+    # PREFLIGHT (sample of the raw file)
+    if preflight and not run_preflight_checks(filepath):
+        print("\nPREFLIGHT FAILED — Aborting before ETL!")
+        engine.dispose()
+        return
+
+    # EXTRACT & TRANSFORM (from Video 14), VALIDATE — the quality checks
+    # run next to the analytics, and unchanged stages come from the cache
+    quality = node('quality', run_quality_checks, ['transform'], cache=False, fail_fast=True)
+    if plan['action'] == 'partial':
+        df, results = run_retail_pipeline_with(read_partitions(filepath, plan), [quality])
+    else:
+        df, results = run_retail_pipeline_with(filepath, [quality], cache_dir=CACHE_DIR)
 
-    # VALIDATE
-    passed = run_quality_checks(df)
+    passed = results['quality']
     if not passed:
         print("\nQUALITY CHECKS FAILED — Aborting load!")
+        engine.dispose()
         return
 
     # LOAD
     print("\n--- DATABASE LOADING ---")
-    create_database(db_name)
-    engine = connect_to_db(db_name)
-    load_to_database(df, engine, table_name)
+    df = tag_partitions(df, plan)
+    if plan['action'] == 'partial':
+        # Hourly rollups follow the same partitions as the rows, so a
+        # partial load only rewrites the rollups of the reloaded partitions;
+        # rows and rollups commit together
+        with engine.begin() as conn:
+            stale = plan['changed'] + plan['removed']
+            delete_partitions(conn, table_name, stale)
+            df = drop_kept_duplicates(conn, table_name, df)
+            load_to_database(df, conn, table_name, if_exists='append')
+            update_rollups(df, conn, df[PARTITION_COLUMN], removed=stale)
+    else:
+        if schema == 'star':
+            load_star_schema(df, engine, table_name)
+        else:
+            # Full loads go through a checkpointed staging table, so a crashed
+            # run resumes where it stopped and readers never see a partial table
+            job_key = make_job_key(plan['fingerprint']['content_hash'], version, len(df))
+            load_with_checkpoints(df, engine, table_name, job_key)
+        update_rollups(df, engine, df[PARTITION_COLUMN], replace_all=True)
 
     # VERIFY
-    print("\n--- VERIFICATION ---")
+    log('verify', "\n--- VERIFICATION ---")
     with engine.connect() as conn:
         result = conn.execute(text(f'SELECT COUNT(*) FROM {table_name}'))
         count = result.scalar()
-        print(f"  Row count in DB: {count:,}")
+        log('row_count', "  Row count in DB: {rows:,}", rows=count, table=table_name)
+
+    record_load(engine, table_name, filepath, plan, len(df))
 
     # SQL ANALYTICS
-    run_sql_analytics(engine, table_name)
+    run_sql_analytics(engine, table_name, schema)
 
     engine.dispose()
 
@@ -268,4 +395,4 @@ def run_retail_loader(filepath, db_name, table_name):
 
 
 if __name__ == '__main__':
-    run_retail_loader('data/OnlineRetail.csv','retail_analytics_db', 'transactions')
\ No newline at end of file
+    run_retail_loader('data/OnlineRetail.csv','retail_analytics_db', 'transactions')
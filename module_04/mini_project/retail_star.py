@@ -0,0 +1,328 @@
+import os
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+from sqlalchemy import inspect, text
+
+# Shared pipeline modules live one level up, in module_04/
+MODULE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+if MODULE_DIR not in sys.path:
+    sys.path.append(MODULE_DIR)
+
+from pg_copy import psql_insert_copy
+from retail_dimensions import encode_column
+
+# Dimension tables of the star schema: (key column, natural key columns,
+# attribute columns). Keys are dense integers assigned on first sight and
+# never renumbered, so later loads only append new members.
+STAR_DIMENSIONS = {
+    'dim_product': ('product_key', ['StockCode', 'Description'], []),
+    'dim_customer': ('customer_key', ['CustomerID'], []),
+    'dim_country': ('country_key', ['Country'], ['Is_UK']),
+    'dim_date': ('date_key', ['Date'], ['Year', 'Quarter', 'Month', 'Day', 'DayOfWeek']),
+}
+
+# Fact table columns: keys, the invoice number (degenerate dimension), the
+# full timestamp and the measures
+FACT_COLUMNS = [
+    'InvoiceNo', 'InvoiceDate', 'date_key', 'product_key', 'customer_key',
+    'country_key', 'Quantity', 'UnitPrice', 'TotalAmount',
+]
+
+
+# ============================================
+# STEP 1: ASSIGN SURROGATE KEYS
+# ============================================
+
+def _existing_members(engine, table, key_col, natural):
+    """Members already in a dimension table, ordered by key."""
+    if table not in inspect(engine).get_table_names():
+        return None
+    cols = ', '.join(f'"{c}"' for c in [key_col] + natural)
+    return pd.read_sql(f'SELECT {cols} FROM {table} ORDER BY "{key_col}"', engine)
+
+
+def _encode_pairs(natural, existing):
+    """Dense codes for rows of a multi-column natural key (see encode_column)."""
+    local_codes, uniques = pd.MultiIndex.from_frame(natural).factorize()
+    if existing is None or existing.empty:
+        known = pd.MultiIndex.from_tuples([], names=natural.columns)
+        start = 0
+    else:
+        known = pd.MultiIndex.from_frame(existing[natural.columns])
+        start = len(existing)
+    mapping = known.get_indexer(uniques)
+    unseen = mapping < 0
+    mapping[unseen] = np.arange(start, start + unseen.sum())
+    new_members = uniques[unseen].to_frame(index=False)
+    new_members.columns = natural.columns  # factorize drops the level names
+    return mapping[local_codes].astype(np.int32), new_members, mapping[unseen]
+
+
+def date_attributes(dates):
+    """dim_date rows for an array of calendar days."""
+    dates = pd.DatetimeIndex(dates)
+    return pd.DataFrame({
+        'date_key': (dates.year * 10000 + dates.month * 100 + dates.day).astype(np.int32),
+        'Date': dates.date,
+        'Year': dates.year.astype(np.int16),
+        'Quarter': dates.quarter.astype(np.int16),
+        'Month': dates.month.astype(np.int16),
+        'Day': dates.day.astype(np.int16),
+        'DayOfWeek': dates.day_name(),
+    })
+
+
+def build_star(df, engine=None, replace=True):
+    """Split a cleaned retail frame into a fact table and dimension rows.
+
+    Returns (fact, new_members): new_members maps each dimension table to
+    the rows it does not have yet. With replace=False the keys already in
+    the database are reused, so appended facts join to the same members.
+    """
+    fact = pd.DataFrame(index=df.index)
+    new_members = {}
+
+    for table, (key_col, natural, attributes) in STAR_DIMENSIONS.items():
+        if table == 'dim_date':
+            continue
+        existing = None if replace or engine is None else _existing_members(
+            engine, table, key_col, natural)
+
+        if len(natural) == 1:
+            keys = (np.empty(0, dtype=object) if existing is None
+                    else existing[natural[0]].to_numpy(dtype=object))
+            codes, keys = encode_column(df[natural[0]].to_numpy(), keys)
+            first_new = 0 if existing is None else len(existing)
+            members = pd.DataFrame({natural[0]: keys[first_new:]})
+            member_keys = np.arange(first_new, len(keys))
+        else:
+            codes, members, member_keys = _encode_pairs(df[natural], existing)
+
+        # Attributes are functionally dependent on the natural key
+        if attributes and len(members):
+            seen, first_rows = np.unique(codes, return_index=True)
+            rows = first_rows[np.searchsorted(seen, member_keys)]
+            members[attributes] = df[attributes].to_numpy()[rows]
+
+        members.insert(0, key_col, np.asarray(member_keys, dtype=np.int32))
+        fact[key_col] = codes
+        new_members[table] = members
+
+    # Dates use a readable yyyymmdd key instead of an arbitrary code
+    day = df['InvoiceDate'].dt.normalize()
+    fact['date_key'] = (day.dt.year * 10000 + day.dt.month * 100 + day.dt.day).astype(np.int32)
+    dates = date_attributes(day.drop_duplicates().sort_values())
+    if not replace and engine is not None:
+        existing = _existing_members(engine, 'dim_date', 'date_key', [])
+        if existing is not None:
+            dates = dates[~dates['date_key'].isin(existing['date_key'])]
+    new_members['dim_date'] = dates
+
+    for col in ['InvoiceNo', 'InvoiceDate', 'UnitPrice', 'TotalAmount']:
+        fact[col] = df[col]
+    fact['Quantity'] = df['Quantity'].astype(np.int32)
+    for col in df.columns:
+        if col.startswith('_'):  # bookkeeping columns such as _source_partition
+            fact[col] = df[col]
+    fact['country_key'] = fact['country_key'].astype(np.int16)
+    extra = [c for c in fact.columns if c not in FACT_COLUMNS]
+    return fact[FACT_COLUMNS + extra], new_members
+
+
+# ============================================
+# STEP 2: BULK LOAD
+# ============================================
+
+def load_star_schema(df, engine, fact_table, replace=True):
+    """Load df as fact_table plus the dim_* tables, using COPY.
+
+    replace=True rebuilds every table. replace=False appends the facts and
+    only the dimension members the database has not seen (incremental
+    loads); the dimensions never get duplicate members either way.
+    """
+    start = time.perf_counter()
+    tables_before = set(inspect(engine).get_table_names())
+    fact, new_members = build_star(df, engine, replace)
+
+    if replace:
+        with engine.begin() as conn:
+            conn.exec_driver_sql(f'DROP TABLE IF EXISTS {fact_table}')
+
+    for table, members in new_members.items():
+        key_col = STAR_DIMENSIONS[table][0]
+        members.to_sql(table, engine, if_exists='replace' if replace else 'append',
+                       index=False, method=psql_insert_copy, chunksize=100_000)
+        if replace or table not in tables_before:
+            with engine.begin() as conn:
+                conn.exec_driver_sql(f'ALTER TABLE {table} ADD PRIMARY KEY ("{key_col}")')
+        print(f"  Loaded {len(members):,} new rows into {table}")
+
+    fact.to_sql(fact_table, engine, if_exists='replace' if replace else 'append',
+                index=False, method=psql_insert_copy, chunksize=100_000)
+    print(f"  Loaded {len(fact):,} rows into fact table: {fact_table} "
+          f"({time.perf_counter() - start:.2f}s)")
+
+
+# ============================================
+# STEP 3: ANALYTICS QUERIES
+# ============================================
+
+def _pre_aggregated(table_name, key_col, dim_table, alias):
+    """Fact rows summed per surrogate key, then joined to one dimension.
+
+    Grouping the fact table on a narrow integer key and joining only the
+    few resulting rows is much cheaper than joining every fact row first.
+    """
+    return (f'(SELECT {key_col}, COUNT(*) AS n, SUM("Quantity") AS qty, '
+            f'SUM("TotalAmount") AS amount FROM {table_name} GROUP BY {key_col}) f '
+            f'JOIN {dim_table} {alias} USING ({key_col})')
+
+
+def analytics_queries(table_name, schema='flat'):
+    """The run_sql_analytics queries for a flat table or a star schema.
+
+    Both versions return the same columns and rows. The star version
+    aggregates the fact table by key and looks up names in the dim_*
+    tables afterwards.
+    """
+    if schema == 'flat':
+        sources = {name: table_name for name in ['country', 'monthly', 'products', 'customers']}
+        count, qty, amount = 'COUNT(*)', 'SUM("Quantity")', 'SUM("TotalAmount")'
+        country, year, month = '"Country"', '"Year"', '"Month"'
+        description, customer = '"Description"', '"CustomerID"'
+        customer_key = '"CustomerID"'
+    else:
+        sources = {
+            'country': _pre_aggregated(table_name, 'country_key', 'dim_country', 'c'),
+            'monthly': _pre_aggregated(table_name, 'date_key', 'dim_date', 'd'),
+            'products': _pre_aggregated(table_name, 'product_key', 'dim_product', 'p'),
+            'customers': _pre_aggregated(table_name, 'customer_key', 'dim_customer', 'cu'),
+        }
+        count, qty, amount = 'SUM(f.n)::bigint', 'SUM(f.qty)', 'SUM(f.amount)'
+        country, year, month = 'c."Country"', 'd."Year"', 'd."Month"'
+        description, customer = 'p."Description"', 'cu."CustomerID"'
+        customer_key = 'customer_key'
+
+    return {
+        'overview': f'''
+            SELECT
+                COUNT(*) as total_transactions,
+                ROUND(SUM("TotalAmount")::numeric, 2) as total_revenue,
+                COUNT(DISTINCT {customer_key}) as unique_customers
+            FROM {table_name}
+        ''',
+        'country': f'''
+            SELECT {country},
+                   {count} as transactions,
+                   ROUND({amount}::numeric, 2) as revenue
+            FROM {sources['country']}
+            GROUP BY {country}
+            ORDER BY revenue DESC
+            LIMIT 10
+        ''',
+        'monthly': f'''
+            SELECT {year}::int as "Year", {month}::int as "Month",
+                   ROUND({amount}::numeric, 2) as revenue
+            FROM {sources['monthly']}
+            GROUP BY {year}, {month}
+            ORDER BY {year}, {month}
+        ''',
+        'products': f'''
+            SELECT {description},
+                   {qty} as total_qty,
+                   ROUND({amount}::numeric, 2) as revenue
+            FROM {sources['products']}
+            GROUP BY {description}
+            ORDER BY revenue DESC
+            LIMIT 10
+        ''',
+        'customers': f'''
+            SELECT {customer},
+                   {count} as transactions,
+                   ROUND({amount}::numeric, 2) as total_spent
+            FROM {sources['customers']}
+            GROUP BY {customer}
+            ORDER BY total_spent DESC
+            LIMIT 10
+        ''',
+    }
+
+
+# ============================================
+# BENCHMARK
+# ============================================
+
+def table_bytes(engine, tables):
+    """Total on-disk size (heap + indexes + TOAST) of tables."""
+    with engine.connect() as conn:
+        return sum(
+            conn.execute(text(f"SELECT pg_total_relation_size('{t}')")).scalar()
+            for t in tables
+        )
+
+
+def benchmark_schemas(engine, flat_table, fact_table, repeats=5):
+    """Compare size and query latency of the flat table and the star schema.
+
+    Both must already be loaded from the same data. Each query's results
+    are checked to match before timing.
+    """
+    with engine.begin() as conn:
+        for table in [flat_table, fact_table] + list(STAR_DIMENSIONS):
+            conn.exec_driver_sql(f'ANALYZE {table}')
+
+    flat_mb = table_bytes(engine, [flat_table]) / 1e6
+    fact_mb = table_bytes(engine, [fact_table]) / 1e6
+    dims_mb = table_bytes(engine, list(STAR_DIMENSIONS)) / 1e6
+    print(f"\n=== FLAT vs STAR SCHEMA ===")
+    print(f"  Size: flat {flat_mb:,.1f} MB | star {fact_mb + dims_mb:,.1f} MB "
+          f"(fact {fact_mb:,.1f} MB + dimensions {dims_mb:,.1f} MB)")
+
+    flat_queries = analytics_queries(flat_table, 'flat')
+    star_queries = analytics_queries(fact_table, 'star')
+    print(f"  {'QUERY':<10} {'FLAT ms':>9} {'STAR ms':>9}")
+    for name in flat_queries:
+        timings = {}
+        results = {}
+        for schema, sql in [('flat', flat_queries[name]), ('star', star_queries[name])]:
+            times = []
+            for _ in range(repeats):
+                start = time.perf_counter()
+                results[schema] = pd.read_sql(sql, engine)
+                times.append(time.perf_counter() - start)
+            timings[schema] = np.median(times) * 1000
+        same = results['flat'].to_numpy().tolist() == results['star'].to_numpy().tolist()
+        print(f"  {name:<10} {timings['flat']:>9.1f} {timings['star']:>9.1f}"
+              f"{'' if same else '  (results differ)'}")
+
+
+def benchmark(n_rows=1_000_000, db_name='retail_star_bench', seed=0):
+    """Load synthetic retail data both ways and compare them."""
+    import contextlib
+    import io
+
+    from retail_etl import clean_data, transform_data
+    from retail_loader import create_database, connect_to_db
+    from synthetic_data import make_retail_data
+
+    with contextlib.redirect_stdout(io.StringIO()):
+        df = transform_data(clean_data(make_retail_data(n_rows, seed)))
+        create_database(db_name)
+        engine = connect_to_db(db_name)
+
+    start = time.perf_counter()
+    df.to_sql('transactions', engine, if_exists='replace', index=False,
+              method=psql_insert_copy, chunksize=100_000)
+    print(f"\n  Loaded {len(df):,} rows into flat table: transactions "
+          f"({time.perf_counter() - start:.2f}s)")
+    load_star_schema(df, engine, 'sales')
+
+    benchmark_schemas(engine, 'transactions', 'sales')
+    engine.dispose()
+
+
+if __name__ == '__main__':
+    benchmark()
@@ -0,0 +1,285 @@
+import contextlib
+import io
+import os
+import shutil
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+from sqlalchemy import Connection, inspect, text
+
+# Shared pipeline modules live one level up, in module_04/
+MODULE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+if MODULE_DIR not in sys.path:
+    sys.path.append(MODULE_DIR)
+
+from pg_copy import psql_insert_copy
+from pipeline_log import echo
+
+try:
+    import pyarrow
+except ImportError:  # optional dependency
+    pyarrow = None
+
+# Only hourly rollups are stored. Days and weeks (starting Monday, as in
+# Postgres date_trunc) are exact sums of them, computed on read.
+GRAINS = ['hour', 'day', 'week']
+MEASURES = ['revenue', 'quantity', 'orders', 'lines']
+
+# Postgres summary table (used when the store is an engine)
+ROLLUP_TABLE = 'rollup_hourly'
+# Stored rows a merge replaces: those with the same key as a new row. The
+# loader's source partitions are replaced whole (a reloaded partition may
+# have lost hours); the default day partitions hour by hour and country by
+# country, since a file may cover only part of a day already stored
+PARTITION_KEY = ['partition']
+HOUR_KEY = ['partition', 'bucket', 'Country']
+
+# Weeks shown by print_timeseries_report
+REPORT_WEEKS = 8
+
+
+# ============================================
+# STEP 1: HOURLY ROLLUP (ONE PASS OVER THE ROWS)
+# ============================================
+
+def compute_rollups(df, partition=None):
+    """Hourly revenue / quantity / orders / lines per country and partition.
+
+    partition: array of partition ids per row (e.g. the loader's source
+    partitions); by default each calendar day is its own partition, so a
+    new day of data only touches its own rollups. An order is counted in
+    the bucket of its invoice's first line within the partition, so a
+    partition's rollup depends only on its own rows.
+    """
+    hour = df['InvoiceDate'].to_numpy().astype('datetime64[h]')
+    if partition is None:
+        partition = hour.astype('datetime64[D]').astype(str)
+    rows = pd.DataFrame({
+        'partition': np.asarray(partition).astype(str),
+        'bucket': hour.astype('datetime64[ns]'),
+        'Country': df['Country'].to_numpy(),
+        'revenue': df['TotalAmount'].to_numpy(),
+        'quantity': df['Quantity'].to_numpy(),
+        'InvoiceNo': df['InvoiceNo'].to_numpy(),
+        'lines': 1,
+    })
+    rows['orders'] = ~rows.duplicated(['partition', 'InvoiceNo'])
+    rows = rows.drop(columns='InvoiceNo')
+    rollup = rows.groupby(['partition', 'bucket', 'Country'], sort=False).sum().reset_index()
+    rollup['orders'] = rollup['orders'].astype(np.int64)
+    return rollup
+
+
+def resample(rollup, grain='day', by_country=False):
+    """Sum hourly rollup rows into hour/day/week buckets (weeks start Monday)."""
+    if grain not in GRAINS:
+        raise ValueError(f"grain must be one of {GRAINS}, got {grain!r}")
+    bucket = rollup['bucket'].to_numpy().astype('datetime64[h]' if grain == 'hour'
+                                                else 'datetime64[D]')
+    if grain == 'week':
+        # 1970-01-01 was a Thursday: shift by 3 so Mondays land on 0
+        bucket = bucket - (bucket.astype(np.int64) + 3) % 7
+    keys = [pd.Series(bucket.astype('datetime64[ns]'), name='bucket')]
+    if by_country:
+        keys.append(rollup['Country'].reset_index(drop=True))
+    return rollup[MEASURES].reset_index(drop=True).groupby(keys).sum()
+
+
+# ============================================
+# STEP 2: MERGE INTO A STORE (O(NEW DATA))
+# ============================================
+
+def _require_pyarrow():
+    if pyarrow is None:
+        raise ImportError("Parquet rollups need 'pip install pyarrow'")
+
+
+def _partition_file(path, partition):
+    return os.path.join(path, f'partition={partition}.parquet')
+
+
+def merge_parquet(rollup, path, replace_all=False, removed=(), key=PARTITION_KEY):
+    """Write each partition's rollup to its own Parquet file under path.
+
+    The stored rows with the same key as a new row are replaced (see
+    HOUR_KEY), and the partition's file is rewritten through a temp file
+    and a rename, so merging a new day costs only that day's rows and a
+    re-run is idempotent. replace_all starts the store over.
+    """
+    _require_pyarrow()
+    if replace_all and os.path.isdir(path):
+        shutil.rmtree(path)
+    os.makedirs(path, exist_ok=True)
+    for partition in removed:
+        with contextlib.suppress(FileNotFoundError):
+            os.remove(_partition_file(path, partition))
+    for partition, rows in rollup.groupby('partition', sort=False):
+        # Readers skip dot-files, so a half-written temp file is never read
+        target = _partition_file(path, partition)
+        rows = rows.drop(columns='partition')
+        if key != PARTITION_KEY and os.path.exists(target):
+            stored = pd.read_parquet(target)
+            new = pd.MultiIndex.from_frame(rows[key[1:]])
+            kept = stored[~pd.MultiIndex.from_frame(stored[key[1:]]).isin(new)]
+            rows = pd.concat([kept, rows], ignore_index=True).sort_values(key[1:])
+        tmp = os.path.join(path, f'.{os.path.basename(target)}.tmp')
+        rows.to_parquet(tmp, index=False)
+        os.replace(tmp, target)
+
+
+def merge_postgres(rollup, engine, replace_all=False, removed=(), key=PARTITION_KEY):
+    """Replace the stored rows with the same key as a new row (see
+    HOUR_KEY) and those of the removed partitions in ROLLUP_TABLE.
+
+    The delete and the COPY of the new rows commit together. engine may
+    also be a Connection in an open transaction, which the caller commits
+    (retail_loader commits a partial reload's rows and rollups together).
+    """
+    transaction = (contextlib.nullcontext(engine) if isinstance(engine, Connection)
+                   else engine.begin())
+    with transaction as conn:
+        if ROLLUP_TABLE not in inspect(conn).get_table_names():
+            conn.execute(text(f'''
+                CREATE TABLE {ROLLUP_TABLE} (
+                    "partition"  TEXT NOT NULL,
+                    bucket       TIMESTAMP NOT NULL,
+                    "Country"    TEXT NOT NULL,
+                    revenue      DOUBLE PRECISION NOT NULL,
+                    quantity     BIGINT NOT NULL,
+                    orders       BIGINT NOT NULL,
+                    lines        BIGINT NOT NULL,
+                    PRIMARY KEY ("partition", bucket, "Country")
+                )
+            '''))
+        if replace_all:
+            conn.exec_driver_sql(f'TRUNCATE {ROLLUP_TABLE}')
+        else:
+            stale = [str(p) for p in removed]
+            if key == PARTITION_KEY:
+                stale += list(rollup['partition'].unique())
+            else:
+                conn.execute(text(f'''
+                    DELETE FROM {ROLLUP_TABLE} r
+                    USING unnest(CAST(:p AS TEXT[]), CAST(:b AS TIMESTAMP[]),
+                                 CAST(:c AS TEXT[])) AS k(p, b, c)
+                    WHERE r."partition" = k.p AND r.bucket = k.b AND r."Country" = k.c
+                '''), {'p': rollup['partition'].tolist(),
+                       'b': rollup['bucket'].astype(str).tolist(),
+                       'c': rollup['Country'].tolist()})
+            conn.execute(text(f'DELETE FROM {ROLLUP_TABLE} WHERE "partition" = ANY(:p)'),
+                         {'p': stale})
+        rollup.to_sql(ROLLUP_TABLE, conn, if_exists='append', index=False,
+                      method=psql_insert_copy)
+
+
+def update_rollups(df, store, partition=None, replace_all=False, removed=()):
+    """Roll up df and merge it into store: a Parquet directory path or a
+    SQLAlchemy engine or Connection (see merge_postgres). Returns the new
+    hourly rollup rows.
+
+    Given partitions replace their stored rollups whole; the default day
+    partitions are merged hour by hour (see HOUR_KEY)."""
+    rollup = compute_rollups(df, partition)
+    key = HOUR_KEY if partition is None else PARTITION_KEY
+    if isinstance(store, (str, os.PathLike)):
+        merge_parquet(rollup, store, replace_all, removed, key)
+    else:
+        merge_postgres(rollup, store, replace_all, removed, key)
+    return rollup
+
+
+# ============================================
+# STEP 3: READ SERIES
+# ============================================
+
+def read_rollups(store, grain='day', by_country=False):
+    """Revenue, quantity, orders and lines per grain bucket from a store."""
+    if grain not in GRAINS:
+        raise ValueError(f"grain must be one of {GRAINS}, got {grain!r}")
+    if isinstance(store, (str, os.PathLike)):
+        _require_pyarrow()
+        if not os.path.isdir(store) or not os.listdir(store):
+            return pd.DataFrame(columns=MEASURES)
+        return resample(pd.read_parquet(store), grain, by_country)
+
+    country = ', "Country"' if by_country else ''
+    sql = f'''
+        SELECT date_trunc('{grain}', bucket) AS bucket{country},
+               SUM(revenue) AS revenue, SUM(quantity)::bigint AS quantity,
+               SUM(orders)::bigint AS orders, SUM(lines)::bigint AS lines
+        FROM {ROLLUP_TABLE}
+        GROUP BY 1{', 2' if by_country else ''}
+        ORDER BY 1{', 2' if by_country else ''}
+    '''
+    index = ['bucket', 'Country'] if by_country else 'bucket'
+    return pd.read_sql(sql, store, index_col=index)
+
+
+def print_timeseries_report(store):
+    weekly = read_rollups(store, 'week')
+    hourly = read_rollups(store, 'hour')
+    echo("\n=== REVENUE TIME SERIES ===")
+    echo(f"  Stored hourly buckets: {len(hourly):,} | "
+          f"days: {len(read_rollups(store, 'day')):,} | weeks: {len(weekly):,}")
+    if len(hourly):
+        busiest = hourly.groupby(hourly.index.hour)['revenue'].sum().idxmax()
+        echo(f"  Busiest hour of day: {busiest:02d}:00")
+    echo(f"\n  WEEKLY REVENUE (last {REPORT_WEEKS} weeks):")
+    for week in weekly.tail(REPORT_WEEKS).itertuples():
+        echo(f"    {week.Index:%Y-%m-%d}: £{week.revenue:,.2f} ({int(week.orders):,} orders)")
+
+
+def timeseries_stage(df, store):
+    """Pipeline stage after transform_data: merge the day partitions of df
+    into the rollup store and print the weekly series."""
+    update_rollups(df, store)
+    print_timeseries_report(store)
+    return store
+
+
+# ============================================
+# BENCHMARK
+# ============================================
+
+def benchmark(n_rows=1_000_000, db_name='retail_timeseries_bench', seed=0):
+    """Full recompute of every rollup vs merging one new day of data."""
+    import tempfile
+
+    import retail_etl
+    from retail_loader import create_database, connect_to_db
+    from synthetic_data import make_retail_data
+
+    with contextlib.redirect_stdout(io.StringIO()):
+        df = retail_etl.transform_data(retail_etl.clean_data(make_retail_data(n_rows, seed)))
+        create_database(db_name)
+        engine = connect_to_db(db_name)
+
+    last_day = df['InvoiceDate'].dt.normalize().max()
+    history, new_day = df[df['InvoiceDate'] < last_day], df[df['InvoiceDate'] >= last_day]
+    expected = resample(compute_rollups(df), 'day', by_country=True)
+
+    print(f"\n=== INCREMENTAL ROLLUPS: {len(history):,} rows of history, "
+          f"{len(new_day):,} new rows ===")
+    print(f"  {'STORE':<10} {'FULL RECOMPUTE s':>17} {'MERGE NEW DAY s':>16}")
+    with tempfile.TemporaryDirectory() as tmp:
+        for label, store in [('parquet', os.path.join(tmp, 'rollups')), ('postgres', engine)]:
+            update_rollups(history, store, replace_all=True)
+
+            start = time.perf_counter()
+            update_rollups(new_day, store)
+            merge_s = time.perf_counter() - start
+            merged = read_rollups(store, 'day', by_country=True)
+
+            start = time.perf_counter()
+            update_rollups(df, store, replace_all=True)
+            full_s = time.perf_counter() - start
+
+            assert np.allclose(merged.to_numpy(dtype=float), expected.to_numpy(dtype=float))
+            print(f"  {label:<10} {full_s:>17.2f} {merge_s:>16.3f}")
+    engine.dispose()
+
+
+if __name__ == '__main__':
+    benchmark()
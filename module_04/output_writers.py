@@ -0,0 +1,258 @@
+import gzip
+import os
+import shutil
+import time
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import quote
+
+import numpy as np
+import pandas as pd
+
+from compressed_io import codec_for
+from pipeline_log import echo
+
+try:
+    import pyarrow as pa
+    import pyarrow.csv as pa_csv
+    import pyarrow.dataset as ds
+    import pyarrow.parquet as pq
+except ImportError:  # optional dependency
+    pa = None
+
+# Uncompressed bytes per Parquet row group / IPC record batch. Large groups
+# keep column chunks big enough for efficient scans and predicate pushdown
+# while bounding the memory one group needs on write.
+ROW_GROUP_BYTES = 128 * 1024 * 1024
+
+FORMATS = {
+    'parquet': '.parquet',
+    'ipc': '.arrow',
+    'csv': '.csv',
+}
+
+GZIP_LEVEL = 6
+
+NULL_PARTITION = '__HIVE_DEFAULT_PARTITION__'
+
+
+# ============================================
+# STEP 1: SCHEMA AND ROW GROUP SIZE
+# ============================================
+
+def _require_pyarrow():
+    if pa is None:
+        raise ImportError("Parquet/Arrow output needs 'pip install pyarrow'")
+
+
+def arrow_schema(df, sample_rows=10_000):
+    """Arrow schema for df, inferred from a sample of rows.
+
+    Columns that are entirely null in the sample are typed as strings.
+    """
+    sample = pa.Table.from_pandas(df.iloc[:sample_rows], preserve_index=False)
+    fields = [
+        pa.field(f.name, pa.string()) if pa.types.is_null(f.type) else f
+        for f in sample.schema
+    ]
+    return pa.schema(fields)
+
+
+def row_group_rows(df, target_bytes=ROW_GROUP_BYTES, sample_rows=10_000):
+    """Rows per row group so each group holds about target_bytes."""
+    sample = pa.Table.from_pandas(df.iloc[:sample_rows], preserve_index=False)
+    bytes_per_row = max(sample.nbytes / max(sample.num_rows, 1), 1)
+    return max(1, int(target_bytes // bytes_per_row))
+
+
+def _slices(n_rows, size):
+    return [(start, min(start + size, n_rows)) for start in range(0, n_rows, size)]
+
+
+# ============================================
+# STEP 2: SINGLE-FILE WRITERS
+# ============================================
+
+def _write_parquet_file(df, path, schema, rows_per_group, compression):
+    """Stream df to one Parquet file, one row group at a time."""
+    with pq.ParquetWriter(path, schema, compression=compression) as writer:
+        for start, end in _slices(len(df), rows_per_group):
+            batch = pa.Table.from_pandas(
+                df.iloc[start:end], schema=schema, preserve_index=False
+            )
+            writer.write_table(batch, row_group_size=rows_per_group)
+
+
+def _write_ipc_file(df, path, schema, rows_per_group, compression):
+    """Stream df to one Arrow IPC (Feather v2) file, one batch at a time."""
+    options = pa.ipc.IpcWriteOptions(compression=compression)
+    with pa.OSFile(path, 'wb') as sink, pa.ipc.new_file(sink, schema, options=options) as writer:
+        for start, end in _slices(len(df), rows_per_group):
+            writer.write_table(
+                pa.Table.from_pandas(df.iloc[start:end], schema=schema, preserve_index=False),
+                max_chunksize=rows_per_group
+            )
+
+
+def _write_csv_file(df, path, schema, rows_per_group, compression):
+    """Stream df to one CSV file through Arrow's CSV writer and codec."""
+    # The CSV writer takes plain columns, so categoricals are written as text
+    schema = pa.schema([
+        pa.field(f.name, f.type.value_type) if pa.types.is_dictionary(f.type) else f
+        for f in schema
+    ])
+    if compression == 'gzip':
+        # Arrow's gzip stream always uses level 9; level 6 is ~4x faster
+        sink = pa.PythonFile(gzip.open(path, 'wb', compresslevel=GZIP_LEVEL), mode='w')
+    elif compression:
+        sink = pa.CompressedOutputStream(path, compression)
+    else:
+        sink = pa.OSFile(path, 'wb')
+    with sink, pa_csv.CSVWriter(sink, schema) as writer:
+        for start, end in _slices(len(df), rows_per_group):
+            batch = pa.Table.from_pandas(df.iloc[start:end], preserve_index=False)
+            writer.write_table(batch.cast(schema))
+
+
+WRITERS = {
+    'parquet': (_write_parquet_file, 'zstd'),
+    'ipc': (_write_ipc_file, 'zstd'),
+    'csv': (_write_csv_file, 'gzip'),
+}
+
+
+def _file_name(fmt, compression):
+    name = 'part-0' + FORMATS[fmt]
+    if fmt == 'csv' and compression:
+        name += {'gzip': '.gz', 'bz2': '.bz2', 'zstd': '.zst'}[compression]
+    return name
+
+
+# ============================================
+# STEP 3: PARTITIONED OUTPUT
+# ============================================
+
+def _partition_dir(keys, values):
+    """Hive-style directory, e.g. Year=2011/Month=3."""
+    parts = []
+    for key, value in zip(keys, values):
+        text = NULL_PARTITION if pd.isna(value) else quote(str(value), safe='')
+        parts.append(f'{key}={text}')
+    return os.path.join(*parts)
+
+
+def write_output(df, output_path, fmt=None, partition_cols=None, compression=None,
+                 row_group_bytes=ROW_GROUP_BYTES, max_workers=None):
+    """Write a cleaned frame as Parquet, Arrow IPC or compressed CSV.
+
+    fmt defaults to the output_path extension ('parquet' for directories).
+    With partition_cols the output is a Hive-style directory
+    (output_path/Year=2011/Month=3/part-0.parquet) that readers can prune
+    by partition; the partition columns are kept in the directory names,
+    not in the files. Partitions are written in parallel, each streamed in
+    row groups of about row_group_bytes. Output goes to a temporary path
+    and is renamed into place, so readers never see a half-written result.
+    """
+    _require_pyarrow()
+    fmt = fmt or _format_from_path(output_path)
+    write_file, default_compression = WRITERS[fmt]
+    if fmt == 'csv' and not partition_cols:
+        # A single CSV is compressed as its extension says (.csv.gz, ...)
+        compression = compression or codec_for(output_path)
+    else:
+        compression = compression or default_compression
+    if fmt == 'csv' and compression not in (None, 'gzip', 'bz2', 'zstd'):
+        raise ValueError(f"CSV output supports gzip, bz2 or zstd, not {compression!r}")
+
+    start = time.perf_counter()
+    schema = arrow_schema(df.drop(columns=partition_cols or []))
+    rows_per_group = row_group_rows(df, row_group_bytes)
+
+    tmp_path = f'{output_path}.writing'
+    _remove(tmp_path)
+
+    if not partition_cols:
+        write_file(df, tmp_path, schema, rows_per_group, compression)
+        n_files = 1
+    else:
+        os.makedirs(tmp_path)
+        groups = df.groupby(partition_cols, sort=True, dropna=False).indices
+        data = df.drop(columns=partition_cols)
+
+        def write_partition(item):
+            values, positions = item
+            values = values if isinstance(values, tuple) else (values,)
+            directory = os.path.join(tmp_path, _partition_dir(partition_cols, values))
+            os.makedirs(directory, exist_ok=True)
+            path = os.path.join(directory, _file_name(fmt, compression))
+            write_file(data.iloc[np.sort(positions)], path, schema,
+                       rows_per_group, compression)
+
+        with ThreadPoolExecutor(max_workers or os.cpu_count()) as pool:
+            list(pool.map(write_partition, groups.items()))
+        n_files = len(groups)
+
+    _replace(tmp_path, output_path)
+    elapsed = time.perf_counter() - start
+    echo(f"  Wrote {len(df):,} rows to {output_path} "
+          f"({fmt}, {n_files} file(s), {elapsed:.2f}s)")
+    return output_path
+
+
+def _format_from_path(path):
+    name = path.lower()
+    for suffix in ('.gz', '.bz2', '.xz', '.zst'):
+        if name.endswith(suffix):
+            name = name[:-len(suffix)]
+    if name.endswith(('.parquet', '.pq')):
+        return 'parquet'
+    if name.endswith(('.arrow', '.feather', '.ipc')):
+        return 'ipc'
+    if name.endswith('.csv'):
+        return 'csv'
+    return 'parquet'
+
+
+def _remove(path):
+    if os.path.isdir(path):
+        shutil.rmtree(path)
+    elif os.path.exists(path):
+        os.remove(path)
+
+
+def _replace(tmp_path, output_path):
+    """Move a finished output into place, replacing any previous one."""
+    if os.path.isdir(output_path):
+        old_path = f'{output_path}.old'
+        _remove(old_path)
+        os.rename(output_path, old_path)
+        os.rename(tmp_path, output_path)
+        shutil.rmtree(old_path)
+    else:
+        os.replace(tmp_path, output_path)
+
+
+# ============================================
+# STEP 4: READ BACK (DOWNSTREAM JOBS)
+# ============================================
+
+def read_output(path, fmt=None, filters=None, columns=None):
+    """Read a written output, optionally only some partitions/columns.
+
+    filters use pyarrow syntax, e.g. [('Year', '=', 2011), ('Month', '>=', 6)];
+    on partitioned output only the matching directories are read.
+    Partition columns come back as plain values, not categoricals. CSV
+    column types are re-inferred, so they can differ from the original.
+    """
+    _require_pyarrow()
+    fmt = fmt or _format_from_path(path)
+    dataset = ds.dataset(path, format={'ipc': 'arrow'}.get(fmt, fmt),
+                         partitioning='hive' if os.path.isdir(path) else None)
+    expression = pq.filters_to_expression(filters) if filters else None
+    table = dataset.to_table(columns=columns, filter=expression)
+
+    df = table.to_pandas()
+    partition_names = dataset.partitioning.schema.names if dataset.partitioning else []
+    for name in partition_names:
+        if name in df.columns and isinstance(df[name].dtype, pd.CategoricalDtype):
+            df[name] = df[name].astype(df[name].cat.categories.dtype)
+    return df
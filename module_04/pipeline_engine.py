@@ -0,0 +1,565 @@
+import contextlib
+import copy
+import importlib
+import io
+import json
+import os
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+from compressed_io import read_csv
+from dag import node, run_dag
+from imputation import fit_fill_values, apply_fill_values, save_fill_values, load_fill_values
+from pipeline_log import enabled, log, text_output
+from profiling import OPERATORS, profile_data
+
+# A pipeline is a JSON file (see pipelines/*.json):
+#   source   - read_options for compressed_io.read_csv and the columns the
+#              file must have
+#   inspect  - profiling rules, printed before cleaning
+#   stages   - named lists of steps, each step one entry of STEPS; every
+#              stage is a DAG node, so it is cached like any other
+#   checks   - 'module:function' quality checks run on the final frame
+#   reports  - 'module:function' summaries of the final frame
+#   sinks    - where the final frame is written (file or postgres)
+#   backends - 'module:function' running every stage elsewhere, by name
+#              (e.g. duckdb_backend.py for files larger than memory)
+# Modules named in checks/reports are imported from import_paths (relative
+# to module_04) so dataset-specific code stays with its dataset.
+#
+# The source, each stage and each step may reword what they print with
+# 'messages': {event: template} (null prints nothing), the config itself
+# its 'complete' line and 'banner_width', and the inspect section may name
+# a 'module:function' report(df, profile) of its own, so a config prints
+# exactly what its hand-written pipeline did. Events with no default text
+# (e.g. a stage's 'remaining_nulls') print only when named.
+PIPELINE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'pipelines')
+MODULE_DIR = os.path.dirname(os.path.abspath(__file__))
+
+
+# ============================================
+# STEP 1: READ A PIPELINE CONFIG
+# ============================================
+
+def load_config(name_or_path):
+    """Pipeline config by name (pipelines/<name>.json) or path."""
+    path = name_or_path
+    if not os.path.exists(path):
+        path = os.path.join(PIPELINE_DIR, f'{name_or_path}.json')
+    with open(path, encoding='utf-8') as f:
+        config = json.load(f)
+    for stage in config['stages']:
+        for step in stage['steps']:
+            if step['op'] not in STEPS:
+                raise ValueError(f"stage {stage['name']!r}: unknown op {step['op']!r}; "
+                                 f"expected one of {sorted(STEPS)}")
+    return config
+
+
+def resolve(target, import_paths=()):
+    """Function for a 'module:function' reference."""
+    for path in import_paths:
+        path = os.path.normpath(os.path.join(MODULE_DIR, path))
+        if path not in sys.path:
+            sys.path.append(path)
+    module, _, name = target.partition(':')
+    return getattr(importlib.import_module(module), name)
+
+
+# ============================================
+# STEP 2: STEPS (ONE FUNCTION PER OP)
+# ============================================
+
+def report(spec, event, message, level='info', **fields):
+    """log() an event with spec's own message for it, if it has one.
+
+    A null message prints nothing as text; JSON output still gets the
+    event.
+    """
+    message = spec.get('messages', {}).get(event, message)
+    if message is None:
+        if text_output():
+            return
+        message = ''
+    log(event, message, level, **fields)
+
+
+def wants(spec, event):
+    """True when spec names a message for an event that has none by default."""
+    return spec.get('messages', {}).get(event) is not None
+
+
+def _rule_mask(df, rule):
+    column, op, value = rule
+    return OPERATORS[op](df[column], value).to_numpy(dtype=bool)
+
+
+def step_dropna(df, step):
+    before = len(df)
+    df = df.dropna(subset=step['subset'])
+    report(step, 'rows_dropped', "  Dropped {rows:,} rows with null {columns}",
+        rows=before - len(df), reason='null', columns=', '.join(step['subset']))
+    return df
+
+
+def step_filter(df, step):
+    """Keep the rows where the rule (column, operator, value) holds."""
+    before = len(df)
+    df = df[_rule_mask(df, step['keep'])]
+    column, op, value = step['keep']
+    report(step, 'rows_dropped', "  Removed {rows:,} rows failing {rule}",
+        rows=before - len(df), reason='filter', rule=f'{column} {op} {value}')
+    return df
+
+
+def step_drop_duplicates(df, step):
+    before = len(df)
+    df = df.drop_duplicates()
+    report(step, 'rows_dropped', "  Removed {rows:,} exact duplicates",
+           rows=before - len(df), reason='duplicate', before=before, after=len(df))
+    return df
+
+
+def step_fill_missing(df, step):
+    """Impute nulls with fitted (or given) fill values (see imputation.py).
+
+    fill_values_path behaves as in clean_pipeline: reused when it exists,
+    otherwise fitted on this data and saved there.
+    """
+    fill_values = step.get('values')
+    path = step.get('fill_values_path')
+    if fill_values is None and path:
+        fill_values = fit_fill_values(df, all_columns=True)
+        save_fill_values(fill_values, path)
+    elif fill_values is None:
+        fill_values = fit_fill_values(df)
+
+    nulls = df.isnull().sum()
+    for col, value in fill_values.items():
+        if col in df.columns and nulls[col] > 0:
+            how = 'mode' if df[col].dtype == object else 'median'
+            report(step, 'filled', "  Filled '{column}' nulls with {how}: {value!r}",
+                   column=col, how=how, value=value, rows=nulls[col])
+    df = apply_fill_values(df, fill_values)
+    if enabled('debug'):
+        report(step, 'remaining_nulls', "  Remaining nulls: {count}", 'debug',
+               count=df.isnull().sum().sum())
+    return df
+
+
+def step_standardize_text(df, step):
+    """Strip whitespace and title-case the columns (default: all text)."""
+    columns = step.get('columns') or list(df.select_dtypes(include='object').columns)
+    for col in columns:
+        df[col] = df[col].str.strip().str.title()
+    report(step, 'standardized', "  Standardized {count} text columns",
+           count=len(columns), columns=columns)
+    return df
+
+
+def step_to_datetime(df, step):
+    column = step['column']
+    df[column] = pd.to_datetime(df[column])
+    report(step, 'parsed', "  Parsed {column} to datetime", column=column)
+    if enabled('debug'):
+        report(step, 'date_range', "    Range: {first} to {last}", 'debug',
+               column=column, first=df[column].min(), last=df[column].max())
+    return df
+
+
+def step_product(df, step):
+    left, right = step['columns']
+    df[step['column']] = df[left] * df[right]
+    report(step, 'added', "  Added {column} ({left} x {right})",
+           column=step['column'], left=left, right=right)
+    if enabled('debug'):
+        report(step, 'total', "    Total {column}: {total:,.2f}", 'debug',
+               column=step['column'], total=df[step['column']].sum())
+    return df
+
+
+def step_datetime_parts(df, step):
+    """Columns from datetime accessors, e.g. {"Year": "year", "DayOfWeek": "day_name"}."""
+    dt = df[step['source']].dt
+    for column, part in step['parts'].items():
+        value = getattr(dt, part)
+        df[column] = value() if callable(value) else value
+    report(step, 'added', "  Extracted: {columns}", columns=', '.join(step['parts']))
+    return df
+
+
+def step_map(df, step):
+    df[step['column']] = df[step['source']].map(step['mapping'])
+    report(step, 'added', "  Added {column} from {source}",
+           column=step['column'], source=step['source'])
+    return df
+
+
+def step_where(df, step):
+    """column = values[0] where the rule holds, else values[1]."""
+    yes, no = step['values']
+    df[step['column']] = np.where(_rule_mask(df, step['rule']), yes, no)
+    report(step, 'added', "  Added {column} flag", column=step['column'])
+    return df
+
+
+def step_bins(df, step):
+    df[step['column']] = pd.cut(df[step['source']], bins=step['edges'], labels=step['labels'])
+    report(step, 'added', "  Added {column} bands from {source}",
+           column=step['column'], source=step['source'])
+    return df
+
+
+def step_astype(df, step):
+    df[step['column']] = df[step['column']].astype(step['dtype'])
+    report(step, 'converted', "  Converted {column} to {dtype}",
+           column=step['column'], dtype=step['dtype'])
+    return df
+
+
+STEPS = {
+    'dropna': step_dropna,
+    'filter': step_filter,
+    'drop_duplicates': step_drop_duplicates,
+    'fill_missing': step_fill_missing,
+    'standardize_text': step_standardize_text,
+    'to_datetime': step_to_datetime,
+    'product': step_product,
+    'datetime_parts': step_datetime_parts,
+    'map': step_map,
+    'where': step_where,
+    'bins': step_bins,
+    'astype': step_astype,
+}
+
+
+# ============================================
+# STEP 3: STAGES
+# ============================================
+
+def load_source(filepath, source, memory_budget=None):
+    """Read the source file and check it has the declared columns.
+
+    With memory_budget (bytes), a file path is read in chunks sized to fit
+    the budget (memory_governor.iter_csv_governed) and concatenated, which
+    keeps the parser's own buffers from adding to the peak.
+    """
+    read_options = source.get('read_options', {})
+    if memory_budget and isinstance(filepath, (str, os.PathLike)):
+        from memory_governor import iter_csv_governed
+        df = pd.concat(iter_csv_governed(filepath, memory_budget, **read_options),
+                       ignore_index=True)
+    else:
+        df = read_csv(filepath, **read_options)
+    missing = [col for col in source.get('columns', []) if col not in df.columns]
+    if missing:
+        raise ValueError(f'{filepath} is missing columns {missing}')
+    report(source, 'loaded', "  Loaded: {path}\n  Shape: {rows:,} rows, {columns} columns",
+           path=filepath, rows=df.shape[0], columns=df.shape[1])
+    return df
+
+
+def inspect_source(df, rules=None, top_n=0, detail_columns=None, report=None):
+    """One profiling pass: nulls, duplicates, rule violations, top values.
+
+    Only detail_columns get a distinct sketch and top values; every other
+    column just has its nulls counted. report(df, profile) prints the
+    profile instead of the generic report below. Purely diagnostic:
+    skipped unless 'debug' events are enabled.
+    """
+    if not enabled('debug'):
+        return df
+    profile = profile_data(df, rules=rules, top_n=top_n, bins=0,
+                           detail_columns=detail_columns or [],
+                           sketch_columns=detail_columns or [])
+    if report:
+        report(df, profile)
+        return df
+    log('inspect', "\n=== DATA INSPECTION ===", 'debug')
+    columns = profile['columns']
+
+    nulls = {col: p['null_count'] for col, p in columns.items() if p['null_count'] > 0}
+    if nulls:
+        log('nulls', "  Columns with nulls:", 'debug')
+        for col, count in nulls.items():
+            log('nulls', "    {column}: {count:,} ({pct:.1f}%)", 'debug',
+                column=col, count=count, pct=count / len(df) * 100)
+    else:
+        log('nulls', "  No nulls found", 'debug', count=0)
+    log('duplicates', "  Duplicates: {count:,}", 'debug', count=profile['duplicate_rows'])
+
+    for name, count in profile.get('invalid', {}).items():
+        column, op, value = rules[name]
+        log('invalid', "  {rule}: {count:,} rows with {condition}", 'debug',
+            rule=name, count=count, condition=f'{column} {op} {value}')
+    for col in detail_columns or []:
+        log('distinct', "  {column}: ~{distinct:,} distinct", 'debug',
+            column=col, distinct=columns[col]['distinct_estimate'])
+        for value, count in columns[col]['top_values']:
+            log('top_value', "    {value}: {count:,}", 'debug', column=col, value=value, count=count)
+    return df
+
+
+def run_stage(df, steps, messages=None):
+    """Apply a stage's steps in order, then report the stage's totals
+    (messages: the stage's own, see report)."""
+    stage = {'messages': messages or {}}
+    before, columns = len(df), list(df.columns)
+    df = df.copy()
+    for step in steps:
+        df = STEPS[step['op']](df, step)
+    added = [col for col in df.columns if col not in columns]
+    report(stage, 'stage_done', "  {before:,} -> {rows:,} rows, {columns} columns",
+           before=before, rows=len(df), columns=df.shape[1], removed=before - len(df),
+           added=added, added_count=len(added))
+    if enabled('debug') and wants(stage, 'remaining_nulls'):
+        report(stage, 'remaining_nulls', None, 'debug', count=df.isnull().sum().sum())
+    return df
+
+
+def write_sink(df, sink):
+    """Write the final frame to a file sink or a PostgreSQL table (COPY)."""
+    if sink['kind'] == 'file':
+        from output_writers import write_output
+        write_output(df, sink['path'], fmt=sink.get('format'),
+                     partition_cols=sink.get('partition_cols'))
+    elif sink['kind'] == 'postgres':
+        from db_loader import create_database, connect_to_db, load_to_database
+        create_database(sink['db'])
+        engine = connect_to_db(sink['db'])
+        try:
+            load_to_database(df, engine, sink['table'], if_exists=sink.get('if_exists', 'replace'))
+        finally:
+            engine.dispose()
+    else:
+        raise ValueError(f"unknown sink kind {sink['kind']!r}")
+    return sink
+
+
+# ============================================
+# STEP 4: BUILD AND RUN
+# ============================================
+
+def _bind_fill_values(steps):
+    """Replace an existing fill_values_path by its values, so the stage's
+    cache key follows the stored values rather than the path."""
+    bound = []
+    for step in steps:
+        path = step.get('fill_values_path')
+        if step['op'] == 'fill_missing' and path and os.path.exists(path):
+            step = {'op': 'fill_missing', 'values': load_fill_values(path)}
+        bound.append(step)
+    return bound
+
+
+def with_fill_values(config, fill_values_path, values=None):
+    """Copy of config whose fill_missing steps reuse (or fit and save)
+    the fill values at fill_values_path, or apply values when given."""
+    config = copy.deepcopy(config)
+    for stage in config['stages']:
+        for i, step in enumerate(stage['steps']):
+            if step['op'] != 'fill_missing':
+                continue
+            if values is not None:
+                stage['steps'][i] = {'op': 'fill_missing', 'values': values}
+            elif fill_values_path:
+                step['fill_values_path'] = fill_values_path
+    return config
+
+
+def apply_stages(df, config, names=None, titles=True):
+    """Run the named stages of config (default: all) on a frame in memory,
+    without the DAG or its cache (for samples, chunks and benchmarks)."""
+    for stage in config['stages']:
+        if names is None or stage['name'] in names:
+            if titles and stage.get('title'):
+                log('stage', stage['title'])
+            df = run_stage(df, _bind_fill_values(stage['steps']), stage.get('messages'))
+    return df
+
+
+def apply_steps(df, config, ops):
+    """Run the steps of config whose op is in ops, in config order, on a
+    frame in memory, without their stages' titles and totals."""
+    df = df.copy()
+    for stage in config['stages']:
+        for step in _bind_fill_values(stage['steps']):
+            if step['op'] in ops:
+                df = STEPS[step['op']](df, step)
+    return df
+
+
+def inspect_params(config):
+    """inspect_source parameters from a config's inspect section."""
+    inspect = config.get('inspect', {})
+    report_fn = inspect.get('report')
+    return {'rules': inspect.get('rules'), 'top_n': inspect.get('top_n', 0),
+            'detail_columns': inspect.get('detail_columns'),
+            'report': resolve(report_fn, config.get('import_paths', [])) if report_fn else None}
+
+
+def config_nodes(config, filepath, sinks=(), backend='pandas', memory_budget=None):
+    """DAG nodes for a pipeline config: load, inspect, each stage, then the
+    checks, reports and sinks on the last stage. memory_budget governs the
+    load (see load_source).
+
+    Any other backend is one node, named like the last stage, that runs
+    the config's function for it (e.g. duckdb_backend.py out-of-core). It
+    can't apply stored fill values, so those raise ValueError.
+    """
+    paths = config.get('import_paths', [])
+    upstream = final_stage(config)
+    if backend == 'pandas':
+        nodes = [
+            node('load', load_source, filepath=filepath, source=config.get('source', {}),
+                 memory_budget=memory_budget),
+            # inspect passes its input through unchanged: caching it would
+            # pickle the raw frame a second time next to 'load'
+            node('inspect', inspect_source, ['load'], cache=False, **inspect_params(config)),
+        ]
+        upstream = 'inspect'
+        for stage in config['stages']:
+            nodes.append(node(stage['name'], run_stage, [upstream], title=stage.get('title'),
+                              steps=_bind_fill_values(stage['steps']),
+                              messages=stage.get('messages')))
+            upstream = stage['name']
+    else:
+        backends = config.get('backends', {})
+        if backend not in backends:
+            raise ValueError(f"{config['name']!r} has no {backend!r} backend; "
+                             f"expected one of {['pandas'] + list(backends)}")
+        # The backend only gets the file and fits its own fill values
+        if any(step['op'] == 'fill_missing'
+               and (step.get('values') is not None or step.get('fill_values_path'))
+               for stage in config['stages'] for step in stage['steps']):
+            raise ValueError(f"the {backend!r} backend fits its own fill values; "
+                             f"stored fill values need backend='pandas'")
+        nodes = [node(upstream, resolve(backends[backend], paths), filepath=filepath)]
+
+    for kind in ['checks', 'reports']:
+        for i, entry in enumerate(config.get(kind, [])):
+            nodes.append(node(entry.get('name', f'{kind}_{i}'), resolve(entry['fn'], paths),
+                              [upstream], cache=False, **entry.get('params', {})))
+    for i, sink in enumerate(list(config.get('sinks', [])) + list(sinks)):
+        nodes.append(node(f'sink_{i}', write_sink, [upstream], cache=False,
+                          title='\n=== OUTPUT ===', sink=sink))
+    return nodes
+
+
+def final_stage(config):
+    return config['stages'][-1]['name']
+
+
+def run_config_pipeline(config, filepath, backend='pandas', output_path=None,
+                        output_format=None, cache_dir=None, extra_nodes=None,
+                        memory_budget=None):
+    """Run a pipeline config (name, path or dict) on filepath.
+
+    backend: 'pandas', or one of the config's backends (e.g. 'duckdb').
+    output_path adds a file sink, partitioned as the config's output
+    section says. memory_budget (bytes) reads the file in chunks that fit
+    it and reports each stage's peak memory against it (see
+    memory_governor.py). Returns (df, {name: output}) with
+    the outputs of checks, reports and extra_nodes.
+    """
+    if not isinstance(config, dict):
+        config = load_config(config)
+    sinks = []
+    if output_path:
+        output = config.get('output', {})
+        sinks.append({'kind': 'file', 'path': output_path,
+                      'format': output_format or output.get('format'),
+                      'partition_cols': output.get('partition_cols')})
+
+    title = config.get('title', config['name'].upper())
+    banner = "=" * config.get('banner_width', 60)
+    print(banner)
+    print(f"{title} — START")
+    print(banner)
+
+    nodes = config_nodes(config, filepath, sinks, backend, memory_budget) + list(extra_nodes or [])
+    stages = {'load', 'inspect'} | {stage['name'] for stage in config['stages']}
+    last = final_stage(config)
+
+    monitor = None
+    if memory_budget:
+        from memory_governor import MemoryMonitor, check_budget
+        if backend == 'pandas' and isinstance(filepath, (str, os.PathLike)):
+            check_budget(filepath, memory_budget,
+                         **config.get('source', {}).get('read_options', {}))
+        monitor = MemoryMonitor(memory_budget).start()
+    try:
+        results = run_dag(nodes, targets=[last] + [n['name'] for n in nodes
+                                                  if n['name'] not in stages],
+                          cache_dir=cache_dir, monitor=monitor)
+    finally:
+        # Also on failure: stops the sampling thread and removes spill files
+        if monitor:
+            from memory_governor import print_memory_report
+            monitor.stop()
+            print_memory_report(monitor)
+    df = results.pop(last)
+
+    complete = config.get('messages', {}).get(
+        'complete', "PIPELINE COMPLETE — {rows:,} rows, {columns} columns")
+    print("\n" + banner)
+    print(complete.format(rows=df.shape[0], columns=df.shape[1]))
+    print(banner)
+    return df, results
+
+
+# ============================================
+# STEP 5: VERIFY THE STAGE FUNCTIONS
+# ============================================
+
+# The public stage functions of each pipeline, called one by one the way
+# the hand-written pipelines did (see clean_pipeline.py, retail_etl.py)
+STAGE_RUNNERS = {
+    'students': 'clean_pipeline:run_stages',
+    'retail': 'retail_etl:run_stages',
+}
+
+
+def verify_configs(files):
+    """Run each config as a DAG and its stage functions one by one on the
+    same file; check the final frames are identical and the stage
+    functions printed exactly what the DAG run did. files: {config name: path}."""
+    print("\n=== CONFIG PIPELINES vs STAGE FUNCTIONS ===")
+    print(f"  {'PIPELINE':<10} {'ROWS':>10} {'STAGES s':>9} {'CONFIG s':>9}  RESULT")
+    for name, filepath in files.items():
+        run_stages = resolve(STAGE_RUNNERS[name], load_config(name).get('import_paths', []))
+        by_stage, dag_run = io.StringIO(), io.StringIO()
+        start = time.perf_counter()
+        with contextlib.redirect_stdout(by_stage):
+            expected = run_stages(filepath)
+        stages_s = time.perf_counter() - start
+        start = time.perf_counter()
+        with contextlib.redirect_stdout(dag_run):
+            df, _ = run_config_pipeline(name, filepath)
+        config_s = time.perf_counter() - start
+        pd.testing.assert_frame_equal(df, expected)
+        if by_stage.getvalue() not in dag_run.getvalue():
+            raise AssertionError(f"{name}: the stage functions printed\n{by_stage.getvalue()}\n"
+                                 f"but the config pipeline printed\n{dag_run.getvalue()}")
+        print(f"  {name:<10} {len(df):>10,} {stages_s:>9.2f} {config_s:>9.2f}  identical")
+
+
+if __name__ == '__main__':
+    import argparse
+
+    parser = argparse.ArgumentParser(description='Run a pipeline config on a file')
+    parser.add_argument('config', nargs='?', help="config name in pipelines/ (e.g. 'retail') or path")
+    parser.add_argument('file', nargs='?')
+    args = parser.parse_args()
+    if args.config and not args.file:
+        parser.error('give the file to run the config on')
+    if args.config:
+        run_config_pipeline(args.config, args.file)
+    else:
+        verify_configs({
+            'students': 'data/StudentPerformanceFactors.csv',
+            'retail': 'data/OnlineRetail.csv',
+        })
@@ -0,0 +1,176 @@
+import io
+import json
+import sys
+import threading
+import time
+
+# Pipeline stages report through log() instead of print(). Each event has
+# a name, a level and fields; in 'text' format its message template is
+# filled from the fields and printed (the usual tutorial output), in
+# 'json' format it is written as one JSON object per line for ingestion.
+#
+# 'debug' events are diagnostics: row counts, null scans and ranges that
+# only describe the data. Stages compute them under `if enabled('debug')`,
+# so a run at level 'info' skips those scans entirely.
+#
+# Reports that are printed as they are (tables, rankings) go through
+# echo(), a print() that can be captured per thread: dag.run_dag buffers
+# each node's output so concurrent nodes print node by node, without
+# touching sys.stdout for the rest of the process.
+LEVELS = {'debug': 10, 'info': 20, 'warning': 30, 'error': 40}
+FORMATS = ['text', 'json']
+
+_settings = {'level': LEVELS['debug'], 'format': 'text', 'stream': None}
+_write_lock = threading.Lock()
+_local = threading.local()
+
+
+# ============================================
+# STEP 1: CONFIGURE
+# ============================================
+
+def configure(level='debug', fmt='text', stream=None):
+    """Set the lowest level reported, the output format and the stream.
+
+    The stream defaults to stdout for text and stderr for JSON, so JSON
+    events stay apart from the run's banners and reports.
+    """
+    if level not in LEVELS:
+        raise ValueError(f"level must be one of {list(LEVELS)}, got {level!r}")
+    if fmt not in FORMATS:
+        raise ValueError(f"format must be one of {FORMATS}, got {fmt!r}")
+    _settings.update(level=LEVELS[level], format=fmt, stream=stream)
+
+
+def enabled(level='debug'):
+    """True when events of this level are reported."""
+    return LEVELS[level] >= _settings['level']
+
+
+def text_output():
+    """True when events are printed as text (so tables can be too)."""
+    return _settings['format'] == 'text'
+
+
+def capture():
+    """Buffer this thread's text output until release()."""
+    _local.buffer = io.StringIO()
+
+
+def release():
+    """Stop capturing this thread's output and return it."""
+    text = _local.buffer.getvalue()
+    _local.buffer = None
+    return text
+
+
+def _text_stream():
+    return getattr(_local, 'buffer', None) or sys.stdout
+
+
+# ============================================
+# STEP 2: EMIT EVENTS
+# ============================================
+
+def _jsonable(value):
+    # numpy scalars, Timestamps, sets and anything else json can't write
+    if hasattr(value, 'item'):
+        return value.item()
+    if hasattr(value, 'isoformat'):
+        return value.isoformat()
+    if isinstance(value, (set, frozenset)):
+        return sorted(value, key=str)
+    return str(value)
+
+
+def log(event, message='', level='info', **fields):
+    """Report an event; message is a str.format template over fields.
+
+    Nothing is formatted when the level is off, and the message is never
+    formatted for JSON output. An event without fields is a heading: it
+    is printed as text but carries nothing to write as JSON.
+    """
+    if LEVELS[level] < _settings['level']:
+        return
+    if _settings['format'] == 'json':
+        if not fields:
+            return
+        record = {'ts': round(time.time(), 3), 'level': level, 'event': event, **fields}
+        line = json.dumps(record, default=_jsonable) + '\n'
+        with _write_lock:
+            (_settings['stream'] or sys.stderr).write(line)
+    else:
+        text = message.format(**fields) if fields else message
+        # A configured stream is used as is; otherwise the text follows the
+        # thread's capture buffer like echo()
+        print(text, file=_settings['stream'] or _text_stream())
+
+
+def echo(*values, sep=' ', end='\n'):
+    """print() to stdout, or to this thread's buffer while capturing."""
+    print(*values, sep=sep, end=end, file=_text_stream())
+
+
+def log_table(event, title, frame, level='info', index=True, **fields):
+    """Report a DataFrame: printed under title as text, rows as JSON."""
+    if not enabled(level):
+        return
+    if text_output():
+        log(event, f'{title}\n{{table}}', level, table=frame.to_string(index=index))
+    else:
+        rows = (frame.reset_index() if index else frame).to_dict('records')
+        log(event, level=level, rows=rows, **fields)
+
+
+# ============================================
+# BENCHMARK
+# ============================================
+
+def benchmark(filepath='data/OnlineRetail.csv', repeats=3):
+    """Retail stages with every diagnostic printed vs production logging
+    (level 'info', JSON lines), best of repeats."""
+    import contextlib
+    import io
+    import os
+
+    sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), 'mini_project'))
+    import retail_etl
+
+    raw = retail_etl.load_data(filepath)
+    cases = [('debug, text', 'debug', 'text'), ('info, text', 'info', 'text'),
+             ('info, json', 'info', 'json')]
+    print(f"\n=== LOGGING OVERHEAD: retail stages on {len(raw):,} rows ===")
+    print(f"  {'LEVEL, FORMAT':<14} {'EXPLORE s':>10} {'CLEAN s':>8} {'TRANSFORM s':>12} "
+          f"{'ANALYTICS s':>12} {'TOTAL s':>8} {'OUTPUT KB':>10}")
+    for label, level, fmt in cases:
+        best = None
+        for _ in range(repeats):
+            sink = io.StringIO()
+            configure(level, fmt, stream=sink)
+            stages = []
+            try:
+                with contextlib.redirect_stdout(sink):
+                    df = raw
+                    for fn in [retail_etl.explore_data, retail_etl.clean_data,
+                               retail_etl.transform_data, retail_etl.generate_analytics]:
+                        start = time.perf_counter()
+                        df = fn(df)
+                        stages.append(time.perf_counter() - start)
+            finally:
+                configure()
+            if best is None or sum(stages) < sum(best[0]):
+                best = (stages, len(sink.getvalue()))
+        stages, size = best
+        print(f"  {label:<14} {stages[0]:>10.3f} {stages[1]:>8.3f} {stages[2]:>12.3f} "
+              f"{stages[3]:>12.3f} {sum(stages):>8.3f} {size / 1024:>10.1f}")
+
+
+if __name__ == '__main__':
+    import argparse
+
+    parser = argparse.ArgumentParser(description='Time the retail stages at each log level')
+    parser.add_argument('file', nargs='?', default='data/OnlineRetail.csv')
+    # Run as a script this module is __main__; the stages log through the
+    # imported pipeline_log, so that is the one to configure
+    import pipeline_log
+    pipeline_log.benchmark(parser.parse_args().file)
@@ -0,0 +1,128 @@
+import ast
+import json
+import os
+import re
+
+# Source files of each loader's pipeline. Their hash is the pipeline
+# version in the load manifest (see fingerprint.pipeline_version), so any
+# edit to one of them forces a full reload. The files are found by reading
+# the loader's imports (and the 'module:function' references in its
+# pipeline config) with ast, not by importing them, so the CLI can check
+# for an unchanged load without importing pandas.
+MODULE_DIR = os.path.dirname(os.path.abspath(__file__))
+RETAIL_DIR = os.path.join(MODULE_DIR, 'mini_project')
+# Directories whose modules belong to the pipelines; anything else
+# (the standard library, pandas, ...) is left out
+SOURCE_DIRS = [MODULE_DIR, RETAIL_DIR]
+
+# Entry point and pipeline config of each loader
+PIPELINES = {
+    'students': ('db_loader', os.path.join(MODULE_DIR, 'pipelines', 'students.json')),
+    'retail': ('retail_loader', os.path.join(MODULE_DIR, 'pipelines', 'retail.json')),
+}
+
+_REFERENCE = re.compile(r'^(\w+):\w+$')
+# Functions that only benchmark or compare (see the BENCHMARK sections)
+_BENCHMARK = re.compile(r'^_?(bench|compare)')
+
+
+# ============================================
+# STEP 1: FIND IN-REPO IMPORTS
+# ============================================
+
+def module_path(name):
+    """Path of an in-repo module by import name, or None."""
+    for directory in SOURCE_DIRS:
+        path = os.path.join(directory, f'{name.split(".")[0]}.py')
+        if os.path.exists(path):
+            return path
+    return None
+
+
+def _is_main_block(n):
+    test = getattr(n, 'test', None)
+    return (isinstance(n, ast.If) and isinstance(test, ast.Compare)
+            and isinstance(test.left, ast.Name) and test.left.id == '__name__')
+
+
+def imported_names(path):
+    """Top-level names of the modules path imports, including imports
+    inside functions. Benchmarks and the __main__ block are skipped: they
+    don't run in a load."""
+    with open(path, 'rb') as f:
+        tree = ast.parse(f.read(), path)
+    names = set()
+    pending = list(tree.body)
+    while pending:
+        n = pending.pop()
+        if isinstance(n, (ast.FunctionDef, ast.ClassDef)) and _BENCHMARK.match(n.name):
+            continue
+        if _is_main_block(n):
+            continue
+        if isinstance(n, ast.Import):
+            names.update(alias.name for alias in n.names)
+        elif isinstance(n, ast.ImportFrom) and n.module and not n.level:
+            names.add(n.module)
+        pending.extend(ast.iter_child_nodes(n))
+    return names
+
+
+def config_references(config_path):
+    """Modules named by 'module:function' strings in a pipeline config."""
+    with open(config_path, encoding='utf-8') as f:
+        config = json.load(f)
+    found = set()
+
+    def visit(value):
+        if isinstance(value, dict):
+            for item in value.values():
+                visit(item)
+        elif isinstance(value, list):
+            for item in value:
+                visit(item)
+        elif isinstance(value, str) and _REFERENCE.match(value):
+            found.add(_REFERENCE.match(value).group(1))
+
+    visit(config)
+    return found
+
+
+def file_sources(*paths):
+    """Sorted paths of the given files and of every in-repo module they
+    import, transitively."""
+    seen, pending = set(), list(paths)
+    while pending:
+        path = pending.pop()
+        if path is None or path in seen:
+            continue
+        seen.add(path)
+        pending.extend(module_path(name) for name in imported_names(path))
+    return sorted(seen)
+
+
+def module_sources(*names):
+    """file_sources of the named in-repo modules."""
+    return file_sources(*(module_path(name) for name in names))
+
+
+# ============================================
+# STEP 2: LOADER VERSIONS
+# ============================================
+
+def pipeline_sources(pipeline):
+    """Source files of the 'students' or 'retail' loader: its modules and
+    its pipeline config."""
+    entry, config_path = PIPELINES[pipeline]
+    return module_sources(entry, *config_references(config_path)) + [config_path]
+
+
+def loader_version(pipeline, layout=None):
+    """Pipeline version for the 'students' or 'retail' loader.
+
+    layout (the retail loader's schema) is part of the version, so
+    switching layouts forces a full reload.
+    """
+    from fingerprint import pipeline_version
+
+    version = pipeline_version(*pipeline_sources(pipeline))
+    return f'{version}-{layout}' if layout else version
@@ -0,0 +1,169 @@
+import math
+import time
+
+import numpy as np
+
+from compressed_io import codec_for, iter_csv
+from profiling import block_sample_csv, reservoir_update
+
+# z for two-sided 99% confidence bounds
+Z_99 = 2.576
+
+
+# ============================================
+# STEP 1: DECLARE RULES
+# ============================================
+
+def make_rule(name, fn, max_rate=0.0):
+    """Preflight rule: fn(sample) returns a boolean mask of failing rows.
+
+    The rule rejects the file when its failure rate is confidently above
+    max_rate. max_rate=0 makes any failing row in the sample fatal.
+    """
+    return {'name': name, 'fn': fn, 'max_rate': max_rate}
+
+
+# ============================================
+# STEP 2: SAMPLE THE RAW FILE
+# ============================================
+
+def _row_bytes(filepath, probe_bytes=64 * 1024):
+    with open(filepath, 'rb') as f:
+        f.readline()
+        probe = f.read(probe_bytes)
+    return len(probe) / max(probe.count(b'\n'), 1)
+
+
+def draw_sample(filepath, sample_size=100_000, method='auto', n_blocks=64, seed=0,
+                **read_options):
+    """Sample raw rows without running the pipeline.
+
+    'blocks' reads n_blocks stratified byte blocks sized to give about
+    sample_size rows, in seconds on any file size. 'reservoir' streams
+    the whole file once for a uniform sample; 'auto' uses blocks for plain
+    files and the reservoir for compressed ones (which can't be seeked).
+    """
+    if method == 'auto':
+        method = 'reservoir' if codec_for(filepath) else 'blocks'
+
+    if method == 'blocks':
+        block_bytes = max(64 * 1024, int(sample_size * _row_bytes(filepath) / n_blocks))
+        sample, _ = block_sample_csv(filepath, n_blocks, block_bytes, seed, **read_options)
+        return sample, method
+
+    rng = np.random.default_rng(seed)
+    sample, keys = None, None
+    for chunk in iter_csv(filepath, **read_options):
+        sample, keys = reservoir_update(sample, keys, chunk, sample_size, rng)
+    return sample, method
+
+
+# ============================================
+# STEP 3: ESTIMATE FAILURE RATES
+# ============================================
+
+def wilson_interval(failures, n, z=Z_99):
+    """Wilson score interval for a binomial proportion."""
+    if n == 0:
+        return 0.0, 1.0
+    p = failures / n
+    denom = 1 + z * z / n
+    center = (p + z * z / (2 * n)) / denom
+    half = z * math.sqrt(p * (1 - p) / n + z * z / (4 * n * n)) / denom
+    return max(0.0, center - half), min(1.0, center + half)
+
+
+def effective_sample_size(mask, block_rows=None):
+    """Sample size adjusted for clustering in block samples.
+
+    Rows in one block are neighbours in the file (often the same invoice),
+    so failures cluster. The variance of the rate across blocks gives the
+    equivalent number of independent rows (never more than the real count).
+    """
+    n = len(mask)
+    if not block_rows or sum(block_rows) != n or len(block_rows) < 2:
+        return n
+    block_ids = np.repeat(np.arange(len(block_rows)), block_rows)
+    m = np.asarray(block_rows, dtype=float)
+    k = np.bincount(block_ids, weights=mask.astype(float), minlength=len(m))
+    p = k.sum() / n
+    if p in (0.0, 1.0):
+        return n
+    b = len(m)
+    var = b / (b - 1) * np.sum((k - p * m) ** 2) / n ** 2
+    return int(min(n, p * (1 - p) / var)) if var > 0 else n
+
+
+def evaluate_rules(sample, rules, z=Z_99):
+    """Failure rate with confidence bounds and a decision for each rule.
+
+    decision is 'abort' when the lower bound exceeds max_rate, 'pass' when
+    the upper bound is within it, and 'check' when the sample can't tell
+    (the full checks decide).
+    """
+    block_rows = sample.attrs.get('block_rows')
+    results = []
+    for rule in rules:
+        mask = np.asarray(rule['fn'](sample), dtype=bool)
+        failures = int(mask.sum())
+        n_eff = effective_sample_size(mask, block_rows)
+        rate = failures / len(mask) if len(mask) else 0.0
+        low, high = wilson_interval(rate * n_eff, n_eff, z)
+
+        if low > rule['max_rate'] or (rule['max_rate'] == 0 and failures):
+            decision = 'abort'
+        elif high <= rule['max_rate']:
+            decision = 'pass'
+        else:
+            decision = 'check'
+
+        results.append({
+            'rule': rule['name'], 'failures': failures, 'n': len(mask),
+            'n_effective': n_eff, 'rate': rate, 'low': low, 'high': high,
+            'max_rate': rule['max_rate'], 'decision': decision,
+        })
+    return results
+
+
+# ============================================
+# STEP 4: RUN THE GATE
+# ============================================
+
+def run_preflight(filepath, rules, sample_size=100_000, method='auto', z=Z_99, seed=0,
+                  columns=None, **read_options):
+    """Sample filepath and evaluate rules before any ETL work.
+
+    columns: raw columns the rules read; a sample missing any of them
+    fails the gate without evaluating the rules.
+
+    Returns {'passed', 'sample', 'method', 'missing', 'results',
+    'elapsed_ms'}; passed is False when columns are missing or some rule
+    is confidently over its threshold.
+    """
+    start = time.perf_counter()
+    sample, method = draw_sample(filepath, sample_size, method, seed=seed, **read_options)
+    missing = [col for col in columns or [] if col not in sample.columns]
+    results = [] if missing else evaluate_rules(sample, rules, z)
+    return {
+        'passed': not missing and not any(r['decision'] == 'abort' for r in results),
+        'sample': sample,
+        'method': method,
+        'missing': missing,
+        'results': results,
+        'elapsed_ms': (time.perf_counter() - start) * 1000,
+    }
+
+
+def print_preflight(report):
+    print(f"\n=== PREFLIGHT: {len(report['sample']):,} sampled rows "
+          f"({report['method']}, {report['elapsed_ms']:,.0f} ms) ===")
+    if report.get('missing'):
+        print(f"  Preflight FAILED — missing columns: {report['missing']}")
+        return
+    print(f"  {'RULE':<24} {'FAILS':>7} {'RATE':>7} {'99% BOUNDS':>17} {'LIMIT':>7}  DECISION")
+    for r in report['results']:
+        print(f"  {r['rule']:<24} {r['failures']:>7,} {r['rate']:>7.2%} "
+              f"[{r['low']:>6.2%}, {r['high']:>6.2%}] {r['max_rate']:>7.2%}  "
+              f"{r['decision'].upper()}")
+    verdict = 'PASSED — running full pipeline' if report['passed'] else 'FAILED — aborting'
+    print(f"  Preflight {verdict}")
@@ -0,0 +1,309 @@
+import io
+import json
+import os
+
+import numpy as np
+import pandas as pd
+
+from compressed_io import iter_csv
+
+# Invalid-value rules: name -> (column, operator, value). A row is counted
+# as invalid when `column operator value` is true.
+OPERATORS = {
+    '<': np.less,
+    '<=': np.less_equal,
+    '>': np.greater,
+    '>=': np.greater_equal,
+    '==': np.equal,
+    '!=': np.not_equal,
+}
+
+# Hashes kept per column for the distinct-count estimate
+KMV_SIZE = 1024
+
+# Rows profile_csv keeps for top values, histograms and duplicates; files
+# with no more rows than this are profiled exactly
+SAMPLE_ROWS = 200_000
+
+
+# ============================================
+# STREAMING ACCUMULATORS
+# ============================================
+
+def _hash_values(values):
+    """64-bit hashes, with numbers normalized so 1 and 1.0 hash alike."""
+    if values.dtype.kind in 'iufb':
+        values = values.astype(float)
+    return pd.util.hash_array(values)
+
+
+def _kmv_update(kmv, values):
+    """Keep the KMV_SIZE smallest distinct hashes seen so far.
+
+    Only the smallest hashes of the batch are sorted; the candidate window
+    grows when duplicates leave fewer than KMV_SIZE distinct values in it.
+    """
+    hashes = _hash_values(values)
+    window = min(len(hashes), 4 * KMV_SIZE)
+    while True:
+        if window < len(hashes):
+            smallest = np.unique(np.partition(hashes, window - 1)[:window])
+        else:
+            smallest = np.unique(hashes)
+        if len(smallest) >= KMV_SIZE or window == len(hashes):
+            break
+        window = min(len(hashes), window * 8)
+    return np.unique(np.concatenate([kmv, smallest]))[:KMV_SIZE]
+
+
+def _kmv_estimate(kmv):
+    """Distinct-count estimate from a KMV sketch (exact below KMV_SIZE)."""
+    if len(kmv) < KMV_SIZE:
+        return int(len(kmv))
+    return int(round((KMV_SIZE - 1) * 2.0 ** 64 / float(kmv[-1])))
+
+
+def new_profile_state(rules=None, sketch_columns=None):
+    """Empty accumulator for profile_batch.
+
+    sketch_columns limits the distinct sketch and min/max to those columns
+    (default all); the others only count nulls.
+    """
+    return {'rows': 0, 'columns': {}, 'rules': rules or {}, 'invalid': {},
+            'sketch_columns': sketch_columns}
+
+
+def profile_batch(state, df):
+    """Fold one batch into the exact, mergeable part of the profile.
+
+    Nulls, min/max, distinct sketch and rule violations are all computed
+    with one vectorized pass per column over this batch.
+    """
+    sketch_columns = state.get('sketch_columns')
+    state['rows'] += len(df)
+    null_mask = df.isnull()
+    null_counts = null_mask.sum()
+
+    for col in df.columns:
+        s = df[col]
+        acc = state['columns'].setdefault(col, {
+            'dtype': str(s.dtype), 'nulls': 0, 'min': None, 'max': None,
+            'kmv': np.empty(0, dtype=np.uint64),
+        })
+        acc['nulls'] += int(null_counts[col])
+        if sketch_columns is not None and col not in sketch_columns:
+            acc['kmv'] = None
+            continue
+
+        values = s.to_numpy()[~null_mask[col].to_numpy()]
+        if len(values) == 0:
+            continue
+        acc['kmv'] = _kmv_update(acc['kmv'], values)
+
+        if s.dtype.kind not in 'iufM':
+            continue
+        lo, hi = values.min(), values.max()
+        acc['min'] = lo if acc['min'] is None else min(acc['min'], lo)
+        acc['max'] = hi if acc['max'] is None else max(acc['max'], hi)
+
+    for name, (col, op, value) in state['rules'].items():
+        if col in df.columns:
+            hits = int(OPERATORS[op](df[col].to_numpy(), value).sum())
+            state['invalid'][name] = state['invalid'].get(name, 0) + hits
+
+    return state
+
+
+# ============================================
+# SAMPLING
+# ============================================
+
+def reservoir_update(sample, keys, chunk, sample_size, rng):
+    """Bottom-k reservoir: keep the rows with the smallest random keys.
+
+    Gives a uniform sample of everything seen so far, updated a whole
+    chunk at a time.
+    """
+    chunk_keys = rng.random(len(chunk))
+    if sample is None:
+        sample, keys = chunk, chunk_keys
+    else:
+        sample = pd.concat([sample, chunk], ignore_index=True)
+        keys = np.concatenate([keys, chunk_keys])
+
+    if len(sample) > sample_size:
+        keep = np.argpartition(keys, sample_size)[:sample_size]
+        keep.sort()
+        sample, keys = sample.iloc[keep].reset_index(drop=True), keys[keep]
+    return sample, keys
+
+
+def block_sample_csv(filepath, n_blocks=64, block_bytes=256 * 1024, seed=0, **read_options):
+    """Parse random byte blocks of a CSV instead of the whole file.
+
+    The file is split into n_blocks equal strata and one block is read at
+    a random offset in each, so every region of the file is represented.
+    Takes seconds on multi-GB files. Returns (sample, estimated_rows). The
+    sample is approximate: blocks are whole lines, and quoted fields
+    containing newlines are not supported.
+    """
+    size = os.path.getsize(filepath)
+    rng = np.random.default_rng(seed)
+
+    with open(filepath, 'rb') as f:
+        header = f.readline()
+        body_start = f.tell()
+        if size - body_start <= n_blocks * block_bytes:
+            f.seek(body_start)
+            lines = f.read()
+            block_rows = None
+        else:
+            stride = (size - body_start) // n_blocks
+            offsets = (body_start + np.arange(n_blocks) * stride
+                       + rng.integers(0, max(stride - block_bytes, 1), n_blocks))
+            parts, block_rows = [], []
+            for offset in offsets:
+                f.seek(int(offset))
+                block = f.read(block_bytes)
+                # Drop the partial lines at both ends of the block
+                block = block[block.find(b'\n') + 1:block.rfind(b'\n') + 1]
+                parts.append(block)
+                block_rows.append(block.count(b'\n'))
+            lines = b''.join(parts)
+
+    sample = pd.read_csv(io.BytesIO(header + lines), **read_options)
+    if block_rows:
+        # Rows per block, for estimators that account for clustering
+        sample.attrs['block_rows'] = block_rows
+    bytes_per_row = len(lines) / max(len(sample), 1)
+    estimated_rows = int((size - body_start) / bytes_per_row) if len(sample) else 0
+    return sample, estimated_rows
+
+
+# ============================================
+# FINALIZE PROFILE
+# ============================================
+
+def _py(value):
+    """Convert numpy/pandas scalars to JSON-friendly Python values."""
+    if isinstance(value, (pd.Timestamp, np.datetime64)):
+        return pd.Timestamp(value).isoformat()
+    if isinstance(value, np.generic):
+        return value.item()
+    return value
+
+
+def finalize_profile(state, sample, top_n=5, bins=10, sampled=False,
+                     detail_columns=None):
+    """Combine exact accumulators with sample-based detail into a profile.
+
+    Nulls, min/max, distinct estimates and invalid counts are exact over
+    every row seen. Top values, histograms and duplicates come from
+    `sample` (which is the full data when sampled=False), for
+    detail_columns only (default all; top_n=0 / bins=0 turn them off).
+    """
+    rows = state['rows']
+    profile = {
+        'rows': rows,
+        'sampled': sampled,
+        'sample_rows': len(sample),
+        'duplicate_rows': int(sample.duplicated().sum()),
+        'invalid': dict(state['invalid']),
+        'columns': {},
+    }
+
+    for col, acc in state['columns'].items():
+        col_profile = {
+            'dtype': acc['dtype'],
+            'null_count': acc['nulls'],
+            'null_rate': acc['nulls'] / rows if rows else 0.0,
+            'distinct_estimate': None if acc['kmv'] is None else _kmv_estimate(acc['kmv']),
+            'min': _py(acc['min']),
+            'max': _py(acc['max']),
+        }
+
+        if detail_columns is not None and col not in detail_columns:
+            profile['columns'][col] = col_profile
+            continue
+
+        s = sample[col].dropna()
+        if top_n:
+            counts = s.value_counts().head(top_n)
+            col_profile['top_values'] = [[_py(v), int(c)] for v, c in counts.items()]
+
+        if bins and s.dtype.kind in 'iuf' and len(s):
+            hist, edges = np.histogram(s.to_numpy(dtype=float), bins=bins)
+            col_profile['histogram'] = {
+                'edges': edges.tolist(), 'counts': hist.tolist()
+            }
+
+        profile['columns'][col] = col_profile
+
+    return profile
+
+
+# ============================================
+# PUBLIC ENTRY POINTS
+# ============================================
+
+def profile_data(df, rules=None, top_n=5, bins=10, detail_columns=None, sketch_columns=None):
+    """Profile an in-memory DataFrame (see new_profile_state for
+    sketch_columns and finalize_profile for detail_columns)."""
+    state = profile_batch(new_profile_state(rules, sketch_columns), df)
+    return finalize_profile(state, df, top_n, bins, detail_columns=detail_columns)
+
+
+def profile_csv(filepath, sample_size=SAMPLE_ROWS, sample='reservoir', chunksize=200_000,
+                rules=None, top_n=5, bins=10, seed=0, **read_options):
+    """Profile a CSV without holding it in memory.
+
+    sample='reservoir' streams every chunk once (compressed files too):
+    exact nulls, min/max, distinct estimates and rule counts, with a
+    uniform reservoir of sample_size rows for top values, histograms and
+    duplicates. Only a chunk and the reservoir are in memory at a time.
+    sample='blocks' skips the full pass and profiles random byte blocks,
+    scaling counts to the estimated row total.
+    """
+    if sample == 'blocks':
+        df, estimated_rows = block_sample_csv(filepath, seed=seed, **read_options)
+        state = profile_batch(new_profile_state(rules), df)
+        profile = finalize_profile(state, df, top_n, bins, sampled=True)
+        scale = estimated_rows / max(len(df), 1)
+        profile['rows'] = estimated_rows
+        profile['invalid'] = {k: int(v * scale) for k, v in profile['invalid'].items()}
+        for col_profile in profile['columns'].values():
+            col_profile['null_count'] = int(col_profile['null_count'] * scale)
+        return profile
+
+    rng = np.random.default_rng(seed)
+    state = new_profile_state(rules)
+    reservoir, keys = None, None
+
+    for chunk in iter_csv(filepath, chunksize=chunksize, **read_options):
+        profile_batch(state, chunk)
+        reservoir, keys = reservoir_update(reservoir, keys, chunk, sample_size, rng)
+
+    sampled = state['rows'] > len(reservoir)
+    return finalize_profile(state, reservoir, top_n, bins, sampled)
+
+
+def save_profile(profile, path):
+    """Write a profile as JSON."""
+    with open(path, 'w') as f:
+        json.dump(profile, f, indent=2, default=_py)
+
+
+def print_profile(profile):
+    """Compact per-column table of a profile."""
+    rows = profile['rows']
+    label = f" (sample of {profile['sample_rows']:,})" if profile['sampled'] else ''
+    print(f"\n=== DATA PROFILE: {rows:,} rows{label} ===")
+    print(f"  {'COLUMN':<28} {'DTYPE':<8} {'NULL%':>6} {'DISTINCT':>9}  MIN .. MAX")
+    for col, p in profile['columns'].items():
+        # Columns left out of sketch_columns have no distinct estimate
+        distinct = p['distinct_estimate']
+        distinct = '-' if distinct is None else f'{distinct:,}'
+        print(f"  {col:<28} {p['dtype'][:8]:<8} {p['null_rate'] * 100:>6.1f} "
+              f"{distinct:>9}  {p['min']} .. {p['max']}")
+    for name, count in profile['invalid'].items():
+        print(f"  INVALID {name}: {count:,}")
@@ -1,5 +1,9 @@
 import pandas as pd
-from clean_pipeline import run_pipeline
+from clean_pipeline import run_pipeline_with
+
+from check_scheduler import STATUS_LEVELS, make_check, per_column, run_checks, count_statuses
+from dag import CACHE_DIR, node
+from pipeline_log import echo, log
 
 
 # ============================================
@@ -91,33 +95,38 @@ def check_column_types(df, expected_types):
 # RUN ALL QUALITY CHECKS
 # ============================================
 
-def run_quality_checks(df):
-    """Run all data quality checks and return pass/fail status."""
-    print("=" * 50)
-    print("DATA QUALITY CHECKS — START")
-    print("=" * 50)
+def run_quality_checks(df, fail_fast=False):
+    """Run all data quality checks and return pass/fail status.
+
+    Checks run in parallel (see check_scheduler.py). fail_fast stops at
+    the first failed blocking check, for loaders that abort anyway;
+    failed 'warn' checks are reported but do not fail the run.
+    """
+    echo("=" * 50)
+    echo("DATA QUALITY CHECKS — START")
+    echo("=" * 50)
 
-    all_results = []
+    checks = []
 
     # CHECK 1: No nulls in critical columns
     critical_columns = ['Exam_Score', 'Hours_Studied', 'Attendance']
-    all_results.extend(check_no_nulls(df, critical_columns))
+    checks.extend(per_column(check_no_nulls, critical_columns))
 
     # CHECK 2: Value ranges
-    all_results.append(check_value_range(df, 'Exam_Score', 0, 101))
-    all_results.append(check_value_range(df, 'Hours_Studied', 0, 50))
-    all_results.append(check_value_range(df, 'Attendance', 0, 100))
+    checks.append(make_check(check_value_range, 'Exam_Score', 0, 101))
+    checks.append(make_check(check_value_range, 'Hours_Studied', 0, 50))
+    checks.append(make_check(check_value_range, 'Attendance', 0, 100))
 
     # CHECK 3: Allowed values
-    all_results.append(check_allowed_values(
-        df, 'Motivation_Level', ['Low', 'Medium', 'High']
+    checks.append(make_check(
+        check_allowed_values, 'Motivation_Level', ['Low', 'Medium', 'High']
     ))
-    all_results.append(check_allowed_values(
-        df, 'Internet_Access', ['Yes', 'No']
+    checks.append(make_check(
+        check_allowed_values, 'Internet_Access', ['Yes', 'No']
     ))
 
     # CHECK 4: No duplicates
-    all_results.append(check_no_duplicates(df))
+    checks.append(make_check(check_no_duplicates))
 
     # CHECK 5: Column types
     expected_types = {
@@ -126,34 +135,41 @@ def run_quality_checks(df):
         'Attendance': 'int',
         'Motivation_Level': 'object'
     }
-    all_results.extend(check_column_types(df, expected_types))
-
-    # REPORT
-    print("\n{:<45} {:<8} {}".format('CHECK', 'STATUS', 'DETAILS'))
-    print("-" * 75)
-
-    passed_count = 0
-    failed_count = 0
-
-    for result in all_results:
-        status = 'PASS' if result['passed'] else 'FAIL'
-        symbol = '✅' if result['passed'] else '❌'
-        print(f"  {symbol} {result['check']:<42} {status:<8} {result['details']}")
-
-        if result['passed']:
-            passed_count += 1
-        else:
-            failed_count += 1
+    for col, expected in expected_types.items():
+        checks.append(make_check(check_column_types, {col: expected}))
 
-    total = passed_count + failed_count
-    all_passed = failed_count == 0
+    report = run_checks(df, checks, fail_fast=fail_fast)
 
-    print("\n" + "=" * 50)
+    # REPORT
+    log('checks', "\n{:<45} {:<8} {}".format('CHECK', 'STATUS', 'DETAILS') + "\n" + "-" * 75)
+
+    symbols = {'PASS': '✅', 'FAIL': '❌', 'WARN': '⚠️'}
+    for result in report['results']:
+        status = result['status']
+        if status == 'SKIP':
+            continue
+        log('check', f"  {symbols[status]} {{check:<42}} {{status:<8}} {{details}}",
+            STATUS_LEVELS[status], check=result['check'], status=status,
+            details=result['details'], ms=result['ms'])
+
+    counts = count_statuses(report)
+    total = len(report['results'])
+    all_passed = report['passed']
+
+    echo("\n" + "=" * 50)
     if all_passed:
-        print(f"ALL {total} CHECKS PASSED — Data is ready for loading")
+        log('checks_done', "ALL {total} CHECKS PASSED — Data is ready for loading",
+            passed=True, total=total, warnings=counts['WARN'])
+        if counts['WARN']:
+            echo(f"  ({counts['WARN']} warning(s) — review before next load)")
     else:
-        print(f"FAILED: {failed_count}/{total} checks failed — DO NOT LOAD")
-    print("=" * 50)
+        log('checks_done', "FAILED: {failed}/{total} checks failed — DO NOT LOAD", 'error',
+            passed=False, total=total, failed=counts['FAIL'], skipped=counts['SKIP'],
+            elapsed_ms=report['elapsed_ms'])
+        if counts['SKIP']:
+            echo(f"  Rejected after {report['elapsed_ms']:.1f} ms; "
+                  f"{counts['SKIP']} check(s) skipped")
+    echo("=" * 50)
 
     return all_passed
 
@@ -167,12 +183,12 @@ def run_quality_checks(df):
 # ============================================
 
 if __name__ == '__main__':
-    # Get clean data from our pipeline
-    df = run_pipeline('data/StudentPerformanceFactors.csv')
-
-    # Run quality checks
-    print("\n")
-    passed = run_quality_checks(df)
+    # Get clean data from our pipeline (cached stages are reused) and run
+    # the quality checks alongside its summary
+    quality = node('quality', run_quality_checks, ['features'], cache=False, title='\n')
+    df, results = run_pipeline_with('data/StudentPerformanceFactors.csv', [quality],
+                                    cache_dir=CACHE_DIR)
+    passed = results['quality']
 
     if passed:
         print("\nData quality verified — safe to load into database.")
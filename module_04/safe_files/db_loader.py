@@ -8,15 +8,20 @@ Run: python db_loader.py
 """
 
 import os
+import sys
 import pandas as pd
 from sqlalchemy import create_engine, text
 from urllib.parse import quote_plus
-from clean_pipeline import run_pipeline
 
 # Resolve paths relative to this script's location
 SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
 DATA_DIR = os.path.join(SCRIPT_DIR, '..', '..', 'data')
 
+# The cleaning stages live in module_04 (pipelines/students.json, run by
+# clean_pipeline.py), one level up
+sys.path.insert(0, os.path.join(SCRIPT_DIR, '..'))
+from clean_pipeline import run_pipeline
+
 
 # ============================================
 # STEP 1: CREATE DATABASE
@@ -0,0 +1,118 @@
+import numpy as np
+import pandas as pd
+
+LEVELS = ['Low', 'Medium', 'High']
+COUNTRIES = [
+    'United Kingdom', 'Germany', 'France', 'EIRE', 'Spain', 'Netherlands',
+    'Belgium', 'Switzerland', 'Portugal', 'Australia'
+]
+COUNTRY_WEIGHTS = [0.82, 0.04, 0.035, 0.03, 0.015, 0.015, 0.01, 0.01, 0.01, 0.015]
+
+
+# ============================================
+# STUDENT PERFORMANCE FACTORS
+# ============================================
+
+def make_student_data(n_rows=10_000, seed=0):
+    """Synthetic StudentPerformanceFactors.csv with the same columns.
+
+    Includes the real file's quirks: nulls in three text columns, untidy
+    whitespace/case, and a few exact duplicate rows, plus nulls in
+    Sleep_Hours so numeric imputation is exercised too.
+    """
+    rng = np.random.default_rng(seed)
+    yes_no = ['Yes', 'No']
+
+    df = pd.DataFrame({
+        'Hours_Studied': rng.integers(1, 44, n_rows),
+        'Attendance': rng.integers(60, 101, n_rows),
+        'Parental_Involvement': rng.choice(LEVELS, n_rows),
+        'Access_to_Resources': rng.choice(LEVELS, n_rows),
+        'Extracurricular_Activities': rng.choice(yes_no, n_rows),
+        'Sleep_Hours': rng.integers(4, 11, n_rows),
+        'Previous_Scores': rng.integers(50, 101, n_rows),
+        'Motivation_Level': rng.choice(LEVELS, n_rows),
+        'Internet_Access': rng.choice(yes_no, n_rows),
+        'Tutoring_Sessions': rng.integers(0, 9, n_rows),
+        'Family_Income': rng.choice(LEVELS, n_rows),
+        'Teacher_Quality': rng.choice(LEVELS, n_rows).astype(object),
+        'School_Type': rng.choice(['Public', 'Private'], n_rows),
+        'Peer_Influence': rng.choice(['Positive', 'Neutral', 'Negative'], n_rows),
+        'Physical_Activity': rng.integers(0, 7, n_rows),
+        'Learning_Disabilities': rng.choice(yes_no, n_rows),
+        'Parental_Education_Level': rng.choice(
+            ['High School', 'College', 'Postgraduate'], n_rows
+        ).astype(object),
+        'Distance_from_Home': rng.choice(['Near', 'Moderate', 'Far'], n_rows).astype(object),
+        'Gender': rng.choice(['Male', 'Female'], n_rows),
+        'Exam_Score': rng.integers(55, 101, n_rows),
+    })
+
+    for col in ['Teacher_Quality', 'Parental_Education_Level', 'Distance_from_Home']:
+        df.loc[rng.random(n_rows) < 0.012, col] = np.nan
+    df.loc[rng.random(n_rows) < 0.005, 'Sleep_Hours'] = np.nan
+
+    messy = rng.random(n_rows) < 0.01
+    df.loc[messy, 'Peer_Influence'] = ' ' + df.loc[messy, 'Peer_Influence'].str.lower() + ' '
+
+    dupes = df.sample(frac=0.005, random_state=seed)
+    return pd.concat([df, dupes], ignore_index=True)
+
+
+# ============================================
+# ONLINE RETAIL
+# ============================================
+
+def make_retail_data(n_rows=100_000, seed=0, n_products=4_000, n_customers=4_400):
+    """Synthetic OnlineRetail.csv (raw, uncleaned) with the same columns.
+
+    About 25% null CustomerID, 2% cancellations (negative quantity, 'C'
+    invoice prefix), a few zero prices and null descriptions, and exact
+    duplicate rows. InvoiceDate uses the source's 'M/D/YYYY H:MM' text.
+    """
+    rng = np.random.default_rng(seed)
+
+    n_invoices = max(1, n_rows // 20)
+    invoice = np.sort(rng.integers(0, n_invoices, n_rows))
+    invoice_no = (536365 + invoice).astype(str).astype(object)
+    cancelled = rng.random(n_rows) < 0.02
+    invoice_no[cancelled] = 'C' + invoice_no[cancelled]
+
+    # Invoice timestamps increase with invoice number, like the source
+    minutes = np.sort(rng.integers(0, 373 * 24 * 60, n_invoices))[invoice]
+    invoice_date = pd.Timestamp('2010-12-01 08:00') + pd.to_timedelta(minutes, unit='min')
+
+    product = rng.zipf(1.3, n_rows) % n_products
+    stock_code = (10000 + product).astype(str).astype(object)
+    descriptions = np.array(
+        [f'product {i} white hanging heart ' for i in range(n_products)], dtype=object
+    )
+    description = descriptions[product].copy()
+    description[rng.random(n_rows) < 0.003] = np.nan
+
+    quantity = rng.integers(1, 25, n_rows)
+    quantity[cancelled] *= -1
+    unit_price = np.round(rng.gamma(2.0, 1.6, n_rows) + 0.1, 2)
+    unit_price[rng.random(n_rows) < 0.001] = 0.0
+
+    # One customer and country per invoice
+    invoice_customer = (12346 + rng.integers(0, n_customers, n_invoices)).astype(float)
+    invoice_customer[rng.random(n_invoices) < 0.25] = np.nan
+    invoice_country = rng.choice(COUNTRIES, n_invoices, p=COUNTRY_WEIGHTS)
+
+    df = pd.DataFrame({
+        'InvoiceNo': invoice_no,
+        'StockCode': stock_code,
+        'Description': description,
+        'Quantity': quantity,
+        'InvoiceDate': (invoice_date.month.astype(str) + '/' + invoice_date.day.astype(str)
+                        + '/' + invoice_date.year.astype(str) + ' '
+                        + invoice_date.hour.astype(str) + ':'
+                        + invoice_date.strftime('%M')),
+        'UnitPrice': unit_price,
+        'CustomerID': invoice_customer[invoice],
+        'Country': invoice_country[invoice],
+    })
+
+    dupes = df.sample(frac=0.01, random_state=seed)
+    return pd.concat([df, dupes]).sort_index(kind='stable').reset_index(drop=True)
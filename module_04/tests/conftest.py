@@ -0,0 +1,9 @@
+import os
+import sys
+
+# The pipeline modules import each other as top-level scripts run from
+# module_04/ (and module_04/mini_project/), so the tests do the same
+MODULE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+for path in [MODULE_DIR, os.path.join(MODULE_DIR, 'mini_project')]:
+    if path not in sys.path:
+        sys.path.insert(0, path)
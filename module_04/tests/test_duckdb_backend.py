@@ -0,0 +1,18 @@
+import pytest
+
+pytest.importorskip('duckdb')
+pytest.importorskip('pyarrow')
+
+from clean_pipeline import run_pipeline
+from duckdb_backend import compare_backends
+
+
+@pytest.mark.parametrize('seed', range(3))
+def test_backends_match(seed):
+    compare_backends(seed=seed)
+
+
+def test_duckdb_rejects_fill_values(tmp_path):
+    with pytest.raises(ValueError, match='fill values'):
+        run_pipeline(str(tmp_path / 'students.csv'), backend='duckdb',
+                     fill_values_path=str(tmp_path / 'fill_values.json'))
@@ -0,0 +1,74 @@
+import pandas as pd
+import pytest
+from sqlalchemy import text
+from sqlalchemy.exc import OperationalError
+
+import db_loader
+import fingerprint
+from fingerprint import MANIFEST_TABLE, PARTITION_COLUMN, plan_load
+from pipeline_sources import loader_version
+from synthetic_data import make_student_data
+
+DB_NAME = 'student_analytics_db'
+TABLE = 'test_incremental_students'
+
+
+@pytest.fixture
+def engine(monkeypatch, tmp_path):
+    try:
+        db_loader.create_database(DB_NAME)
+    except OperationalError:
+        pytest.skip('PostgreSQL is not reachable')
+    engine = db_loader.connect_to_db(DB_NAME)
+    # Small partitions, so a one-row edit leaves most of the file unchanged
+    monkeypatch.setattr(fingerprint.plan_load, '__defaults__', (8192, False))
+    monkeypatch.setattr(db_loader, 'CACHE_DIR', str(tmp_path / 'cache'))
+    yield engine
+    with engine.begin() as conn:
+        conn.execute(text(f'DROP TABLE IF EXISTS {TABLE}'))
+        conn.execute(text(f'DELETE FROM {MANIFEST_TABLE} WHERE table_name = :t'), {'t': TABLE})
+    engine.dispose()
+
+
+def read_table(engine):
+    df = pd.read_sql(f'SELECT * FROM {TABLE}', engine).drop(columns=PARTITION_COLUMN)
+    return df.sort_values(list(df.columns)).reset_index(drop=True)
+
+
+def test_partial_load_after_full_reload(engine, tmp_path):
+    path = str(tmp_path / 'students.csv')
+    df = make_student_data(5_000, 3)
+    df.to_csv(path, index=False)
+
+    db_loader.run_loader(path, DB_NAME, TABLE)
+    db_loader.run_loader(path, DB_NAME, TABLE, incremental=False)
+
+    df.loc[0, 'Hours_Studied'] = df.loc[0, 'Hours_Studied'] % 40 + 1
+    df.to_csv(path, index=False)
+    plan = plan_load(engine, TABLE, path, loader_version('students'))
+    assert plan['action'] == 'partial'
+
+    db_loader.run_loader(path, DB_NAME, TABLE, plan=plan)
+    partial = read_table(engine)
+    assert plan_load(engine, TABLE, path, loader_version('students'))['action'] == 'skip'
+
+    db_loader.run_loader(path, DB_NAME, TABLE, incremental=False)
+    pd.testing.assert_frame_equal(partial, read_table(engine))
+
+
+def test_untagged_table_loads_in_full(engine, tmp_path):
+    path = str(tmp_path / 'students.csv')
+    df = make_student_data(5_000, 4)
+    df.to_csv(path, index=False)
+    db_loader.run_loader(path, DB_NAME, TABLE)
+
+    # A table written without the partition column, as --full runs used to
+    with engine.begin() as conn:
+        conn.execute(text(f'ALTER TABLE {TABLE} DROP COLUMN "{PARTITION_COLUMN}"'))
+    df.loc[0, 'Hours_Studied'] = df.loc[0, 'Hours_Studied'] % 40 + 1
+    df.to_csv(path, index=False)
+
+    plan = plan_load(engine, TABLE, path, loader_version('students'))
+    assert plan['action'] == 'full'
+    db_loader.run_loader(path, DB_NAME, TABLE, plan=plan)
+    assert PARTITION_COLUMN in pd.read_sql(f'SELECT * FROM {TABLE} LIMIT 1', engine)
@@ -0,0 +1,40 @@
+import contextlib
+import io
+import os
+
+import pytest
+
+from clean_pipeline import run_pipeline
+from pipeline_engine import verify_configs
+from retail_etl import run_retail_pipeline
+from synthetic_data import make_retail_data, make_student_data
+
+# What the hand-written pipelines printed for these files before they ran
+# through the config engine (5,000 synthetic rows, seed 7)
+EXPECTED_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'expected')
+
+PIPELINES = {
+    'students': (make_student_data, run_pipeline, {}),
+    'retail': (make_retail_data, run_retail_pipeline, {'encoding': 'latin1'}),
+}
+
+
+def write_source(tmp_path, name):
+    make, _, options = PIPELINES[name]
+    path = str(tmp_path / f'{name}.csv')
+    make(5_000, 7).to_csv(path, index=False, **options)
+    return path
+
+
+@pytest.mark.parametrize('name', PIPELINES)
+def test_output_matches_hand_written(tmp_path, name):
+    path = write_source(tmp_path, name)
+    output = io.StringIO()
+    with contextlib.redirect_stdout(output):
+        PIPELINES[name][1](path)
+    with open(os.path.join(EXPECTED_DIR, f'{name}.txt'), encoding='utf-8') as f:
+        assert output.getvalue().replace(path, f'{name}.csv') == f.read()
+
+
+def test_stage_functions_match_configs(tmp_path):
+    verify_configs({name: write_source(tmp_path, name) for name in PIPELINES})
@@ -0,0 +1,319 @@
+import argparse
+import json
+import os
+import re
+import statistics
+import time
+
+import numpy as np
+from sqlalchemy import text
+
+from deploy import DB_NAME, SCHEMA_DIR, connect_to_db, list_schema_files
+
+# Typical application queries; :param is drawn at random per run
+WORKLOAD = {
+    'class_roster': {
+        'param': ('class_id', 'classes'),
+        'sql': '''
+            SELECT s.student_id, s.first_name, s.last_name, e.grade
+            FROM enrollments e
+            JOIN students s ON s.student_id = e.student_id
+            WHERE e.class_id = :class_id
+            ORDER BY s.last_name, s.first_name
+        ''',
+    },
+    'student_transcript': {
+        'param': ('student_id', 'students'),
+        'sql': '''
+            SELECT co.course_code, co.name, co.credits,
+                   cl.semester, cl.year, e.grade
+            FROM enrollments e
+            JOIN classes cl ON cl.class_id = e.class_id
+            JOIN courses co ON co.course_id = cl.course_id
+            WHERE e.student_id = :student_id
+            ORDER BY cl.year, cl.semester
+        ''',
+    },
+    'department_headcount': {
+        'param': ('department_id', 'departments'),
+        'sql': '''
+            SELECT d.name,
+                   COUNT(*) AS students,
+                   COUNT(*) FILTER (WHERE s.is_active) AS active_students
+            FROM students s
+            JOIN departments d ON d.department_id = s.department_id
+            WHERE s.department_id = :department_id
+            GROUP BY d.name
+        ''',
+    },
+    'course_fill_rate': {
+        'param': ('course_id', 'courses'),
+        'sql': '''
+            SELECT cl.class_id, cl.semester, cl.year, cl.max_students,
+                   COUNT(e.enrollment_id) AS enrolled,
+                   ROUND(COUNT(e.enrollment_id)::numeric / cl.max_students, 3) AS fill_ratio
+            FROM classes cl
+            LEFT JOIN enrollments e ON e.class_id = cl.class_id
+            WHERE cl.course_id = :course_id
+            GROUP BY cl.class_id
+            ORDER BY fill_ratio DESC
+        ''',
+    },
+    'instructor_schedule': {
+        'param': ('instructor_id', 'instructors'),
+        'sql': '''
+            SELECT cl.class_id, co.course_code, cl.semester, cl.year, cl.schedule
+            FROM classes cl
+            JOIN courses co ON co.course_id = cl.course_id
+            WHERE cl.instructor_id = :instructor_id
+        ''',
+    },
+}
+
+
+# ============================================
+# STEP 1: RUN THE WORKLOAD
+# ============================================
+
+def parameter_ranges(engine):
+    """Max id per table, used to draw random query parameters."""
+    ranges = {}
+    with engine.connect() as conn:
+        for name, query in WORKLOAD.items():
+            column, table = query['param']
+            ranges[column] = conn.execute(
+                text(f'SELECT MAX({column}) FROM {table}')
+            ).scalar() or 1
+    return ranges
+
+
+def time_workload(engine, repeats=20, seed=0):
+    """Run every workload query `repeats` times with random parameters.
+
+    Returns {query: {'median_ms', 'p95_ms'}}.
+    """
+    rng = np.random.default_rng(seed)
+    ranges = parameter_ranges(engine)
+    timings = {}
+
+    with engine.connect() as conn:
+        for name, query in WORKLOAD.items():
+            column = query['param'][0]
+            stmt = text(query['sql'])
+            samples = []
+            for _ in range(repeats):
+                params = {column: int(rng.integers(1, ranges[column] + 1))}
+                start = time.perf_counter()
+                conn.execute(stmt, params).fetchall()
+                samples.append((time.perf_counter() - start) * 1000)
+            timings[name] = {
+                'median_ms': statistics.median(samples),
+                'p95_ms': float(np.percentile(samples, 95)),
+            }
+    return timings
+
+
+def explain_workload(engine, seed=0):
+    """EXPLAIN (ANALYZE, BUFFERS) every workload query once.
+
+    Returns {query: (json_plan, text_plan)}.
+    """
+    rng = np.random.default_rng(seed)
+    ranges = parameter_ranges(engine)
+    plans = {}
+
+    with engine.connect() as conn:
+        for name, query in WORKLOAD.items():
+            column = query['param'][0]
+            params = {column: int(rng.integers(1, ranges[column] + 1))}
+            json_plan = conn.execute(
+                text('EXPLAIN (ANALYZE, BUFFERS, FORMAT JSON) ' + query['sql']), params
+            ).scalar()[0]['Plan']
+            text_plan = '\n'.join(
+                row[0] for row in conn.execute(
+                    text('EXPLAIN (ANALYZE, BUFFERS) ' + query['sql']), params
+                )
+            )
+            plans[name] = (json_plan, text_plan)
+    return plans
+
+
+# ============================================
+# STEP 2: RECOMMEND INDEXES
+# ============================================
+
+def unindexed_foreign_keys(engine):
+    """FK columns that are not the leading column of any index."""
+    query = '''
+        SELECT c.conrelid::regclass::text AS table_name, a.attname AS column_name
+        FROM pg_constraint c
+        JOIN pg_attribute a
+          ON a.attrelid = c.conrelid AND a.attnum = c.conkey[1]
+        WHERE c.contype = 'f'
+          AND array_length(c.conkey, 1) = 1
+          AND NOT EXISTS (
+              SELECT 1 FROM pg_index i
+              WHERE i.indrelid = c.conrelid AND i.indkey[0] = c.conkey[1]
+          )
+        ORDER BY 1, 2
+    '''
+    with engine.connect() as conn:
+        return [tuple(row) for row in conn.execute(text(query))]
+
+
+def seq_scans(plan, found=None):
+    """Collect (relation, condition text) for every Seq Scan in a plan tree."""
+    if found is None:
+        found = []
+    if plan['Node Type'] == 'Seq Scan':
+        found.append((plan['Relation Name'], plan.get('Filter', '')))
+    for key in ('Hash Cond', 'Merge Cond', 'Join Filter'):
+        if key in plan:
+            # Join conditions reference the scanned children
+            for child in plan.get('Plans', []):
+                for rel, cond in seq_scans(child, []):
+                    found.append((rel, cond + ' ' + plan[key]))
+            return found
+    for child in plan.get('Plans', []):
+        seq_scans(child, found)
+    return found
+
+
+def recommend_indexes(engine, plans):
+    """Recommend indexes on unindexed FK columns the workload seq-scans.
+
+    A recommendation needs both: the column is an FK with no index leading
+    on it, and some plan seq-scans that table with the column in a filter
+    or join condition.
+    """
+    recommendations = []
+    scans = [scan for json_plan, _ in plans.values() for scan in seq_scans(json_plan)]
+
+    for table, column in unindexed_foreign_keys(engine):
+        pattern = re.compile(rf'\b{column}\b')
+        used_by = sorted({
+            name for name, (json_plan, _) in plans.items()
+            for rel, cond in seq_scans(json_plan)
+            if rel == table and pattern.search(cond)
+        })
+        if used_by:
+            recommendations.append({
+                'table': table,
+                'column': column,
+                'ddl': f'CREATE INDEX IF NOT EXISTS idx_{table}_{column} ON {table} ({column});',
+                'queries': used_by,
+            })
+
+    print(f"  Seq scans in workload: {len(scans)}")
+    return recommendations
+
+
+def apply_indexes(engine, recommendations):
+    """Create the recommended indexes and refresh planner statistics."""
+    with engine.begin() as conn:
+        for rec in recommendations:
+            start = time.perf_counter()
+            conn.execute(text(rec['ddl']))
+            print(f"  {rec['ddl']}  ({time.perf_counter() - start:.2f}s)")
+        for table in sorted({rec['table'] for rec in recommendations}):
+            conn.execute(text(f'ANALYZE {table}'))
+
+
+def write_migration(recommendations, schema_dir=SCHEMA_DIR):
+    """Write the recommended indexes as the next numbered schema file."""
+    files = list_schema_files(schema_dir)
+    version = files[-1][0] + 1 if files else 1
+    path = os.path.join(schema_dir, f'{version:02d}_create_fk_indexes.sql')
+    with open(path, 'w') as f:
+        f.write('-- Indexes on foreign-key columns recommended by benchmark_queries.py\n')
+        for rec in recommendations:
+            f.write(f"-- used by: {', '.join(rec['queries'])}\n")
+            f.write(rec['ddl'] + '\n')
+    print(f"  Wrote {os.path.basename(path)}")
+    return path
+
+
+# ============================================
+# STEP 3: RUN BENCHMARK
+# ============================================
+
+def save_plans(plans, out_dir, label):
+    """Write each EXPLAIN ANALYZE output to out_dir/<label>/<query>.txt/.json."""
+    plan_dir = os.path.join(out_dir, label)
+    os.makedirs(plan_dir, exist_ok=True)
+    for name, (json_plan, text_plan) in plans.items():
+        with open(os.path.join(plan_dir, f'{name}.txt'), 'w') as f:
+            f.write(text_plan + '\n')
+        with open(os.path.join(plan_dir, f'{name}.json'), 'w') as f:
+            json.dump(json_plan, f, indent=2)
+
+
+def print_report(before, after):
+    """Before/after latency table."""
+    print(f"\n  {'QUERY':<22} {'BEFORE ms':>10} {'AFTER ms':>10} {'SPEEDUP':>8}   (median, p95)")
+    print("  " + "-" * 70)
+    for name in WORKLOAD:
+        b, a = before[name], after[name]
+        speedup = b['median_ms'] / a['median_ms'] if a['median_ms'] else float('inf')
+        print(f"  {name:<22} {b['median_ms']:>10.2f} {a['median_ms']:>10.2f} "
+              f"{speedup:>7.1f}x   (p95 {b['p95_ms']:.2f} -> {a['p95_ms']:.2f})")
+
+
+def run_benchmark(db_name=DB_NAME, repeats=20, apply=True, migration=False,
+                  plans_dir=None):
+    """Benchmark the workload, recommend FK indexes, apply, re-benchmark."""
+    print("=" * 50)
+    print("QUERY BENCHMARK — START")
+    print("=" * 50)
+
+    engine = connect_to_db(db_name)
+
+    print("\n=== BEFORE ===")
+    before = time_workload(engine, repeats)
+    plans = explain_workload(engine)
+    if plans_dir:
+        save_plans(plans, plans_dir, 'before')
+    for name, t in before.items():
+        print(f"  {name:<22} median {t['median_ms']:8.2f} ms")
+
+    print("\n=== INDEX ADVISOR ===")
+    recommendations = recommend_indexes(engine, plans)
+    if not recommendations:
+        print("  No missing indexes for this workload")
+    for rec in recommendations:
+        print(f"  {rec['table']}.{rec['column']}  <- {', '.join(rec['queries'])}")
+
+    if migration and recommendations:
+        write_migration(recommendations)
+
+    if apply and recommendations:
+        print("\n=== APPLYING INDEXES ===")
+        apply_indexes(engine, recommendations)
+
+        print("\n=== AFTER ===")
+        after = time_workload(engine, repeats)
+        if plans_dir:
+            save_plans(explain_workload(engine), plans_dir, 'after')
+        print_report(before, after)
+
+    engine.dispose()
+
+    print("\n" + "=" * 50)
+    print("QUERY BENCHMARK COMPLETE")
+    print("=" * 50)
+    return recommendations
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Benchmark queries and recommend indexes')
+    parser.add_argument('--db', default=DB_NAME)
+    parser.add_argument('--repeats', type=int, default=20)
+    parser.add_argument('--no-apply', action='store_true',
+                        help='only report recommendations')
+    parser.add_argument('--migration', action='store_true',
+                        help='also write the recommendations as the next schema file')
+    parser.add_argument('--plans-dir', help='save EXPLAIN ANALYZE output here')
+    args = parser.parse_args()
+
+    run_benchmark(args.db, args.repeats, apply=not args.no_apply,
+                  migration=args.migration, plans_dir=args.plans_dir)
@@ -0,0 +1,297 @@
+import argparse
+import contextlib
+import io
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from psycopg2.extras import execute_values
+from sqlalchemy import text
+
+from deploy import (
+    DB_NAME, TABLES, apply_migrations, bulk_seed, capture_deferred_objects, connect_to_db,
+    copy_frame, create_database, ensure_pending_ddl_table, replay_pending_ddl, sync_sequence
+)
+
+# Rows per INSERT statement in the seed_data.sql-style baseline
+INSERT_BATCH_ROWS = 1_000
+
+
+# ============================================
+# STEP 1: FOREIGN-KEY GRAPH AND LOAD WAVES
+# ============================================
+
+def read_fk_graph(engine, tables=TABLES):
+    """{table: set of parent tables} from the foreign keys in pg_constraint.
+
+    Only parents among tables count; anything else must already be loaded.
+    """
+    with engine.connect() as conn:
+        rows = conn.execute(text('''
+            SELECT conrelid::regclass::text, confrelid::regclass::text
+            FROM pg_constraint
+            WHERE contype = 'f' AND conrelid = ANY(CAST(:tables AS regclass[]))
+        '''), {'tables': list(tables)}).fetchall()
+
+    graph = {table: set() for table in tables}
+    for child, parent in rows:
+        if parent in graph and parent != child:
+            graph[child].add(parent)
+    return graph
+
+
+def load_waves(graph):
+    """Tables in topological waves: each table's parents are all in earlier
+    waves, so the tables within a wave can load at the same time."""
+    done, waves = set(), []
+    while len(done) < len(graph):
+        wave = [t for t in graph if t not in done and graph[t] <= done]
+        if not wave:
+            raise ValueError(f"foreign-key cycle between {sorted(set(graph) - done)}")
+        waves.append(wave)
+        done.update(wave)
+    return waves
+
+
+# ============================================
+# STEP 2: CONCURRENT COPY
+# ============================================
+
+def deferred_ddl(cur, tables):
+    """DDL per table that rebuilds its indexes, UNIQUE constraints and FKs
+    (FKs NOT VALID), the VALIDATE statements for those FKs, and the
+    statements that drop them all (FKs first)."""
+    constraints, indexes = capture_deferred_objects(cur, tables)
+    rebuild = {table: [] for table in tables}
+    validate = {table: [] for table in tables}
+    for table, _, indexdef in indexes:
+        rebuild[table].append(indexdef)
+    # A table's UNIQUE constraints before its FKs, as in deploy.bulk_seed
+    for table, name, contype, definition in sorted(constraints, key=lambda c: c[2] == 'f'):
+        add = f'ALTER TABLE {table} ADD CONSTRAINT {name} {definition}'
+        if contype == 'f':
+            rebuild[table].append(f'{add} NOT VALID')
+            validate[table].append(f'ALTER TABLE {table} VALIDATE CONSTRAINT {name}')
+        else:
+            rebuild[table].append(add)
+    drop = [f'ALTER TABLE {table} DROP CONSTRAINT {name}'
+            for table, name, contype, _ in sorted(constraints, key=lambda c: c[2] != 'f')]
+    drop += [f'DROP INDEX {name}' for _, name, _ in indexes]
+    return rebuild, validate, drop
+
+
+def _run_table_ddl(engine, table_name, phase, statements, df=None):
+    """On its own pooled connection: COPY df (if given), run the table's
+    statements for phase and delete them from pending_ddl, then commit."""
+    raw = engine.raw_connection()
+    try:
+        with raw.cursor() as cur:
+            copied = 0
+            if df is not None:
+                copied = copy_frame(cur, table_name, df)
+                sync_sequence(cur, table_name, df.columns[0])
+            for statement in statements:
+                cur.execute(statement)
+            cur.execute('DELETE FROM pending_ddl WHERE table_name = %s AND phase = %s',
+                        (table_name, phase))
+        raw.commit()
+    except Exception:
+        raw.rollback()
+        raise
+    finally:
+        raw.close()
+    return copied
+
+
+def copy_table(engine, table_name, df, rebuild=()):
+    """COPY one table, rebuild its indexes and constraints (FKs NOT VALID,
+    so the parents are only locked briefly) and commit. Returns (rows
+    copied, seconds)."""
+    start = time.perf_counter()
+    copied = _run_table_ddl(engine, table_name, 'rebuild', rebuild, df)
+    return copied, time.perf_counter() - start
+
+
+def validate_table(engine, table_name, validate=()):
+    """Check a loaded table's NOT VALID FKs against its committed parents.
+    VALIDATE CONSTRAINT doesn't block reads or writes. Returns seconds."""
+    start = time.perf_counter()
+    _run_table_ddl(engine, table_name, 'validate', validate)
+    return time.perf_counter() - start
+
+
+def concurrent_seed(engine, frames, max_workers=None):
+    """Load generated frames wave by wave, the tables of a wave in parallel.
+
+    frames maps table name -> DataFrame with explicit id columns (see
+    seed_generator.py). Waves come from the foreign keys in the catalog.
+    FK and UNIQUE constraints and secondary indexes are dropped first, as
+    in deploy.bulk_seed, and the DDL that rebuilds them is recorded in
+    pending_ddl in the same transaction. Each table is then COPYed on its
+    own connection from the engine's pool, which rebuilds that table's
+    indexes and constraints, with its FKs NOT VALID, and deletes its
+    pending_ddl rows in one transaction. Once a wave has committed, its
+    FKs are validated in bulk, again in parallel. Give the engine a pool
+    at least as large as max_workers (default: the widest wave).
+
+    Existing rows in the seeded tables are truncated. Tables commit one
+    by one, so if a load fails the tables are truncated again and the
+    pending DDL replayed on the empty tables; if the process dies instead,
+    deploy.run_deploy replays it on its next run.
+
+    Concurrency only helps when a wave holds several large tables. In
+    this schema enrollments (~90% of the rows) loads alone in the last
+    wave, so a run takes about as long as deploy.bulk_seed or
+    max_workers=1; see the README.
+    """
+    print("\n=== CONCURRENT SEED ===")
+    replay_pending_ddl(engine)
+    tables = [t for t in TABLES if t in frames]
+    waves = load_waves(read_fk_graph(engine, tables))
+    workers = max_workers or max(len(wave) for wave in waves)
+    print(f"  {len(waves)} waves, {workers} connection(s): "
+          + ' -> '.join('[' + ', '.join(wave) + ']' for wave in waves))
+
+    truncate = f'TRUNCATE {", ".join(tables)} RESTART IDENTITY'
+    raw = engine.raw_connection()
+    try:
+        with raw.cursor() as cur:
+            ensure_pending_ddl_table(cur)
+            rebuild, validate, drop = deferred_ddl(cur, tables)
+            # In wave order, so a replay rebuilds parents before children
+            pending = [(table, 'rebuild', statement)
+                       for wave in waves for table in wave for statement in rebuild[table]]
+            pending += [(table, 'validate', statement)
+                        for wave in waves for table in wave for statement in validate[table]]
+            execute_values(cur, 'INSERT INTO pending_ddl (table_name, phase, statement) '
+                                'VALUES %s', pending)
+            for statement in drop:
+                cur.execute(statement)
+            cur.execute(truncate)
+        raw.commit()
+    except Exception:
+        raw.rollback()
+        raise
+    finally:
+        raw.close()
+    print(f"  Deferred {len(drop)} constraints and indexes")
+
+    try:
+        with ThreadPoolExecutor(workers) as pool:
+            for i, wave in enumerate(waves, 1):
+                start = time.perf_counter()
+                futures = {table: pool.submit(copy_table, engine, table, frames[table],
+                                              rebuild[table])
+                           for table in wave}
+                for table in wave:
+                    copied, seconds = futures[table].result()
+                    print(f"  wave {i}  COPY {table:<12} {copied:>12,} rows  {seconds:6.2f}s")
+                futures = {table: pool.submit(validate_table, engine, table, validate[table])
+                           for table in wave if validate[table]}
+                for table, future in futures.items():
+                    print(f"  wave {i}  VALIDATE {table:<12} {len(validate[table]):>8} FK(s)"
+                          f"  {future.result():6.2f}s")
+                print(f"  wave {i}  done in {time.perf_counter() - start:.2f}s")
+    except Exception:
+        # The pool has finished every started table by now; what is still
+        # pending belongs to tables that did not commit
+        with engine.begin() as conn:
+            conn.execute(text(truncate))
+        replay_pending_ddl(engine)
+        raise
+
+    with engine.begin() as conn:
+        conn.execute(text(f'ANALYZE {", ".join(tables)}'))
+
+
+# ============================================
+# STEP 3: SEED_DATA.SQL-STYLE BASELINE
+# ============================================
+
+def insert_seed(engine, frames, batch_rows=INSERT_BATCH_ROWS):
+    """Load frames the way seed_data.sql does: multi-row INSERT statements,
+    one table after another in foreign-key order, in one transaction."""
+    tables = [t for t in TABLES if t in frames]
+    raw = engine.raw_connection()
+    try:
+        with raw.cursor() as cur:
+            cur.execute(f'TRUNCATE {", ".join(tables)} RESTART IDENTITY')
+            for table in tables:
+                df = frames[table]
+                # Python objects (None for nulls) so psycopg2 can adapt them
+                rows = df.astype(object).where(df.notna(), None).to_numpy().tolist()
+                execute_values(cur, f'INSERT INTO {table} ({", ".join(df.columns)}) VALUES %s',
+                               rows, page_size=batch_rows)
+                sync_sequence(cur, table, df.columns[0])
+        raw.commit()
+    except Exception:
+        raw.rollback()
+        raise
+    finally:
+        raw.close()
+
+    with engine.begin() as conn:
+        conn.execute(text(f'ANALYZE {", ".join(tables)}'))
+
+
+# ============================================
+# BENCHMARK
+# ============================================
+
+def table_counts(engine, tables=TABLES):
+    with engine.connect() as conn:
+        return {t: conn.execute(text(f'SELECT COUNT(*) FROM {t}')).scalar() for t in tables}
+
+
+def benchmark(n_enrollments=500_000, db_name='student_management_bench', seed=42):
+    """Seed the same generated data four ways and compare wall time."""
+    from seed_generator import generate_seed_data
+
+    with contextlib.redirect_stdout(io.StringIO()):
+        create_database(db_name)
+        engine = connect_to_db(db_name, pool_size=len(TABLES), max_overflow=0)
+        apply_migrations(engine)
+        frames = generate_seed_data(n_enrollments, seed=seed)
+    expected = {t: len(df) for t, df in frames.items()}
+    total = sum(expected.values())
+
+    methods = [
+        ('INSERT statements', lambda: insert_seed(engine, frames)),
+        ('deploy.bulk_seed', lambda: bulk_seed(engine, frames)),
+        ('waves, 1 connection', lambda: concurrent_seed(engine, frames, max_workers=1)),
+        ('waves, concurrent', lambda: concurrent_seed(engine, frames)),
+    ]
+    print(f"\n=== SEEDING {total:,} ROWS ({n_enrollments:,} enrollments) ===")
+    print(f"  {'METHOD':<20} {'SECONDS':>8} {'ROWS/s':>10} {'SPEEDUP':>8}")
+    baseline = None
+    for label, load in methods:
+        start = time.perf_counter()
+        with contextlib.redirect_stdout(io.StringIO()):
+            load()
+        seconds = time.perf_counter() - start
+        assert table_counts(engine) == expected, label
+        baseline = baseline or seconds
+        print(f"  {label:<20} {seconds:>8.2f} {total / seconds:>10,.0f} "
+              f"{baseline / seconds:>7.1f}x")
+    engine.dispose()
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Seed the student management schema '
+                                                 'with concurrent COPY waves')
+    parser.add_argument('--db', default=DB_NAME)
+    parser.add_argument('--enrollments', type=int, default=1_000_000)
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--workers', type=int, help='connections (default: widest wave)')
+    parser.add_argument('--benchmark', action='store_true',
+                        help='compare against seed_data.sql-style INSERTs instead')
+    args = parser.parse_args()
+
+    if args.benchmark:
+        benchmark(args.enrollments, seed=args.seed)
+    else:
+        from seed_generator import generate_seed_data
+
+        engine = connect_to_db(args.db, pool_size=args.workers or len(TABLES), max_overflow=0)
+        concurrent_seed(engine, generate_seed_data(args.enrollments, seed=args.seed),
+                        max_workers=args.workers)
+        engine.dispose()
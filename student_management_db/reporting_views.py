@@ -0,0 +1,167 @@
+import argparse
+import select
+import time
+
+import pandas as pd
+from sqlalchemy import text
+
+from deploy import DB_NAME, connect_to_db
+
+CHANNEL = 'reporting_views'
+
+
+# ============================================
+# STEP 1: REFRESH STATE
+# ============================================
+
+def view_states(engine):
+    """Return the refresh bookkeeping rows as a DataFrame."""
+    return pd.read_sql(
+        'SELECT view_name, dirty, last_refreshed_at, refresh_ms '
+        'FROM reporting_view_refresh ORDER BY view_name',
+        engine
+    )
+
+
+def claim_dirty_views(engine):
+    """Clear the dirty flag on stale views and return their names.
+
+    Committed before refreshing, so writers that change the source tables
+    during the refresh mark the view dirty again instead of waiting on the
+    bookkeeping row.
+    """
+    with engine.begin() as conn:
+        rows = conn.execute(text(
+            'UPDATE reporting_view_refresh SET dirty = FALSE '
+            'WHERE dirty RETURNING view_name'
+        )).fetchall()
+    return sorted(row[0] for row in rows)
+
+
+# ============================================
+# STEP 2: REFRESH VIEWS
+# ============================================
+
+def refresh_view(engine, view_name, concurrently=True):
+    """Refresh one materialized view and record how long it took.
+
+    CONCURRENTLY keeps the view readable during the refresh and only writes
+    rows that changed. A failed refresh puts the dirty flag back.
+    """
+    mode = 'CONCURRENTLY ' if concurrently else ''
+    start = time.perf_counter()
+    try:
+        with engine.begin() as conn:
+            conn.execute(text(f'REFRESH MATERIALIZED VIEW {mode}{view_name}'))
+    except Exception:
+        with engine.begin() as conn:
+            conn.execute(
+                text('UPDATE reporting_view_refresh SET dirty = TRUE '
+                     'WHERE view_name = :v'),
+                {'v': view_name}
+            )
+        raise
+
+    elapsed_ms = (time.perf_counter() - start) * 1000
+    with engine.begin() as conn:
+        conn.execute(
+            text('UPDATE reporting_view_refresh '
+                 'SET last_refreshed_at = CURRENT_TIMESTAMP, refresh_ms = :ms '
+                 'WHERE view_name = :v'),
+            {'v': view_name, 'ms': round(elapsed_ms, 1)}
+        )
+    print(f"  Refreshed {view_name:<32} {elapsed_ms:8.1f} ms")
+    return elapsed_ms
+
+
+def refresh_dirty(engine, concurrently=True):
+    """Refresh only the views whose source tables changed."""
+    views = claim_dirty_views(engine)
+    if not views:
+        print("  All reporting views are current")
+    for view_name in views:
+        refresh_view(engine, view_name, concurrently)
+    return views
+
+
+def refresh_all(engine, concurrently=True):
+    """Refresh every reporting view regardless of its dirty flag."""
+    with engine.connect() as conn:
+        views = [row[0] for row in conn.execute(
+            text('SELECT view_name FROM reporting_view_refresh ORDER BY view_name')
+        )]
+    claim_dirty_views(engine)
+    for view_name in views:
+        refresh_view(engine, view_name, concurrently)
+    return views
+
+
+# ============================================
+# STEP 3: REFRESH ON CHANGE
+# ============================================
+
+def listen_and_refresh(engine, debounce_seconds=5.0, max_delay_seconds=60.0):
+    """Block forever, refreshing stale views after source-table changes.
+
+    The dirty-marking triggers NOTIFY on the reporting_views channel. A
+    burst of writes is batched: the refresh waits until no notification
+    has arrived for debounce_seconds, but never longer than
+    max_delay_seconds after the first one.
+    """
+    raw = engine.raw_connection()
+    raw.set_isolation_level(0)  # autocommit, needed to receive notifications
+    with raw.cursor() as cur:
+        cur.execute(f'LISTEN {CHANNEL}')
+    print(f"  Listening on '{CHANNEL}' (debounce {debounce_seconds}s)")
+
+    # Catch up on anything that changed while nobody was listening
+    refresh_dirty(engine)
+
+    dbapi_conn = raw.dbapi_connection
+    first_seen = None
+    try:
+        while True:
+            timeout = None if first_seen is None else debounce_seconds
+            ready, _, _ = select.select([dbapi_conn], [], [], timeout)
+
+            if ready:
+                dbapi_conn.poll()
+                if dbapi_conn.notifies:
+                    dbapi_conn.notifies.clear()
+                    if first_seen is None:
+                        first_seen = time.monotonic()
+                    if time.monotonic() - first_seen < max_delay_seconds:
+                        continue
+
+            if first_seen is not None:
+                first_seen = None
+                refresh_dirty(engine)
+    finally:
+        raw.close()
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Refresh the reporting materialized views')
+    parser.add_argument('--db', default=DB_NAME)
+    parser.add_argument('--all', action='store_true',
+                        help='refresh every view, not only the dirty ones')
+    parser.add_argument('--listen', action='store_true',
+                        help='keep running and refresh after enrollment changes')
+    parser.add_argument('--blocking', action='store_true',
+                        help='plain REFRESH (locks readers out, faster on big changes)')
+    args = parser.parse_args()
+
+    engine = connect_to_db(args.db)
+    concurrently = not args.blocking
+
+    print("\n=== REPORTING VIEWS ===")
+    if args.listen:
+        listen_and_refresh(engine)
+    elif args.all:
+        refresh_all(engine, concurrently)
+    else:
+        refresh_dirty(engine, concurrently)
+
+    print()
+    print(view_states(engine).to_string(index=False))
+    engine.dispose()
@@ -0,0 +1,9 @@
+-- Indexes on foreign-key columns recommended by benchmark_queries.py
+-- used by: course_fill_rate, instructor_schedule
+CREATE INDEX IF NOT EXISTS idx_classes_course_id ON classes (course_id);
+-- used by: instructor_schedule
+CREATE INDEX IF NOT EXISTS idx_classes_instructor_id ON classes (instructor_id);
+-- used by: class_roster, course_fill_rate
+CREATE INDEX IF NOT EXISTS idx_enrollments_class_id ON enrollments (class_id);
+-- used by: department_headcount
+CREATE INDEX IF NOT EXISTS idx_students_department_id ON students (department_id);
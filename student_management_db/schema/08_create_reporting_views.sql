@@ -0,0 +1,107 @@
+-- Precomputed reporting views for dashboards.
+-- Each view has a unique index so it can be refreshed CONCURRENTLY.
+
+CREATE MATERIALIZED VIEW mv_class_enrollment AS
+SELECT cl.class_id,
+       co.course_id,
+       co.course_code,
+       co.name AS course_name,
+       d.name AS department,
+       cl.semester,
+       cl.year,
+       cl.max_students,
+       COUNT(e.enrollment_id) AS enrolled,
+       ROUND(COUNT(e.enrollment_id)::numeric / NULLIF(cl.max_students, 0), 3) AS fill_ratio
+FROM classes cl
+JOIN courses co ON co.course_id = cl.course_id
+LEFT JOIN departments d ON d.department_id = co.department_id
+LEFT JOIN enrollments e ON e.class_id = cl.class_id
+GROUP BY cl.class_id, co.course_id, d.name;
+
+CREATE UNIQUE INDEX mv_class_enrollment_pk ON mv_class_enrollment (class_id);
+
+-- Enrollments without a grade yet are counted as 'IP' (in progress)
+CREATE MATERIALIZED VIEW mv_course_grade_distribution AS
+SELECT co.course_id,
+       co.course_code,
+       co.name AS course_name,
+       COALESCE(e.grade, 'IP') AS grade,
+       COUNT(*) AS students
+FROM enrollments e
+JOIN classes cl ON cl.class_id = e.class_id
+JOIN courses co ON co.course_id = cl.course_id
+GROUP BY co.course_id, COALESCE(e.grade, 'IP');
+
+CREATE UNIQUE INDEX mv_course_grade_distribution_pk
+    ON mv_course_grade_distribution (course_id, grade);
+
+CREATE MATERIALIZED VIEW mv_department_enrollment AS
+SELECT d.department_id,
+       d.name AS department,
+       (SELECT COUNT(*) FROM students s
+         WHERE s.department_id = d.department_id) AS students,
+       (SELECT COUNT(*) FROM students s
+         WHERE s.department_id = d.department_id AND s.is_active) AS active_students,
+       COUNT(DISTINCT cl.class_id) AS classes_offered,
+       COUNT(e.enrollment_id) AS enrollments
+FROM departments d
+LEFT JOIN courses co ON co.department_id = d.department_id
+LEFT JOIN classes cl ON cl.course_id = co.course_id
+LEFT JOIN enrollments e ON e.class_id = cl.class_id
+GROUP BY d.department_id;
+
+CREATE UNIQUE INDEX mv_department_enrollment_pk
+    ON mv_department_enrollment (department_id);
+
+-- Refresh bookkeeping: which views are stale, and which tables feed them
+CREATE TABLE reporting_view_refresh (
+    view_name VARCHAR(63) PRIMARY KEY,
+    depends_on TEXT[] NOT NULL,
+    dirty BOOLEAN NOT NULL DEFAULT FALSE,
+    last_refreshed_at TIMESTAMP,
+    refresh_ms NUMERIC(12,1)
+);
+
+INSERT INTO reporting_view_refresh (view_name, depends_on) VALUES
+('mv_class_enrollment', ARRAY['classes', 'courses', 'departments', 'enrollments']),
+('mv_course_grade_distribution', ARRAY['classes', 'courses', 'enrollments']),
+('mv_department_enrollment', ARRAY['students', 'courses', 'classes', 'departments', 'enrollments']);
+
+-- Statement-level: one cheap UPDATE per statement, not per row. Rows that
+-- are already dirty are skipped, so concurrent writers don't queue on them.
+CREATE FUNCTION mark_reporting_views_dirty() RETURNS trigger AS $$
+DECLARE
+    marked INTEGER;
+BEGIN
+    UPDATE reporting_view_refresh
+       SET dirty = TRUE
+     WHERE TG_TABLE_NAME = ANY(depends_on)
+       AND NOT dirty;
+    GET DIAGNOSTICS marked = ROW_COUNT;
+
+    IF marked > 0 THEN
+        PERFORM pg_notify('reporting_views', TG_TABLE_NAME);
+    END IF;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE TRIGGER enrollments_reporting_dirty
+    AFTER INSERT OR UPDATE OR DELETE OR TRUNCATE ON enrollments
+    FOR EACH STATEMENT EXECUTE FUNCTION mark_reporting_views_dirty();
+
+CREATE TRIGGER classes_reporting_dirty
+    AFTER INSERT OR UPDATE OR DELETE OR TRUNCATE ON classes
+    FOR EACH STATEMENT EXECUTE FUNCTION mark_reporting_views_dirty();
+
+CREATE TRIGGER courses_reporting_dirty
+    AFTER INSERT OR UPDATE OR DELETE OR TRUNCATE ON courses
+    FOR EACH STATEMENT EXECUTE FUNCTION mark_reporting_views_dirty();
+
+CREATE TRIGGER students_reporting_dirty
+    AFTER INSERT OR UPDATE OR DELETE OR TRUNCATE ON students
+    FOR EACH STATEMENT EXECUTE FUNCTION mark_reporting_views_dirty();
+
+CREATE TRIGGER departments_reporting_dirty
+    AFTER INSERT OR UPDATE OR DELETE OR TRUNCATE ON departments
+    FOR EACH STATEMENT EXECUTE FUNCTION mark_reporting_views_dirty();
@@ -0,0 +1,193 @@
+import argparse
+
+import numpy as np
+import pandas as pd
+
+FIRST_NAMES = [
+    'Rahul', 'Priya', 'Amit', 'Sneha', 'Vikram', 'Arun', 'Meera', 'Rajesh',
+    'Anita', 'Karan', 'Divya', 'Suresh', 'Pooja', 'Nikhil', 'Kavya', 'Rohan'
+]
+LAST_NAMES = [
+    'Verma', 'Patel', 'Singh', 'Reddy', 'Joshi', 'Sharma', 'Iyer', 'Kumar',
+    'Nair', 'Gupta', 'Mehta', 'Rao', 'Das', 'Menon', 'Shah', 'Pillai'
+]
+BUILDINGS = ['Tech Building', 'Science Hall', 'Arts Building', 'Main Hall']
+SEMESTERS = ['Spring', 'Summer', 'Fall']
+SCHEDULES = [
+    'Mon/Wed 09:00-10:30', 'Mon/Wed 13:00-14:30', 'Tue/Thu 10:00-11:30',
+    'Tue/Thu 14:00-15:30', 'Mon/Wed/Fri 09:00-10:00', 'Fri 10:00-13:00'
+]
+GRADES = np.array(['A', 'B', 'C', 'D', 'F', None], dtype=object)
+GRADE_WEIGHTS = [0.25, 0.3, 0.2, 0.08, 0.05, 0.12]
+
+
+# ============================================
+# HELPERS
+# ============================================
+
+def scaled_counts(n_enrollments):
+    """Derive table sizes from the enrollment count.
+
+    Roughly 10 enrollments per student and 40 per class, so a million
+    enrollments gives 100k students and 25k classes.
+    """
+    return {
+        'n_departments': max(4, min(200, n_enrollments // 50_000)),
+        'n_students': max(5, n_enrollments // 10),
+        'n_instructors': max(4, n_enrollments // 500),
+        'n_courses': max(5, n_enrollments // 1_000),
+        'n_classes': max(5, n_enrollments // 40),
+    }
+
+
+def random_names(rng, n):
+    """Vectorized first/last name draws."""
+    first = np.array(FIRST_NAMES, dtype=object)[rng.integers(0, len(FIRST_NAMES), n)]
+    last = np.array(LAST_NAMES, dtype=object)[rng.integers(0, len(LAST_NAMES), n)]
+    return first, last
+
+
+def random_dates(rng, start, end, n):
+    """n uniform random dates between start and end (inclusive)."""
+    start = np.datetime64(start, 'D')
+    days = (np.datetime64(end, 'D') - start).astype(int) + 1
+    return start + rng.integers(0, days, n).astype('timedelta64[D]')
+
+
+def unique_pairs(rng, n, n_left, n_right):
+    """n distinct (left, right) pairs with 1-based ids on both sides.
+
+    Draws flat indices with replacement and de-duplicates, which is far
+    cheaper than sampling without replacement from n_left * n_right.
+    """
+    total = n_left * n_right
+    if n > total:
+        raise ValueError(f"cannot draw {n:,} unique pairs from {total:,}")
+
+    picked = np.empty(0, dtype=np.int64)
+    while len(picked) < n:
+        need = n - len(picked)
+        draw = rng.integers(0, total, int(need * 1.1) + 16, dtype=np.int64)
+        picked = np.unique(np.concatenate([picked, draw]))
+    picked = rng.permutation(picked)[:n]
+
+    return picked // n_right + 1, picked % n_right + 1
+
+
+# ============================================
+# GENERATE TABLES
+# ============================================
+
+def generate_seed_data(n_enrollments=1_000_000, seed=42, **overrides):
+    """Generate all six tables at scale as DataFrames with explicit ids.
+
+    Table sizes follow scaled_counts(n_enrollments); pass n_students,
+    n_classes, etc. to override. Emails, course codes and
+    (student_id, class_id) pairs are unique so the schema's constraints
+    hold after a bulk load.
+    """
+    counts = scaled_counts(n_enrollments)
+    counts.update(overrides)
+    rng = np.random.default_rng(seed)
+
+    print("\n=== GENERATING SEED DATA ===")
+
+    n = counts['n_departments']
+    dept_ids = np.arange(1, n + 1)
+    departments = pd.DataFrame({
+        'department_id': dept_ids,
+        'name': [f'Department {i}' for i in dept_ids],
+        'building': rng.choice(BUILDINGS, n),
+    })
+
+    n = counts['n_students']
+    ids = np.arange(1, n + 1)
+    first, last = random_names(rng, n)
+    students = pd.DataFrame({
+        'student_id': ids,
+        'first_name': first,
+        'last_name': last,
+        'email': pd.Series(first).str.lower() + '.' + pd.Series(last).str.lower()
+                 + '.' + ids.astype(str) + '@student.edu',
+        'phone': None,
+        'date_of_birth': random_dates(rng, '1995-01-01', '2006-12-31', n),
+        'enrollment_date': random_dates(rng, '2015-08-01', '2025-01-31', n),
+        'department_id': rng.integers(1, counts['n_departments'] + 1, n),
+        'is_active': rng.random(n) < 0.9,
+    })
+
+    n = counts['n_instructors']
+    ids = np.arange(1, n + 1)
+    first, last = random_names(rng, n)
+    instructors = pd.DataFrame({
+        'instructor_id': ids,
+        'first_name': first,
+        'last_name': last,
+        'email': pd.Series(first).str.lower() + '.' + pd.Series(last).str.lower()
+                 + '.' + ids.astype(str) + '@university.edu',
+        'phone': None,
+        'date_of_birth': random_dates(rng, '1955-01-01', '1990-12-31', n),
+        'hire_date': random_dates(rng, '2000-01-01', '2024-12-31', n),
+        'salary': rng.integers(50_000, 150_000, n),
+        'department_id': rng.integers(1, counts['n_departments'] + 1, n),
+    })
+
+    n = counts['n_courses']
+    ids = np.arange(1, n + 1)
+    courses = pd.DataFrame({
+        'course_id': ids,
+        'course_code': ['C' + str(i).zfill(5) for i in ids],
+        'name': [f'Course {i}' for i in ids],
+        'description': None,
+        'credits': rng.integers(1, 7, n),
+        'department_id': rng.integers(1, counts['n_departments'] + 1, n),
+    })
+
+    n = counts['n_classes']
+    classes = pd.DataFrame({
+        'class_id': np.arange(1, n + 1),
+        'course_id': rng.integers(1, counts['n_courses'] + 1, n),
+        'instructor_id': rng.integers(1, counts['n_instructors'] + 1, n),
+        'semester': rng.choice(SEMESTERS, n),
+        'year': rng.integers(2015, 2026, n),
+        'max_students': rng.choice([30, 40, 60, 100], n),
+        'schedule': rng.choice(SCHEDULES, n),
+    })
+
+    n = n_enrollments
+    student_ids, class_ids = unique_pairs(
+        rng, n, counts['n_students'], counts['n_classes']
+    )
+    enrollments = pd.DataFrame({
+        'enrollment_id': np.arange(1, n + 1),
+        'student_id': student_ids,
+        'class_id': class_ids,
+        'enrollment_date': random_dates(rng, '2015-08-01', '2025-01-31', n),
+        'grade': rng.choice(GRADES, n, p=GRADE_WEIGHTS),
+    })
+
+    frames = {
+        'departments': departments,
+        'students': students,
+        'instructors': instructors,
+        'courses': courses,
+        'classes': classes,
+        'enrollments': enrollments,
+    }
+    for table, df in frames.items():
+        print(f"  {table:<12} {len(df):>12,} rows")
+    return frames
+
+
+if __name__ == '__main__':
+    from deploy import DB_NAME, connect_to_db, bulk_seed
+
+    parser = argparse.ArgumentParser(description='Seed the student management schema at scale')
+    parser.add_argument('--db', default=DB_NAME)
+    parser.add_argument('--enrollments', type=int, default=1_000_000)
+    parser.add_argument('--seed', type=int, default=42)
+    args = parser.parse_args()
+
+    engine = connect_to_db(args.db)
+    bulk_seed(engine, generate_seed_data(args.enrollments, seed=args.seed))
+    engine.dispose()